@@ -1,12 +1,20 @@
 import sys
 import os
-from dotenv import load_dotenv
+from utils.startup_profiler import get_startup_profiler
+
+# Started before any other import so the profiler can measure them
+profiler = get_startup_profiler()
+
 from PySide6.QtWidgets import QApplication
+from PySide6.QtCore import QTimer
+from services.firebase_service import load_environment
 from frontend.main_window import MainWindow
 
+profiler.mark("imports")
+
 def main():
     # Load environment variables
-    load_dotenv()
+    load_environment()
     
     # Create the application
     app = QApplication(sys.argv)
@@ -17,6 +25,9 @@ def main():
     window = MainWindow()
     window.show()
     
+    # Runs once the event loop has painted the window
+    QTimer.singleShot(0, lambda: profiler.mark("window_ready"))
+    
     # Start the event loop
     sys.exit(app.exec())
 
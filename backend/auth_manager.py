@@ -1,12 +1,16 @@
 import requests
 import json
 from services.firebase_service import FirebaseService
+from services.firebase_transport import get_transport
+from backend.credential_provider import get_credential_provider
 
 class AuthManager:
     """Manager for Firebase Authentication operations"""
     
     def __init__(self):
         self.firebase_service = FirebaseService()
+        self.transport = get_transport()
+        self.credentials = get_credential_provider()
         self.id_token = None
         self.user_uid = None
     
@@ -22,7 +26,7 @@ class AuthManager:
         }
         
         try:
-            response = requests.post(
+            response = self.transport.post(
                 self.firebase_service.get_auth_endpoint("signin"),
                 json=payload
             )
@@ -31,6 +35,10 @@ class AuthManager:
                 data = response.json()
                 self.id_token = data.get("idToken")
                 self.user_uid = data.get("localId")
+                # Hand the refresh token to the shared provider so the session outlives the ID token
+                self.credentials.set_session(
+                    self.id_token, data.get("refreshToken"), data.get("expiresIn", 3600), self.user_uid
+                )
                 return True, self.id_token, self.user_uid, ""
             else:
                 error_data = response.json()
@@ -42,9 +50,11 @@ class AuthManager:
         except json.JSONDecodeError:
             return False, None, None, "Invalid response from server"
     
-    def sign_up(self, email, password, role="teacher"):
+    def sign_up(self, email, password, role="teacher", establish_session=True):
         """
         Sign up a new user with email and password
+        Pass establish_session=False to create an account for someone else
+        without replacing the signed-in user's session.
         Returns: (success, id_token, user_uid, error_message)
         """
         payload = {
@@ -54,15 +64,20 @@ class AuthManager:
         }
         
         try:
-            response = requests.post(
+            response = self.transport.post(
                 self.firebase_service.get_auth_endpoint("signup"),
                 json=payload
             )
             
             if response.status_code == 200:
                 data = response.json()
+                if not establish_session:
+                    return True, data.get("idToken"), data.get("localId"), ""
                 self.id_token = data.get("idToken")
                 self.user_uid = data.get("localId")
+                self.credentials.set_session(
+                    self.id_token, data.get("refreshToken"), data.get("expiresIn", 3600), self.user_uid
+                )
                 return True, self.id_token, self.user_uid, ""
             else:
                 error_data = response.json()
@@ -78,4 +93,5 @@ class AuthManager:
         """Clear the authentication state"""
         self.id_token = None
         self.user_uid = None
+        self.credentials.clear()
         return True
@@ -0,0 +1,302 @@
+import time
+import threading
+import requests
+from services.firebase_service import FirebaseService
+from services.firebase_transport import get_transport
+
+# Refresh token errors that mean the session can't continue; the user has to sign in again
+FATAL_REFRESH_ERRORS = ("TOKEN_EXPIRED", "INVALID_REFRESH_TOKEN", "USER_DISABLED", "USER_NOT_FOUND", "INVALID_GRANT_TYPE")
+
+class CredentialProvider:
+    """
+    Holds the signed-in user's tokens and keeps the ID token fresh
+
+    Firebase ID tokens expire after an hour. The provider stores the refresh
+    token from sign-in and exchanges it in the background a few minutes before
+    expiry, so every FirebaseClient and FirestoreManager can ask for the
+    current token instead of holding on to the one it was created with.
+    If the refresh token is rejected for good (revoked, expired, account
+    disabled), the session ends: the tokens are dropped, session_error says
+    why and listeners are notified so the user can be signed out. Listeners
+    are always called with no lock held.
+    """
+
+    # Refresh this many seconds before the token expires
+    REFRESH_MARGIN = 300
+
+    # Wait this long before retrying after a failed background refresh
+    RETRY_DELAY = 60
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Held across the token exchange, so concurrent refreshes make one request
+        self._refresh_lock = threading.Lock()
+        self._timer = None
+        self._listeners = []
+        self._generation = 0
+        self.transport = get_transport()
+        self._reset()
+
+    def _reset(self):
+        self.id_token = None
+        self.refresh_token = None
+        self.user_uid = None
+        self.expires_at = 0
+        self.session_error = None
+        # Every ID token issued during this session, so stale copies can be recognised
+        self._session_tokens = set()
+        # Bumped per session, so a refresh that finishes after sign-out is ignored
+        self._generation += 1
+        self._refreshes = 0
+        self._last_result = (False, "Not signed in")
+        self._retry_at = 0
+        self._refreshing = False
+
+    def set_session(self, id_token, refresh_token, expires_in, user_uid):
+        """Start managing the tokens returned by sign-in or sign-up"""
+        with self._lock:
+            self._cancel_timer()
+            self._reset()
+            self._store_tokens(id_token, refresh_token, expires_in, user_uid)
+        self._notify()
+
+    def resume(self, refresh_token, user_uid):
+        """
+        Start from a saved refresh token (no ID token yet)
+        Call refresh() to exchange it; get_id_token() will also do so on demand.
+        """
+        with self._lock:
+            self._cancel_timer()
+            self._reset()
+            self.refresh_token = refresh_token
+            self.user_uid = user_uid
+
+    def clear(self):
+        """Forget the current session (on logout)"""
+        with self._lock:
+            self._cancel_timer()
+            self._reset()
+        self._notify()
+
+    def is_signed_in(self):
+        return self.refresh_token is not None
+
+    def add_listener(self, callback):
+        """Call callback(provider) whenever the tokens change"""
+        self._listeners.append(callback)
+
+    def get_id_token(self):
+        """
+        Return the current ID token, refreshing it if it has expired (e.g. after sleep)
+        The GUI (main) thread never waits on the network: it gets the current
+        token while a refresh runs in the background. Other threads wait for
+        the new token. After a failed refresh nothing is retried here until
+        the retry delay has passed.
+        """
+        with self._lock:
+            now = time.time()
+            if not self.refresh_token or now < self.expires_at - 30 or now < self._retry_at:
+                return self.id_token
+
+        if threading.current_thread() is threading.main_thread():
+            self.refresh_in_background()
+        else:
+            self.refresh()
+        return self.id_token
+
+    def resolve_token(self, id_token):
+        """
+        Swap a token from this session for the current one
+        Tokens that don't belong to this session (or None) are returned unchanged.
+        """
+        if id_token is not None and id_token not in self._session_tokens:
+            return id_token
+        if not self.is_signed_in():
+            return id_token
+        return self.get_id_token()
+
+    def token_after_rejection(self, id_token):
+        """
+        A new ID token to retry a request whose token was rejected (401), or None not to retry
+        Only tokens from this session are replaced. Waits for the refresh
+        (or for the one already running, e.g. started by the GUI thread
+        after a sleep), so the caller is already blocked on the network.
+        """
+        with self._lock:
+            if id_token not in self._session_tokens or not self.refresh_token:
+                return None
+            if self.id_token != id_token:
+                # Refreshed since the request was sent
+                return self.id_token
+        success, _ = self.refresh()
+        with self._lock:
+            return self.id_token if success and self.id_token != id_token else None
+
+    def refresh_in_background(self):
+        """Start refresh() on a background thread, unless one is already running"""
+        with self._lock:
+            if self._refreshing or not self.refresh_token:
+                return
+            self._refreshing = True
+            generation = self._generation
+        threading.Thread(target=self._background_refresh, args=(generation,), daemon=True).start()
+
+    def _background_refresh(self, generation):
+        try:
+            self.refresh()
+        finally:
+            with self._lock:
+                if generation == self._generation:
+                    self._refreshing = False
+
+    def refresh(self):
+        """
+        Exchange the refresh token for a new ID token
+        Blocks on the network, so call it off the GUI thread.
+        Returns: (success, error_message)
+        """
+        with self._lock:
+            refreshes = self._refreshes
+        with self._refresh_lock:
+            with self._lock:
+                if self._refreshes != refreshes:
+                    # Another thread refreshed while this one waited; share its result
+                    return self._last_result
+                if not self.refresh_token:
+                    return False, self.session_error or "Not signed in"
+                generation = self._generation
+                payload = {
+                    "grant_type": "refresh_token",
+                    "refresh_token": self.refresh_token
+                }
+
+            # The lock is released for the request, so other threads can still read the current token
+            data = None
+            try:
+                response = self.transport.post(
+                    FirebaseService().get_auth_endpoint("refresh"),
+                    json=payload
+                )
+                if response.status_code == 200:
+                    data = response.json()
+                    error_message = ""
+                else:
+                    error_message = response.json().get("error", {}).get("message", "Unknown error")
+            except (requests.RequestException, ValueError) as e:
+                error_message = f"Network error: {str(e)}"
+
+            with self._lock:
+                if generation != self._generation:
+                    return False, "Signed out while refreshing"
+                self._refreshes += 1
+
+                if data is not None:
+                    self._retry_at = 0
+                    self._store_tokens(
+                        data.get("id_token"),
+                        data.get("refresh_token", self.refresh_token),
+                        data.get("expires_in", 3600),
+                        data.get("user_id", self.user_uid)
+                    )
+                    self._last_result = (True, "")
+                else:
+                    print(f"Token refresh failed: {error_message}")
+                    if any(error in error_message for error in FATAL_REFRESH_ERRORS):
+                        self._end_session(error_message)
+                    else:
+                        self._retry_at = time.time() + self.RETRY_DELAY
+                        self._schedule_refresh(self.RETRY_DELAY)
+                    self._last_result = (False, error_message)
+                result = self._last_result
+                tokens_changed = data is not None or not self.refresh_token
+
+        # Outside both locks, so a listener can ask for a token or refresh without deadlocking
+        if tokens_changed:
+            self._notify()
+        return result
+
+    def _end_session(self, error_message):
+        """The refresh token was rejected for good: drop the tokens (the caller tells the listeners)"""
+        self._cancel_timer()
+        self._reset()
+        self.session_error = error_message
+
+    def _store_tokens(self, id_token, refresh_token, expires_in, user_uid):
+        self.id_token = id_token
+        self.refresh_token = refresh_token
+        self.user_uid = user_uid
+        self.expires_at = time.time() + int(expires_in)
+        self._session_tokens.add(id_token)
+        self._schedule_refresh(max(int(expires_in) - self.REFRESH_MARGIN, 30))
+
+    def _schedule_refresh(self, delay):
+        self._cancel_timer()
+        if self.refresh_token:
+            self._timer = threading.Timer(delay, self.refresh)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _cancel_timer(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+    def _notify(self):
+        for callback in list(self._listeners):
+            try:
+                callback(self)
+            except Exception as e:
+                print(f"Credential listener failed: {str(e)}")
+
+class TokenRetryTransport:
+    """
+    Transport wrapper that sends a request once more if its ID token is rejected
+
+    The GUI thread is handed the current token even if it has just expired
+    (a refresh runs in the background), so the first request after a sleep
+    or resume can get 401. Such a request waits for the refresh and is sent
+    again with the new token, once. Everything else passes straight through.
+    """
+
+    def __init__(self, transport, credentials):
+        self.transport = transport
+        self.credentials = credentials
+
+    def request(self, method, url, **kwargs):
+        response = self.transport.request(method, url, **kwargs)
+        if response.status_code != 401:
+            return response
+        headers = kwargs.get("headers") or {}
+        scheme, _, id_token = headers.get("Authorization", "").partition(" ")
+        new_token = self.credentials.token_after_rejection(id_token) if scheme == "Bearer" else None
+        if not new_token:
+            return response
+        kwargs["headers"] = dict(headers, Authorization=f"Bearer {new_token}")
+        return self.transport.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def __getattr__(self, name):
+        # Timings, warm-up and the rest come from the wrapped transport
+        return getattr(self.transport, name)
+
+_provider = None
+_provider_lock = threading.Lock()
+
+def get_credential_provider():
+    """Return the credential provider shared by the whole application"""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = CredentialProvider()
+        return _provider
@@ -1,25 +1,31 @@
 import requests
 import json
 from services.firebase_service import FirebaseService
+from services.firebase_transport import get_transport
+from backend.credential_provider import get_credential_provider, TokenRetryTransport
 
 class FirestoreManager:
     """Manager for Firestore database operations"""
     
     def __init__(self):
         self.firebase_service = FirebaseService()
+        self.credentials = get_credential_provider()
+        # A request whose token expired during a sleep is sent again once the token is refreshed
+        self.transport = TokenRetryTransport(get_transport(), self.credentials)
     
     def get_user_role(self, id_token, user_uid):
         """
         Get user role from Firestore
         Returns: (role, error_message)
         """
+        id_token = self.credentials.resolve_token(id_token)
         try:
             headers = {
                 "Authorization": f"Bearer {id_token}"
             }
             
             endpoint = self.firebase_service.get_firestore_endpoint(f"users/{user_uid}")
-            response = requests.get(endpoint, headers=headers)
+            response = self.transport.get(endpoint, headers=headers)
             
             if response.status_code == 200:
                 data = response.json()
@@ -40,6 +46,7 @@ class FirestoreManager:
         Create a new user profile in Firestore
         Returns: (success, error_message)
         """
+        id_token = self.credentials.resolve_token(id_token)
         try:
             headers = {
                 "Authorization": f"Bearer {id_token}",
@@ -55,7 +62,7 @@ class FirestoreManager:
             }
             
             endpoint = self.firebase_service.get_firestore_endpoint(f"users/{user_uid}")
-            response = requests.patch(
+            response = self.transport.patch(
                 endpoint,
                 headers=headers,
                 json=payload
@@ -72,18 +79,67 @@ class FirestoreManager:
         except json.JSONDecodeError:
             return False, "Invalid response from server"
     
+    # Firestore accepts at most this many writes in one commit
+    MAX_BATCH_WRITES = 500
+
+    def create_user_profiles(self, id_token, profiles):
+        """
+        Create many user profiles with batched commits
+        profiles: list of dicts with uid, email, role and name
+        Returns: list of (user_uid, success, error_message) in the same order
+        """
+        id_token = self.credentials.resolve_token(id_token)
+        headers = {
+            "Authorization": f"Bearer {id_token}",
+            "Content-Type": "application/json"
+        }
+        document_root = f"projects/{self.firebase_service.project_id}/databases/(default)/documents"
+        endpoint = f"{self.firebase_service.firestore_base_url}:commit?key={self.firebase_service.api_key}"
+
+        results = []
+        for start in range(0, len(profiles), self.MAX_BATCH_WRITES):
+            batch = profiles[start:start + self.MAX_BATCH_WRITES]
+            writes = [
+                {
+                    "update": {
+                        "name": f"{document_root}/users/{profile['uid']}",
+                        "fields": {
+                            "email": {"stringValue": profile["email"]},
+                            "role": {"stringValue": profile["role"]},
+                            "name": {"stringValue": profile.get("name", "")}
+                        }
+                    }
+                }
+                for profile in batch
+            ]
+
+            try:
+                response = self.transport.post(endpoint, headers=headers, json={"writes": writes})
+                if response.status_code == 200:
+                    error_message = ""
+                else:
+                    error_message = f"Error creating user profiles: {response.status_code}"
+            except requests.RequestException as e:
+                error_message = f"Network error: {str(e)}"
+
+            # A commit is atomic, so every profile in the batch shares its outcome
+            results.extend((profile["uid"], not error_message, error_message) for profile in batch)
+
+        return results
+
     def get_user_profile(self, id_token, user_uid):
         """
         Get user profile from Firestore
         Returns: (success, profile_data, error_message)
         """
+        id_token = self.credentials.resolve_token(id_token)
         try:
             headers = {
                 "Authorization": f"Bearer {id_token}"
             }
             
             endpoint = self.firebase_service.get_firestore_endpoint(f"users/{user_uid}")
-            response = requests.get(endpoint, headers=headers)
+            response = self.transport.get(endpoint, headers=headers)
             
             if response.status_code == 200:
                 data = response.json()
@@ -111,6 +167,7 @@ class FirestoreManager:
         Add a new student to Firestore
         Returns: (success, student_id, error_message)
         """
+        id_token = self.credentials.resolve_token(id_token)
         try:
             headers = {
                 "Authorization": f"Bearer {id_token}",
@@ -126,7 +183,7 @@ class FirestoreManager:
             }
             
             endpoint = self.firebase_service.get_firestore_endpoint("students")
-            response = requests.post(
+            response = self.transport.post(
                 endpoint,
                 headers=headers,
                 json=payload
@@ -152,6 +209,7 @@ class FirestoreManager:
         Add a new academic term to Firestore
         Returns: (success, error_message)
         """
+        id_token = self.credentials.resolve_token(id_token)
         try:
             headers = {
                 "Authorization": f"Bearer {id_token}",
@@ -167,7 +225,7 @@ class FirestoreManager:
             }
             
             endpoint = self.firebase_service.get_firestore_endpoint(f"terms/{term_id}")
-            response = requests.patch(
+            response = self.transport.patch(
                 endpoint,
                 headers=headers,
                 json=payload
@@ -189,6 +247,7 @@ class FirestoreManager:
         Get all terms or filter by year
         Returns: (success, terms_list, error_message)
         """
+        id_token = self.credentials.resolve_token(id_token)
         try:
             headers = {
                 "Authorization": f"Bearer {id_token}"
@@ -200,7 +259,7 @@ class FirestoreManager:
             if year:
                 endpoint += f'?where.field=year&where.op=EQUAL&where.value={year}'
                 
-            response = requests.get(endpoint, headers=headers)
+            response = self.transport.get(endpoint, headers=headers)
             
             if response.status_code == 200:
                 data = response.json()
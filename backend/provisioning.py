@@ -0,0 +1,247 @@
+import csv
+import time
+import random
+import secrets
+import string
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from backend.auth_manager import AuthManager
+from backend.firestore_manager import FirestoreManager
+
+# Roles a staff CSV may assign
+STAFF_ROLES = ("teacher", "administrator")
+
+# Sign-up errors that mean "slow down" rather than "this row is bad"
+RATE_LIMIT_ERRORS = ("TOO_MANY_ATTEMPTS_TRY_LATER", "QUOTA_EXCEEDED", "RESOURCE_EXHAUSTED")
+
+# Columns written to the result report
+REPORT_COLUMNS = ["row", "email", "name", "role", "status", "uid", "temporary_password", "error"]
+
+class TokenBucket:
+    """Allows `rate` operations per second on average, with bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until an operation may start"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def slow_down(self, seconds):
+        """Pause every caller (after the server reported a rate limit)"""
+        with self._lock:
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+def generate_password(length=12):
+    """Random temporary password with letters and digits"""
+    alphabet = string.ascii_letters + string.digits
+    while True:
+        password = "".join(secrets.choice(alphabet) for _ in range(length))
+        if any(c.isdigit() for c in password) and any(c.isalpha() for c in password):
+            return password
+
+def read_staff_csv(path):
+    """
+    Read a staff CSV with email, name, role and (optional) password columns
+    Returns: list of row dicts; rows that can't be used have an "error" set
+    """
+    rows = []
+    seen_emails = set()
+
+    with open(path, "r", newline="", encoding="utf-8-sig") as csv_file:
+        reader = csv.DictReader(csv_file)
+        columns = {(name or "").strip().lower(): name for name in (reader.fieldnames or [])}
+        if "email" not in columns:
+            raise ValueError("The staff CSV needs at least an 'email' column")
+
+        for line_number, record in enumerate(reader, start=2):
+            def value(column):
+                return (record.get(columns.get(column, ""), "") or "").strip()
+
+            row = {
+                "row": line_number,
+                "email": value("email").lower(),
+                "name": value("name"),
+                "role": value("role").lower() or "teacher",
+                "password": value("password"),
+                "error": ""
+            }
+
+            if not any([row["email"], row["name"], row["password"]]):
+                continue  # blank line
+            if "@" not in row["email"]:
+                row["error"] = "Invalid email address"
+            elif row["email"] in seen_emails:
+                row["error"] = "Duplicate email in CSV"
+            elif row["role"] not in STAFF_ROLES:
+                row["error"] = f"Unknown role: {row['role']}"
+            elif row["password"] and len(row["password"]) < 6:
+                row["error"] = "Password must be at least 6 characters"
+
+            seen_emails.add(row["email"])
+            rows.append(row)
+
+    return rows
+
+class StaffProvisioner:
+    """
+    Creates staff accounts and profiles in bulk
+
+    Accounts are created concurrently through a token bucket, backing off
+    when Firebase reports a rate limit. Profiles are then written with
+    batched commits using the administrator's token; if that is refused the
+    profiles fall back to one write each with the new account's own token.
+    """
+
+    # Give up on a row after this many rate-limited or network failures
+    MAX_ATTEMPTS = 6
+
+    def __init__(self, admin_id_token=None, workers=8, rate=10):
+        self.admin_id_token = admin_id_token
+        self.workers = workers
+        self.bucket = TokenBucket(rate)
+        self.auth_manager = AuthManager()
+        self.firestore_manager = FirestoreManager()
+
+    def provision(self, rows, progress=None):
+        """
+        Create accounts and profiles for CSV rows
+        progress: optional callback(done, total, result) called from worker threads
+        Returns: list of result dicts (see REPORT_COLUMNS) in CSV order
+        """
+        results = [self._new_result(row) for row in rows]
+        pending = [result for result in results if result["status"] == "pending"]
+        total = len(results)
+        done = [total - len(pending)]
+        done_lock = threading.Lock()
+
+        def report(result):
+            with done_lock:
+                done[0] += 1
+                count = done[0]
+            if progress:
+                progress(count, total, result)
+
+        def create(result):
+            self._create_account(result)
+            if result["status"] != "account_created":
+                report(result)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            list(pool.map(create, pending))
+
+        created = [result for result in pending if result["status"] == "account_created"]
+        self._write_profiles(created)
+        for result in created:
+            report(result)
+
+        for result in results:
+            result.pop("_id_token", None)
+        return results
+
+    def _new_result(self, row):
+        result = {
+            "row": row["row"],
+            "email": row["email"],
+            "name": row["name"],
+            "role": row["role"],
+            "status": "invalid" if row.get("error") else "pending",
+            "uid": "",
+            "password": row.get("password", ""),
+            "temporary_password": "",
+            "error": row.get("error", "")
+        }
+        if not result["error"] and not result["password"]:
+            result["password"] = result["temporary_password"] = generate_password()
+        return result
+
+    def _create_account(self, result):
+        """Sign up one account, retrying with backoff on rate limits and network errors"""
+        for attempt in range(self.MAX_ATTEMPTS):
+            self.bucket.acquire()
+            success, id_token, user_uid, error_message = self.auth_manager.sign_up(
+                result["email"], result["password"], result["role"], establish_session=False
+            )
+
+            if success:
+                result.update(status="account_created", uid=user_uid, error="", _id_token=id_token)
+                break
+
+            retryable = error_message.startswith("Network error") or any(
+                error in error_message for error in RATE_LIMIT_ERRORS
+            )
+            if not retryable:
+                result["status"] = "exists" if error_message.startswith("EMAIL_EXISTS") else "failed"
+                result["error"] = error_message
+                break
+
+            # Exponential backoff with jitter, shared by every worker through the bucket
+            delay = min(2 ** attempt, 30) + random.uniform(0, 1)
+            print(f"Sign-up for {result['email']} rate limited ({error_message}), retrying in {delay:.1f}s")
+            self.bucket.slow_down(delay)
+            result["error"] = error_message
+        else:
+            result["status"] = "failed"
+
+        # Only the uid and password matter once the profile is written
+        result["password"] = ""
+
+    def _write_profiles(self, created):
+        """Write profiles for new accounts in batched commits"""
+        if not created:
+            return
+
+        profiles = [
+            {"uid": result["uid"], "email": result["email"], "role": result["role"], "name": result["name"]}
+            for result in created
+        ]
+        outcomes = {}
+        if self.admin_id_token:
+            outcomes = {
+                uid: (success, error_message)
+                for uid, success, error_message in self.firestore_manager.create_user_profiles(
+                    self.admin_id_token, profiles
+                )
+            }
+
+        for result in created:
+            success, error_message = outcomes.get(result["uid"], (False, ""))
+            if not success:
+                # Not allowed (or no admin token): the new user writes their own profile, as in sign-up
+                success, error_message = self.firestore_manager.create_user_profile(
+                    result["_id_token"], result["uid"], result["email"], result["role"], result["name"]
+                )
+            if success:
+                result.update(status="created", error="")
+            else:
+                result.update(status="profile_failed", error=error_message)
+
+def summarize_results(results):
+    """
+    Count results by status
+    Returns: dict of status -> count
+    """
+    counts = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    return counts
+
+def write_report(results, path):
+    """Write the per-row result report as CSV"""
+    with open(path, "w", newline="", encoding="utf-8") as report_file:
+        writer = csv.DictWriter(report_file, fieldnames=REPORT_COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(results)
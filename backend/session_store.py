@@ -0,0 +1,95 @@
+import os
+import json
+
+try:
+    import keyring
+except ImportError:  # Fall back to a file only this user can read
+    keyring = None
+
+# Per-user directory for the saved session and offline data snapshots
+APP_DATA_DIR = os.path.join(os.path.expanduser("~"), ".school_system")
+
+KEYRING_SERVICE = "SchoolSystem"
+KEYRING_USERNAME = "refresh_token"
+
+class SessionStore:
+    """
+    Saved "stay signed in" session
+
+    The refresh token goes into the OS keychain when the keyring package is
+    available, otherwise into a file readable only by the current user. The
+    user's uid, role and name are kept alongside so the right dashboard can be
+    shown before the token has been exchanged.
+    """
+
+    def __init__(self, data_dir=APP_DATA_DIR):
+        self.data_dir = data_dir
+        self.session_path = os.path.join(data_dir, "session.json")
+
+    def save(self, refresh_token, user_uid, role, name="", email=""):
+        """Remember a session; returns True if it was stored"""
+        session = {"user_uid": user_uid, "role": role, "name": name, "email": email}
+
+        if keyring is not None:
+            try:
+                keyring.set_password(KEYRING_SERVICE, KEYRING_USERNAME, refresh_token)
+            except Exception as e:
+                print(f"Keychain unavailable, using a private file instead: {str(e)}")
+                session["refresh_token"] = refresh_token
+        else:
+            session["refresh_token"] = refresh_token
+
+        try:
+            os.makedirs(self.data_dir, exist_ok=True)
+            # Create the file with owner-only permissions before writing the token into it
+            fd = os.open(self.session_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as session_file:
+                # The mode only applies to a new file; tighten one left by an older version too
+                os.chmod(self.session_path, 0o600)
+                json.dump(session, session_file)
+            return True
+        except OSError as e:
+            print(f"Failed to save session: {str(e)}")
+            return False
+
+    def update_refresh_token(self, refresh_token):
+        """Store a rotated refresh token for the saved session"""
+        session = self.load()
+        if session and refresh_token and refresh_token != session["refresh_token"]:
+            self.save(refresh_token, session["user_uid"], session["role"], session["name"], session["email"])
+
+    def load(self):
+        """
+        Load the saved session
+        Returns: dict with refresh_token, user_uid, role, name and email, or None
+        """
+        try:
+            with open(self.session_path, "r") as session_file:
+                session = json.load(session_file)
+        except (OSError, ValueError):
+            return None
+
+        if not session.get("refresh_token") and keyring is not None:
+            try:
+                session["refresh_token"] = keyring.get_password(KEYRING_SERVICE, KEYRING_USERNAME)
+            except Exception as e:
+                print(f"Failed to read keychain: {str(e)}")
+
+        if not session.get("refresh_token") or not session.get("user_uid"):
+            return None
+
+        session.setdefault("name", "")
+        session.setdefault("email", "")
+        return session
+
+    def clear(self):
+        """Forget the saved session"""
+        if keyring is not None:
+            try:
+                keyring.delete_password(KEYRING_SERVICE, KEYRING_USERNAME)
+            except Exception:
+                pass
+        try:
+            os.remove(self.session_path)
+        except OSError:
+            pass
@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import stat
+import base64
+import threading
+from types import SimpleNamespace
+import requests
+from services.firebase_transport import get_transport
+from backend.session_store import APP_DATA_DIR
+
+# Public certificates Google signs Firebase ID tokens with
+CERTS_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+
+# Certificates are cached between launches for as long as Google allows, in the per-user
+# app data directory: a forged certificate there would let anyone mint their own role claims
+CERTS_CACHE_PATH = os.path.join(APP_DATA_DIR, "firebase_certs.json")
+
+# Allowed clock difference between this PC and Google, in seconds
+CLOCK_SKEW = 60
+
+_certs = {"keys": {}, "expires_at": 0}
+_certs_lock = threading.Lock()
+
+_crypto = None
+_crypto_lock = threading.Lock()
+
+def load_crypto():
+    """
+    Import the cryptography primitives used to check token signatures
+    Deferred to first use: cryptography is one of the slowest imports at start-up.
+    Returns: namespace with x509, InvalidSignature, hashes and padding, or None if it isn't installed
+    """
+    global _crypto
+    with _crypto_lock:
+        if _crypto is None:
+            try:
+                from cryptography import x509
+                from cryptography.exceptions import InvalidSignature
+                from cryptography.hazmat.primitives import hashes
+                from cryptography.hazmat.primitives.asymmetric import padding
+                _crypto = SimpleNamespace(
+                    x509=x509, InvalidSignature=InvalidSignature, hashes=hashes, padding=padding
+                )
+            except ImportError:  # Claims can't be verified without it; callers fall back to Firestore
+                _crypto = False
+        return _crypto or None
+
+def _b64decode(segment):
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+def get_signing_certs():
+    """
+    Return Google's current token signing certificates (kid -> PEM)
+    Uses the in-memory copy, then the disk cache, then the network.
+    """
+    with _certs_lock:
+        now = time.time()
+        if _certs["expires_at"] > now:
+            return _certs["keys"]
+
+        cached = _read_certs_cache()
+        if cached.get("expires_at", 0) > now:
+            _certs.update(cached)
+            return _certs["keys"]
+
+        response = get_transport().get(CERTS_URL, timeout=10)
+        response.raise_for_status()
+
+        max_age = 3600
+        for directive in response.headers.get("Cache-Control", "").split(","):
+            directive = directive.strip()
+            if directive.startswith("max-age="):
+                max_age = int(directive.split("=", 1)[1])
+
+        _certs["keys"] = response.json()
+        _certs["expires_at"] = now + max_age
+        _write_certs_cache(_certs)
+        return _certs["keys"]
+
+def _read_certs_cache():
+    """
+    The cached certificates, if the cache file is private to this user
+    Returns: {"keys": ..., "expires_at": ...}, or {} if there is no usable cache
+    """
+    try:
+        with open(CERTS_CACHE_PATH, "r") as cache_file:
+            info = os.fstat(cache_file.fileno())
+            # Ignore a file someone else could have written
+            if hasattr(os, "getuid") and (info.st_uid != os.getuid() or info.st_mode & (stat.S_IWGRP | stat.S_IWOTH)):
+                print("Ignoring token certificate cache not private to this user")
+                return {}
+            cached = json.load(cache_file)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cached, dict) or not isinstance(cached.get("keys"), dict):
+        return {}
+    return cached
+
+def _write_certs_cache(certs):
+    temp_path = f"{CERTS_CACHE_PATH}.tmp"
+    try:
+        os.makedirs(os.path.dirname(CERTS_CACHE_PATH), exist_ok=True)
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        # O_EXCL: never write through a file or link someone else left in place
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as cache_file:
+            json.dump(certs, cache_file)
+        os.replace(temp_path, CERTS_CACHE_PATH)
+    except (OSError, TypeError, ValueError) as e:
+        print(f"Could not cache token certificates: {str(e)}")
+
+def verify_id_token(id_token, project_id, expected_uid=None):
+    """
+    Decode a Firebase ID token locally, checking its signature and expiry
+    Returns: claims dict, or None if the token can't be verified here
+    """
+    crypto = load_crypto()
+    if crypto is None or not id_token or not project_id:
+        return None
+
+    try:
+        header_segment, payload_segment, signature_segment = id_token.split(".")
+        header = json.loads(_b64decode(header_segment))
+        claims = json.loads(_b64decode(payload_segment))
+
+        if header.get("alg") != "RS256":
+            return None
+
+        pem = get_signing_certs().get(header.get("kid"))
+        if not pem:
+            return None
+
+        public_key = crypto.x509.load_pem_x509_certificate(pem.encode("utf-8")).public_key()
+        public_key.verify(
+            _b64decode(signature_segment),
+            f"{header_segment}.{payload_segment}".encode("ascii"),
+            crypto.padding.PKCS1v15(),
+            crypto.hashes.SHA256()
+        )
+    except (ValueError, KeyError, crypto.InvalidSignature, requests.RequestException) as e:
+        print(f"Could not verify ID token locally: {str(e)}")
+        return None
+
+    now = time.time()
+    if claims.get("exp", 0) < now - CLOCK_SKEW or claims.get("iat", 0) > now + CLOCK_SKEW:
+        return None
+    if claims.get("aud") != project_id or claims.get("iss") != f"https://securetoken.google.com/{project_id}":
+        return None
+    if not claims.get("sub") or (expected_uid and claims["sub"] != expected_uid):
+        return None
+
+    return claims
+
+def get_profile_from_claims(id_token, project_id, user_uid):
+    """
+    Read the role and name stamped into a token's custom claims
+    Returns: profile dict like FirestoreManager.get_user_profile, or None if absent
+    """
+    claims = verify_id_token(id_token, project_id, user_uid)
+    if not claims or not claims.get("role"):
+        return None
+
+    return {
+        "email": claims.get("email", ""),
+        "role": claims.get("role", ""),
+        "name": claims.get("name", "")
+    }
@@ -1,14 +1,11 @@
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-    QStackedWidget, QTabWidget
+    QStackedWidget
 )
 from PySide6.QtCore import Qt, Signal
 from PySide6.QtGui import QFont
 
-from frontend.manage_students_view import ManageStudentsView
-from frontend.term_management_view import TermManagementView
-from frontend.assign_teachers_view import AssignTeachersView
-from frontend.reports_view import ReportsView
+from frontend.lazy_tabs import LazyTabWidget, import_view
 
 class AdminDashboard(QWidget):
     """Dashboard view for administrators"""
@@ -16,11 +13,12 @@ class AdminDashboard(QWidget):
     # Add logout signal
     logout_requested = Signal()
     
-    def __init__(self, id_token, user_uid, name=""):
+    def __init__(self, id_token, user_uid, name="", prefetched=None):
         super().__init__()
         self.id_token = id_token
         self.user_uid = user_uid
         self.user_name = name
+        self.prefetched = prefetched or {}  # Bootstrap reads, handed to each tab's view
         self.setup_ui()
     
     def setup_ui(self):
@@ -51,25 +49,34 @@ class AdminDashboard(QWidget):
         
         main_layout.addLayout(header_layout)
         
-        # Tab widget for different admin functions
-        self.tab_widget = QTabWidget()
-        
-        # Create tabs
-        self.students_tab = ManageStudentsView(self.id_token, self.user_uid)
-        self.terms_tab = TermManagementView(self.id_token, self.user_uid)
-        self.teachers_tab = AssignTeachersView(self.id_token, self.user_uid)
-        self.reports_tab = ReportsView(self.id_token, self.user_uid, is_admin=True)
-        
-        # Add tabs to widget
-        self.tab_widget.addTab(self.students_tab, "Manage Students")
-        self.tab_widget.addTab(self.teachers_tab, "Assign Teachers")
-        self.tab_widget.addTab(self.terms_tab, "Manage Terms")
-        self.tab_widget.addTab(self.reports_tab, "Reports")
+        # Tab widget for different admin functions; each tab's module is imported, and its view built and loaded, when first opened
+        self.tab_widget = LazyTabWidget()
+        self.tab_widget.add_lazy_tab("students", lambda: import_view("frontend.manage_students_view", "ManageStudentsView")(self.id_token, self.user_uid, prefetched=self.prefetched), "Manage Students")
+        self.tab_widget.add_lazy_tab("teachers", lambda: import_view("frontend.assign_teachers_view", "AssignTeachersView")(self.id_token, self.user_uid, prefetched=self.prefetched), "Assign Teachers")
+        self.tab_widget.add_lazy_tab("terms", lambda: import_view("frontend.term_management_view", "TermManagementView")(self.id_token, self.user_uid, prefetched=self.prefetched), "Manage Terms")
+        self.tab_widget.add_lazy_tab("reports", lambda: import_view("frontend.reports_view", "ReportsView")(self.id_token, self.user_uid, is_admin=True, prefetched=self.prefetched), "Reports")
+        self.tab_widget.add_lazy_tab("provision", lambda: import_view("frontend.provision_staff_view", "ProvisionStaffView")(self.id_token, self.user_uid), "Provision Staff")
         
         main_layout.addWidget(self.tab_widget)
         
         self.setLayout(main_layout)
     
+    def refresh_data(self):
+        """Reload the tabs built so far (hidden ones reload when next shown)"""
+        for view in self.tab_widget.built_views():
+            if hasattr(view, "refresh_data"):
+                view.refresh_data()
+    
+    def is_busy(self):
+        """True while a tab is doing work that logging out would cut short"""
+        provision_view = self.tab_widget.view("provision")
+        return bool(provision_view and provision_view.is_provisioning())
+    
+    def release(self):
+        """Release every tab's per-user data and background work (at logout)"""
+        self.tab_widget.release_views()
+        self.prefetched = {}
+    
     def handle_logout(self):
         """Handle logout button click"""
         self.logout_requested.emit()
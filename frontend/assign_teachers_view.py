@@ -6,15 +6,70 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
 from PySide6.QtGui import QFont
 from utils.firebase_client import FirebaseClient
+from frontend.lazy_tabs import LoadOnShowMixin
+from frontend.optimistic_rows import OptimisticRowsMixin
+from frontend.task_runner import TaskRunner
+from frontend.item_roles import DISPLAY_ROLE, FOREGROUND_ROLE, HORIZONTAL
+from services.firebase_transport import timed_operation
 import uuid
 
-class TeacherAssignmentTableModel(QAbstractTableModel):
+def assigned_year_groups(assignment):
+    """An assignment's year groups as a list (older documents store them as a string)"""
+    if "year_group_list" in assignment:
+        return assignment["year_group_list"]  # Parsed when loaded
+    year_groups = assignment.get("year_groups", [])
+    if isinstance(year_groups, str):
+        try:
+            import ast
+            year_groups = ast.literal_eval(year_groups)
+        except:
+            year_groups = [year_groups]
+    return year_groups
+
+def year_groups_text(year_groups):
+    """Standardize year groups for display"""
+    # Handle different possible formats of year_groups
+    if isinstance(year_groups, list):
+        # If it's already a list, join with commas
+        return ", ".join(str(yg) for yg in year_groups)
+    elif isinstance(year_groups, str):
+        # If it's a string that looks like a list representation, clean it up
+        if year_groups.startswith('[') and year_groups.endswith(']'):
+            try:
+                # Try to convert string representation to an actual list
+                import ast
+                parsed_groups = ast.literal_eval(year_groups)
+                if isinstance(parsed_groups, list):
+                    # Only include standardized year groups (Y7, Y8, Y9, Y10, Y11)
+                    valid_groups = [g for g in parsed_groups if g.strip() in ["Y7", "Y8", "Y9", "Y10", "Y11"]]
+                    return ", ".join(valid_groups)
+            except:
+                pass
+        # Return the string as is
+        return year_groups
+    else:
+        return "None"
+
+def find_overlap(assignments, teacher_id, subject, selected_year_groups):
+    """Year groups in selected_year_groups that the teacher is already assigned for this subject"""
+    for assignment in assignments:
+        if assignment.get("teacher_id") == teacher_id and assignment.get("subject") == subject:
+            existing_year_groups = assigned_year_groups(assignment)
+            overlap = [yg for yg in selected_year_groups if yg in existing_year_groups]
+            if overlap:
+                return overlap
+    return []
+
+class TeacherAssignmentTableModel(OptimisticRowsMixin, QAbstractTableModel):
     """Table model for teacher assignments"""
     
+    records_attr = "assignments"
+    
     def __init__(self, assignments=None):
         super().__init__()
         self.assignments = assignments or []
         self.headers = ["Teacher", "Year Groups", "Subject", "Assignment ID"]
+        self.init_optimistic_rows()
     
     def rowCount(self, parent=QModelIndex()):
         return len(self.assignments)
@@ -23,64 +78,42 @@ class TeacherAssignmentTableModel(QAbstractTableModel):
         return len(self.headers)
     
     def data(self, index, role=Qt.DisplayRole):
-        if not index.isValid() or role != Qt.DisplayRole:
+        if not index.isValid():
             return None
         
         assignment = self.assignments[index.row()]
-        col = index.column()
-        
-        if col == 0:
-            return assignment.get('teacher_name', '')
-        elif col == 1:
-            # Standardize year groups display
-            year_groups = assignment.get('year_groups', [])
-            
-            # Handle different possible formats of year_groups
-            if isinstance(year_groups, list):
-                # If it's already a list, join with commas
-                return ", ".join(str(yg) for yg in year_groups)
-            elif isinstance(year_groups, str):
-                # If it's a string that looks like a list representation, clean it up
-                if year_groups.startswith('[') and year_groups.endswith(']'):
-                    try:
-                        # Try to convert string representation to an actual list
-                        import ast
-                        parsed_groups = ast.literal_eval(year_groups)
-                        if isinstance(parsed_groups, list):
-                            # Only include standardized year groups (Y7, Y8, Y9, Y10, Y11)
-                            valid_groups = [g for g in parsed_groups if g.strip() in ["Y7", "Y8", "Y9", "Y10", "Y11"]]
-                            return ", ".join(valid_groups)
-                    except:
-                        pass
-                # Return the string as is
-                return year_groups
-            else:
-                return "None"
-        elif col == 2:
-            return assignment.get('subject', '')
-        elif col == 3:
-            return assignment.get('id', '')
+        if role == FOREGROUND_ROLE:
+            return self.pending_foreground(assignment.get('id'))
+        if role != DISPLAY_ROLE:
+            return None
         
-        return None
+        return self.cells(assignment)[index.column()]
+    
+    def make_cells(self, assignment):
+        return (
+            assignment.get('teacher_name', ''),
+            year_groups_text(assignment.get('year_groups', [])),
+            assignment.get('subject', ''),
+            assignment.get('id', '')
+        )
     
     def headerData(self, section, orientation, role=Qt.DisplayRole):
-        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+        if orientation == HORIZONTAL and role == DISPLAY_ROLE:
             return self.headers[section]
         return None
     
     def update_assignments(self, assignments):
-        self.beginResetModel()
-        self.assignments = assignments
-        self.endResetModel()
+        self.replace_records(assignments)
 
-class AssignTeachersView(QWidget):
+class AssignTeachersView(LoadOnShowMixin, QWidget):
     """View for assigning teachers to year groups and subjects"""
     
-    def __init__(self, id_token, user_uid):
+    def __init__(self, id_token, user_uid, prefetched=None):
         super().__init__()
         self.id_token = id_token
         self.user_uid = user_uid
-        self.firebase = FirebaseClient(id_token=self.id_token)
+        self.firebase = FirebaseClient(id_token=self.id_token, prefetched=prefetched)
+        self.tasks = TaskRunner(self)  # Runs Firebase calls off the GUI thread
         self.teachers = []
         self.year_groups = ["Y7", "Y8", "Y9", "Y10", "Y11"]
         self.subjects = [
@@ -96,7 +129,7 @@ class AssignTeachersView(QWidget):
             "Physics"
         ]
         self.setup_ui()
-        self.load_data()
+        self.init_load_on_show()
     
     def setup_ui(self):
         """Set up the user interface"""
@@ -165,53 +198,62 @@ class AssignTeachersView(QWidget):
         self.clear_form_button.clicked.connect(self.clear_form)
         self.delete_assignment_button.clicked.connect(self.delete_assignment)
     
+    def load_visible_data(self):
+        """Load this view's data (called when it is first shown)"""
+        self.load_data()
+    
     def load_data(self):
-        """Load teachers and assignments from Firebase"""
-        self.load_teachers()
-        self.load_assignments()
+        """Load teachers and assignments from Firebase in the background"""
+        self.tasks.submit(
+            "load_data", self.fetch_data,
+            on_success=self.on_data_loaded,
+            on_error=lambda error: QMessageBox.warning(self, "Error", f"Failed to load teachers and assignments: {error}")
+        )
     
-    def load_teachers(self):
-        """Load teachers from Firebase"""
-        try:
-            teachers = self.firebase.query_collection("users", "role", "==", "teacher")
-            
-            # Clear and add to dropdown
-            self.teacher_dropdown.clear()
-            self.teacher_dropdown.addItem("Select Teacher...")
-            
-            # Store the full teacher data
-            self.teachers = teachers
-            
-            for teacher in teachers:
-                # Add name and ID to dropdown
-                self.teacher_dropdown.addItem(teacher.get('name', ''), teacher.get('id', ''))
-        except Exception as e:
-            QMessageBox.warning(self, "Error", f"Failed to load teachers: {str(e)}")
+    @timed_operation("load_assignments_data")
+    def fetch_data(self):
+        """Worker thread: read teachers and assignments"""
+        teachers = self.firebase.query_collection("users", "role", "==", "teacher")
+        assignments = self.firebase.get_collection("teacher_assignments")
+        return teachers, assignments
     
-    def load_assignments(self):
-        """Load teacher assignments from Firebase"""
-        try:
-            assignments = self.firebase.get_collection("teacher_assignments")
-            
-            # Add teacher names for display
-            for assignment in assignments:
-                teacher_id = assignment.get('teacher_id', '')
-                
-                # Find teacher name
-                for teacher in self.teachers:
-                    if teacher.get('id') == teacher_id:
-                        assignment['teacher_name'] = teacher.get('name', '')
-                        break
-                else:
-                    assignment['teacher_name'] = f"Unknown ({teacher_id})"
-            
-            # Update the table model
-            self.assignment_model.update_assignments(assignments)
-            
-            # Adjust column widths
-            self.assignments_table.resizeColumnsToContents()
-        except Exception as e:
-            QMessageBox.warning(self, "Error", f"Failed to load assignments: {str(e)}")
+    def on_data_loaded(self, data):
+        teachers, assignments = data
+        self.show_teachers(teachers)
+        self.show_assignments(assignments)
+    
+    def show_teachers(self, teachers):
+        """Fill the teacher dropdown"""
+        # Clear and add to dropdown
+        self.teacher_dropdown.clear()
+        self.teacher_dropdown.addItem("Select Teacher...")
+        
+        # Store the full teacher data
+        self.teachers = teachers
+        
+        for teacher in teachers:
+            # Add name and ID to dropdown
+            self.teacher_dropdown.addItem(teacher.get('name', ''), teacher.get('id', ''))
+    
+    def show_assignments(self, assignments):
+        """Show teacher assignments in the table"""
+        # Add teacher names for display, and parse year groups once
+        for assignment in assignments:
+            assignment['teacher_name'] = self.teacher_name(assignment.get('teacher_id', ''))
+            assignment['year_group_list'] = assigned_year_groups(assignment)
+        
+        # Update the table model
+        self.assignment_model.update_assignments(assignments)
+        
+        # Adjust column widths
+        self.assignments_table.resizeColumnsToContents()
+    
+    def teacher_name(self, teacher_id):
+        """Name of a loaded teacher, for display"""
+        for teacher in self.teachers:
+            if teacher.get('id') == teacher_id:
+                return teacher.get('name', '')
+        return f"Unknown ({teacher_id})"
     
     def assign_teacher(self):
         """Handle assigning a teacher to year groups and subject"""
@@ -239,53 +281,76 @@ class AssignTeachersView(QWidget):
             QMessageBox.warning(self, "Input Error", "Please select a subject.")
             return
         
-        try:
-            # Check for existing assignment to avoid duplicates
-            existing_assignments = self.firebase.query_collection("teacher_assignments", "teacher_id", "==", teacher_id)
-            for assignment in existing_assignments:
-                if assignment.get("subject") == subject:
-                    # Compare year groups
-                    existing_year_groups = assignment.get("year_groups", [])
-                    
-                    # Ensure consistent format for comparison
-                    if isinstance(existing_year_groups, str):
-                        try:
-                            import ast
-                            existing_year_groups = ast.literal_eval(existing_year_groups)
-                        except:
-                            existing_year_groups = [existing_year_groups]
-                    
-                    # Check if any year group already assigned
-                    overlap = [yg for yg in selected_year_groups if yg in existing_year_groups]
-                    if overlap:
-                        QMessageBox.warning(
-                            self, 
-                            "Duplicate Assignment", 
-                            f"This teacher is already assigned to {subject} for year group(s): {', '.join(overlap)}"
-                        )
-                        return
-            
-            # Generate a unique assignment ID
-            assignment_id = str(uuid.uuid4())
-            
-            # Create the assignment in Firebase
-            assignment_data = {
-                "teacher_id": teacher_id,
-                "year_groups": selected_year_groups,  # This should be a clean array
-                "subject": subject
-            }
-            
-            self.firebase.create_document("teacher_assignments", assignment_id, assignment_data)
-            
-            # Refresh the assignments list
-            self.load_data()
-            
-            # Clear the form
-            self.clear_form()
-            
-            QMessageBox.information(self, "Success", "Teacher assigned successfully.")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to assign teacher: {str(e)}")
+        # Check the assignments already shown first, so most duplicates are caught straight away
+        overlap = find_overlap(self.assignment_model.assignments, teacher_id, subject, selected_year_groups)
+        if overlap:
+            self.show_duplicate_warning(subject, overlap)
+            return
+        
+        # Generate a unique assignment ID
+        assignment_id = str(uuid.uuid4())
+        
+        # Create the assignment in Firebase
+        assignment_data = {
+            "teacher_id": teacher_id,
+            "year_groups": selected_year_groups,  # This should be a clean array
+            "subject": subject
+        }
+        
+        # Show the assignment straight away (greyed out until the server confirms it)
+        self.assignment_model.insert_record({
+            "id": assignment_id,
+            "teacher_name": self.teacher_name(teacher_id),
+            "year_group_list": selected_year_groups,
+            **assignment_data
+        })
+        self.clear_form()
+        
+        self.tasks.submit(
+            f"assign_teacher:{assignment_id}", self.save_assignment, assignment_id, assignment_data,
+            on_success=lambda overlap: self.on_assignment_saved(assignment_id, subject, overlap),
+            on_error=lambda error: self.on_assignment_failed(assignment_id, error)
+        )
+    
+    def save_assignment(self, assignment_id, assignment_data):
+        """
+        Worker thread: create an assignment unless it duplicates one made elsewhere since loading
+        Returns: list of year groups already assigned (empty if the assignment was created)
+        """
+        # Check for existing assignment to avoid duplicates
+        existing_assignments = self.firebase.query_collection(
+            "teacher_assignments", "teacher_id", "==", assignment_data["teacher_id"]
+        )
+        overlap = find_overlap(
+            existing_assignments, assignment_data["teacher_id"],
+            assignment_data["subject"], assignment_data["year_groups"]
+        )
+        if overlap:
+            return overlap
+        
+        self.firebase.create_document("teacher_assignments", assignment_id, assignment_data)
+        return []
+    
+    def on_assignment_saved(self, assignment_id, subject, overlap):
+        if overlap:
+            self.assignment_model.remove_record(assignment_id)
+            self.show_duplicate_warning(subject, overlap)
+            return
+        
+        self.assignment_model.set_pending(assignment_id, False)
+    
+    def on_assignment_failed(self, assignment_id, error):
+        self.assignment_model.remove_record(assignment_id)
+        QMessageBox.critical(
+            self, "Error", f"Failed to assign teacher: {error}\n\nThe assignment has been removed from the list."
+        )
+    
+    def show_duplicate_warning(self, subject, overlap):
+        QMessageBox.warning(
+            self, 
+            "Duplicate Assignment", 
+            f"This teacher is already assigned to {subject} for year group(s): {', '.join(overlap)}"
+        )
     
     def delete_assignment(self):
         """Delete the selected assignment"""
@@ -301,9 +366,13 @@ class AssignTeachersView(QWidget):
         if not assignment_id:
             return
         
+        if self.assignment_model.is_pending(assignment_id):
+            QMessageBox.warning(self, "Please Wait", "This assignment is still being saved. Try again in a moment.")
+            return
+        
         # Confirm deletion
         teacher_name = self.assignment_model.assignments[row].get('teacher_name', '')
-        year_groups = self.assignment_model.assignments[row].get('year_groups', [])
+        year_groups = self.assignment_model.assignments[row].get('year_group_list', [])
         year_groups_str = ", ".join(year_groups) if year_groups else "None"
         subject = self.assignment_model.assignments[row].get('subject', '')
         
@@ -317,23 +386,16 @@ class AssignTeachersView(QWidget):
         if confirm != QMessageBox.Yes:
             return
         
-        try:
-            # Delete the assignment using the REST API
-            url = f"{self.firebase.base_url}/teacher_assignments/{assignment_id}?key={self.firebase.api_key}"
-            headers = {}
-            if self.firebase.id_token:
-                headers["Authorization"] = f"Bearer {self.firebase.id_token}"
-            
-            import requests
-            response = requests.delete(url, headers=headers)
-            response.raise_for_status()
-            
-            # Refresh the assignments list
-            self.load_data()
-            
-            QMessageBox.information(self, "Success", "Assignment deleted successfully.")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to delete assignment: {str(e)}")
+        # Remove the row now and delete the assignment using the REST API, putting it back if that fails
+        removed = self.assignment_model.remove_record(assignment_id)
+        self.tasks.submit(
+            f"delete_assignment:{assignment_id}", self.firebase.delete_document, "teacher_assignments", assignment_id,
+            on_error=lambda error: self.on_assignment_delete_failed(removed, error)
+        )
+    
+    def on_assignment_delete_failed(self, removed, error):
+        self.assignment_model.restore_record(removed)
+        QMessageBox.critical(self, "Error", f"Failed to delete assignment: {error}\n\nThe assignment has been put back.")
     
     def clear_form(self):
         """Clear the input form"""
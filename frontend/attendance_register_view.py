@@ -1,17 +1,447 @@
+from array import array
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                              QTableWidget, QTableWidgetItem, QComboBox, 
+                              QTableView, QComboBox, QStyledItemDelegate,
                               QPushButton, QDateEdit, QMessageBox, QGroupBox,
                               QGridLayout, QHeaderView)
-from PySide6.QtCore import Qt, QDate
-from utils.firebase_client import FirebaseClient
+from PySide6.QtCore import Qt, QDate, QAbstractTableModel, QModelIndex
+from utils.firebase_client import FirebaseClient, WriteConflictError
+from utils.attendance_drafts import get_draft_store
+from utils.class_rosters import assigned_year_groups, class_students_read, read_class_students
+from frontend.lazy_tabs import LoadOnShowMixin
+from frontend.task_runner import TaskRunner
+from frontend.roster_prefetch import RosterPrefetcher
+from frontend.item_roles import DISPLAY_ROLE, EDIT_ROLE, USER_ROLE, HORIZONTAL, NO_ITEM_FLAGS, READ_ONLY_FLAGS, EDITABLE_FLAGS
+from utils.student_search_index import student_display_name
+from services.firebase_transport import timed_operation
 
-class AttendanceRegisterView(QWidget):
-    def __init__(self, id_token=None, user_uid=None):
+# Attendance statuses, in the order offered by the editor; the model stores their index
+ATTENDANCE_STATUSES = ["Present", "Absent", "Late"]
+STATUS_COLUMN = 2
+NOTES_COLUMN = 3
+
+# Changes are written to the local draft this long (ms) after the last edit
+DRAFT_SAVE_DELAY_MS = 500
+
+# Grid range covering the term the date is in, as the terms collection dates it
+TERM_RANGE = "term"
+
+# What the register shows: one date, or a grid of school days (None = from the date to an end date)
+REGISTER_RANGES = [("One Day", 1), ("Week", 5), ("Fortnight", 10), ("Term", TERM_RANGE), ("Custom Range", None)]
+
+# Most school days a grid shows (about a term)
+MAX_GRID_DAYS = 70
+
+# Grid status of a student on a day with no register saved yet
+NO_REGISTER = 255
+
+def school_days(start, count=None, end=None):
+    """
+    Weekdays from the Monday of start's week (count of them), or from start to end
+    Returns: list of QDate
+    """
+    days = []
+    day = start.addDays(1 - start.dayOfWeek()) if count else start
+    while len(days) < (count or MAX_GRID_DAYS) and (end is None or day <= end):
+        if day.dayOfWeek() <= 5:
+            days.append(day)
+        day = day.addDays(1)
+    return days
+
+def term_containing(terms, date):
+    """The term whose start_date..end_date includes date ("yyyy-MM-dd"), or None (undated terms never match)"""
+    for term in terms:
+        if term.get("start_date") and term.get("end_date") and term["start_date"] <= date <= term["end_date"]:
+            return term
+    return None
+
+class StatusDelegate(QStyledItemDelegate):
+    """Dropdown editor for the status column, created only while a cell is being edited"""
+    
+    def createEditor(self, parent, option, index):
+        editor = QComboBox(parent)
+        editor.addItems(ATTENDANCE_STATUSES)
+        return editor
+    
+    def setEditorData(self, editor, index):
+        editor.setCurrentText(index.model().data(index, Qt.EditRole))
+    
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.currentText(), Qt.EditRole)
+
+class AttendanceTableModel(QAbstractTableModel):
+    """
+    Table model for an attendance register
+    
+    Rows are stored column-wise: parallel lists for ids, names, year groups and
+    notes, and a byte array of status indexes, so a large register costs a few
+    small lists rather than a widget per row. Students changed since the
+    register was last synced are tracked in dirty_ids.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.headers = ["Student Name", "Year Group", "Present", "Notes"]
+        self.student_ids = []
+        self.names = []
+        self.year_groups = []
+        self.statuses = array("B")
+        self.notes = []
+        self.dirty_ids = set()  # ids of students changed since the last sync
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.student_ids)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        
+        row = index.row()
+        col = index.column()
+        
+        if role == DISPLAY_ROLE or role == EDIT_ROLE:
+            if col == 0:
+                return self.names[row]
+            elif col == 1:
+                return self.year_groups[row]
+            elif col == STATUS_COLUMN:
+                return ATTENDANCE_STATUSES[self.statuses[row]]
+            elif col == NOTES_COLUMN:
+                return self.notes[row]
+        
+        # Store student ID in user role for reference
+        if role == USER_ROLE:
+            return self.student_ids[row]
+        
+        return None
+    
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != EDIT_ROLE:
+            return False
+        
+        row = index.row()
+        if index.column() == STATUS_COLUMN and value in ATTENDANCE_STATUSES:
+            status_index = ATTENDANCE_STATUSES.index(value)
+            if self.statuses[row] == status_index:
+                return True
+            self.statuses[row] = status_index
+        elif index.column() == NOTES_COLUMN:
+            if self.notes[row] == str(value):
+                return True
+            self.notes[row] = str(value)
+        else:
+            return False
+        
+        self.dirty_ids.add(self.student_ids[row])
+        self.dataChanged.emit(index, index)
+        return True
+    
+    def flags(self, index):
+        if not index.isValid():
+            return NO_ITEM_FLAGS
+        
+        # Only the status and notes columns are editable
+        if index.column() in (STATUS_COLUMN, NOTES_COLUMN):
+            return EDITABLE_FLAGS
+        
+        return READ_ONLY_FLAGS
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == HORIZONTAL and role == DISPLAY_ROLE:
+            return self.headers[section]
+        return None
+    
+    def load(self, students, existing_records, draft_records=None):
+        """
+        Replace the register with these students and their saved attendance
+        draft_records: unsynced changes ({student_id: record}) to show over the
+        saved attendance; those students start out dirty
+        """
+        draft_records = draft_records or {}
+        self.beginResetModel()
+        self.student_ids = []
+        self.names = []
+        self.year_groups = []
+        self.statuses = array("B")
+        self.notes = []
+        self.dirty_ids = set()
+        
+        for student in students:
+            student_id = student.get("id", "")
+            
+            # Build student name from first_name and last_name if available
+            first_name = student.get("first_name", "")
+            last_name = student.get("last_name", "")
+            if first_name or last_name:
+                student_name = f"{first_name} {last_name}".strip()
+            else:
+                # Fallback to old name field
+                student_name = student.get("name", "")
+            
+            # Set value from the draft or existing records if available
+            if student_id in draft_records:
+                record = draft_records[student_id]
+                self.dirty_ids.add(student_id)
+            else:
+                record = existing_records.get(student_id, {})
+            status = record.get("status", "Present")
+            
+            self.student_ids.append(student_id)
+            self.names.append(student_name)
+            self.year_groups.append(student.get("year_group", ""))
+            self.statuses.append(ATTENDANCE_STATUSES.index(status) if status in ATTENDANCE_STATUSES else 0)
+            self.notes.append(record.get("notes", ""))
+        
+        self.endResetModel()
+    
+    def clear(self):
+        self.load([], {})
+    
+    def set_status(self, status, rows=None):
+        """Set the status of the given rows (default: every row) with a single change signal"""
+        if not self.student_ids:
+            return
+        status_index = ATTENDANCE_STATUSES.index(status)
+        rows = range(len(self.statuses)) if rows is None else list(rows)
+        rows = [row for row in rows if self.statuses[row] != status_index]
+        if not rows:
+            return
+        for row in rows:
+            self.statuses[row] = status_index
+            self.dirty_ids.add(self.student_ids[row])
+        self.dataChanged.emit(
+            self.index(min(rows), STATUS_COLUMN),
+            self.index(max(rows), STATUS_COLUMN)
+        )
+    
+    def get_records(self):
+        """Return the register as {student_id: {"status", "notes"}}"""
+        return {
+            student_id: {"status": ATTENDANCE_STATUSES[status], "notes": notes}
+            for student_id, status, notes in zip(self.student_ids, self.statuses, self.notes)
+        }
+    
+    def get_changed_records(self):
+        """The records of students changed since the last sync, as {student_id: {"status", "notes"}}"""
+        dirty_ids = self.dirty_ids
+        return {
+            student_id: {"status": ATTENDANCE_STATUSES[status], "notes": notes}
+            for student_id, status, notes in zip(self.student_ids, self.statuses, self.notes)
+            if student_id in dirty_ids
+        }
+    
+    def mark_synced(self, sent_records):
+        """Clear the dirty flag of students whose record hasn't changed since it was sent"""
+        current = self.get_changed_records()
+        for student_id, record in current.items():
+            if sent_records.get(student_id) == record:
+                self.dirty_ids.discard(student_id)
+
+class AttendanceGridModel(QAbstractTableModel):
+    """
+    Table model for a class's attendance over several days: students x dates
+
+    Each day is a column holding a byte array of status indexes, like the
+    register's status column, with NO_REGISTER for days nobody has taken
+    attendance on yet. Editing such a day starts its register, with everyone
+    else present. Notes aren't shown; each day's are kept as loaded. Students
+    changed since the last sync are tracked per day.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.student_ids = []
+        self.names = []
+        self.dates = []         # "yyyy-MM-dd" of each day column
+        self.date_labels = []
+        self.statuses = []      # per day: array of status indexes, one per student
+        self.notes = []         # per day: {student_id: notes} as loaded
+        self.saved = []         # per day: whether its register document exists
+        self.dirty_ids = []     # per day: ids of students changed since the last sync
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.student_ids)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.dates) + 1
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        
+        row = index.row()
+        col = index.column()
+        
+        if role == DISPLAY_ROLE or role == EDIT_ROLE:
+            if col == 0:
+                return self.names[row]
+            status = self.statuses[col - 1][row]
+            return "" if status == NO_REGISTER else ATTENDANCE_STATUSES[status]
+        
+        if role == USER_ROLE:
+            return self.student_ids[row]
+        
+        return None
+    
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != EDIT_ROLE or index.column() == 0 or value not in ATTENDANCE_STATUSES:
+            return False
+        self.set_status(value, [(index.row(), index.column())])
+        return True
+    
+    def flags(self, index):
+        if not index.isValid():
+            return NO_ITEM_FLAGS
+        if index.column() == 0:
+            return READ_ONLY_FLAGS
+        return EDITABLE_FLAGS
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == HORIZONTAL and role == DISPLAY_ROLE:
+            return "Student Name" if section == 0 else self.date_labels[section - 1]
+        return None
+    
+    def load(self, students, dates, day_records, day_drafts=None):
+        """
+        Replace the grid with these students over these dates
+        day_records: each date's saved records ({student_id: record}), or None if it has no register
+        day_drafts: each date's unsynced changes ({student_id: record}) to show over
+        the saved attendance; those students start out dirty
+        """
+        day_drafts = day_drafts or [{}] * len(dates)
+        self.beginResetModel()
+        self.student_ids = [student.get("id", "") for student in students]
+        self.names = [student_display_name(student) for student in students]
+        self.dates = dates
+        self.date_labels = [QDate.fromString(date, "yyyy-MM-dd").toString("ddd d/M") for date in dates]
+        self.statuses = []
+        self.notes = []
+        self.saved = []
+        self.dirty_ids = []
+        
+        for records, draft_records in zip(day_records, day_drafts):
+            self.saved.append(records is not None)
+            if records is None and not draft_records:
+                self.statuses.append(array("B", [NO_REGISTER]) * len(self.student_ids))
+                records = {}
+            else:
+                # A draft on a day with no register has started it, with everyone else present
+                records = dict(records or {}, **draft_records)
+                statuses = array("B")
+                for student_id in self.student_ids:
+                    status = records.get(student_id, {}).get("status", "Present")
+                    statuses.append(ATTENDANCE_STATUSES.index(status) if status in ATTENDANCE_STATUSES else 0)
+                self.statuses.append(statuses)
+            self.notes.append({student_id: record.get("notes", "") for student_id, record in records.items()})
+            self.dirty_ids.append(set(draft_records) & set(self.student_ids))
+        
+        self.endResetModel()
+    
+    def clear(self):
+        self.load([], [], [])
+    
+    def set_status(self, status, cells):
+        """Set the status of (row, column) cells with a single change signal"""
+        status_index = ATTENDANCE_STATUSES.index(status)
+        changed_rows = []
+        changed_columns = []
+        for row, col in cells:
+            if col == 0:
+                continue
+            day = col - 1
+            statuses = self.statuses[day]
+            if statuses[row] == NO_REGISTER:
+                # The day's first mark starts its register, with everyone else present
+                # (saved with the day's other students, but only this one counts as changed)
+                for other_row in range(len(statuses)):
+                    statuses[other_row] = 0
+                changed_rows.extend((0, len(statuses) - 1))
+                changed_columns.append(col)
+            if statuses[row] == status_index:
+                continue
+            statuses[row] = status_index
+            self.dirty_ids[day].add(self.student_ids[row])
+            changed_rows.append(row)
+            changed_columns.append(col)
+        
+        if changed_rows:
+            self.dataChanged.emit(
+                self.index(min(changed_rows), min(changed_columns)),
+                self.index(max(changed_rows), max(changed_columns))
+            )
+    
+    def get_day_records(self, day):
+        """A day's register as {student_id: {"status", "notes"}}"""
+        notes = self.notes[day]
+        return {
+            student_id: {"status": ATTENDANCE_STATUSES[status], "notes": notes.get(student_id, "")}
+            for student_id, status in zip(self.student_ids, self.statuses[day])
+        }
+    
+    def get_changed_records(self, day):
+        """The records of students changed on a day since the last sync, as {student_id: {"status", "notes"}}"""
+        dirty_ids = self.dirty_ids[day]
+        if not dirty_ids:
+            return {}  # Also covers days with no register, which have no records yet
+        return {
+            student_id: record for student_id, record in self.get_day_records(day).items()
+            if student_id in dirty_ids
+        }
+    
+    def changed_days(self):
+        """
+        Days with changes since the last sync
+        Returns: list of (day, records, changed student ids)
+        """
+        return [
+            (day, self.get_day_records(day), sorted(dirty_ids))
+            for day, dirty_ids in enumerate(self.dirty_ids)
+            if dirty_ids
+        ]
+    
+    def merge_saved(self, day, records):
+        """
+        Take a day's register saved by someone else since the grid was loaded:
+        students not changed here get its records, changed ones keep theirs
+        """
+        statuses = self.statuses[day]
+        notes = self.notes[day]
+        dirty_ids = self.dirty_ids[day]
+        for row, student_id in enumerate(self.student_ids):
+            if student_id in dirty_ids:
+                continue
+            record = records.get(student_id, {})
+            status = record.get("status", "Present")
+            statuses[row] = ATTENDANCE_STATUSES.index(status) if status in ATTENDANCE_STATUSES else 0
+            notes[student_id] = record.get("notes", "")
+        self.saved[day] = True
+        if self.student_ids:
+            self.dataChanged.emit(self.index(0, day + 1), self.index(len(self.student_ids) - 1, day + 1))
+    
+    def mark_synced(self, sent_days):
+        """Clear the dirty flag of students whose record on a sent day hasn't changed since"""
+        for day, sent_records in sent_days:
+            self.saved[day] = True
+            current = self.get_day_records(day)
+            self.dirty_ids[day] = {
+                student_id for student_id in self.dirty_ids[day]
+                if current.get(student_id) != sent_records.get(student_id)
+            }
+
+class AttendanceRegisterView(LoadOnShowMixin, QWidget):
+    def __init__(self, id_token=None, user_uid=None, prefetched=None):
         super().__init__()
         self.id_token = id_token
         self.user_uid = user_uid
         self.setWindowTitle("Attendance Register")
-        self.firebase = FirebaseClient(id_token=self.id_token)
+        self.firebase = FirebaseClient(id_token=self.id_token, prefetched=prefetched)
+        self.tasks = TaskRunner(self)  # Runs Firebase calls off the GUI thread
+        self.drafts = get_draft_store()  # Unsynced attendance, kept on disk
+        self.prefetcher = RosterPrefetcher(self, self.firebase, self.plan_prefetch_reads, self.user_uid)
+        self.register = None  # (doc_id, subject, year_group, date, document exists) of the loaded register
+        self.grid = None  # (subject, year_group, dates) of the loaded attendance grid
         self.teacher_assignments = []  # Store teacher's subject assignments
         self.standard_year_groups = ["Y7", "Y8", "Y9", "Y10", "Y11"]  # Standard year groups matching student management
         self.initUI()
@@ -39,6 +469,17 @@ class AttendanceRegisterView(QWidget):
         year_label = QLabel("Year Group:")
         self.year_group_selector = QComboBox()
         
+        # One date, or a grid of school days
+        range_label = QLabel("Show:")
+        self.range_selector = QComboBox()
+        for range_name, day_count in REGISTER_RANGES:
+            self.range_selector.addItem(range_name, day_count)
+        end_date_label = QLabel("To:")
+        self.end_date_selector = QDateEdit()
+        self.end_date_selector.setDate(QDate.currentDate())
+        self.end_date_selector.setCalendarPopup(True)
+        self.end_date_selector.setEnabled(False)
+        
         # Add widgets to grid layout
         class_layout.addWidget(date_label, 0, 0)
         class_layout.addWidget(self.date_selector, 0, 1)
@@ -46,6 +487,10 @@ class AttendanceRegisterView(QWidget):
         class_layout.addWidget(self.subject_selector, 0, 3)
         class_layout.addWidget(year_label, 1, 0)
         class_layout.addWidget(self.year_group_selector, 1, 1)
+        class_layout.addWidget(range_label, 1, 2)
+        class_layout.addWidget(self.range_selector, 1, 3)
+        class_layout.addWidget(end_date_label, 2, 2)
+        class_layout.addWidget(self.end_date_selector, 2, 3)
         
         class_group.setLayout(class_layout)
         main_layout.addWidget(class_group)
@@ -55,67 +500,148 @@ class AttendanceRegisterView(QWidget):
         student_layout = QVBoxLayout()
         
         # Attendance table
-        self.attendance_table = QTableWidget()
-        self.attendance_table.setColumnCount(4)  # Added column for year group
-        self.attendance_table.setHorizontalHeaderLabels(["Student Name", "Year Group", "Present", "Notes"])
-        self.attendance_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
-        self.attendance_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeToContents)
+        self.attendance_model = AttendanceTableModel()
+        self.attendance_table = QTableView()
+        self.attendance_table.setModel(self.attendance_model)
+        self.attendance_model.dataChanged.connect(self.scheduleDraftSave)
+        self.attendance_table.setItemDelegateForColumn(STATUS_COLUMN, StatusDelegate(self.attendance_table))
+        self.attendance_table.setEditTriggers(
+            QTableView.DoubleClicked | QTableView.SelectedClicked | QTableView.EditKeyPressed
+        )
+        self.attendance_table.setSelectionBehavior(QTableView.SelectRows)
+        header = self.attendance_table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.Stretch)
+        header.setSectionResizeMode(1, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(STATUS_COLUMN, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(NOTES_COLUMN, QHeaderView.Stretch)
+        # Size columns from the first rows only, and keep rows one height, so big registers open and scroll quickly
+        header.setResizeContentsPrecision(50)
+        self.attendance_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         
         student_layout.addWidget(self.attendance_table)
+        
+        # Attendance grid, shown instead when several days are picked
+        self.grid_model = AttendanceGridModel()
+        self.grid_table = QTableView()
+        self.grid_table.setModel(self.grid_model)
+        self.grid_model.dataChanged.connect(self.scheduleDraftSave)
+        self.grid_table.setItemDelegate(StatusDelegate(self.grid_table))
+        self.grid_table.setEditTriggers(
+            QTableView.DoubleClicked | QTableView.SelectedClicked | QTableView.EditKeyPressed
+        )
+        grid_header = self.grid_table.horizontalHeader()
+        grid_header.setSectionResizeMode(QHeaderView.ResizeToContents)
+        grid_header.setResizeContentsPrecision(50)
+        self.grid_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.grid_table.hide()
+        student_layout.addWidget(self.grid_table)
+        
         student_group.setLayout(student_layout)
         main_layout.addWidget(student_group)
         
         # Button section
         button_layout = QHBoxLayout()
         self.load_btn = QPushButton("Load Students")
+        self.mark_all_present_btn = QPushButton("Mark All Present")
+        self.mark_selected_absent_btn = QPushButton("Mark Selected Absent")
         self.save_btn = QPushButton("Save Attendance")
         
         button_layout.addWidget(self.load_btn)
+        button_layout.addWidget(self.mark_all_present_btn)
+        button_layout.addWidget(self.mark_selected_absent_btn)
         button_layout.addWidget(self.save_btn)
         
         # Connect signals
         self.load_btn.clicked.connect(self.loadStudents)
+        self.mark_all_present_btn.clicked.connect(lambda: self.attendance_model.set_status("Present"))
+        self.mark_selected_absent_btn.clicked.connect(lambda: self.markSelected("Absent"))
         self.save_btn.clicked.connect(self.saveAttendance)
+        # A register loading for the previous date is stale once the date changes
+        self.date_selector.dateChanged.connect(lambda: self.tasks.cancel("load_register"))
+        self.date_selector.dateChanged.connect(lambda: self.tasks.cancel("load_grid"))
+        self.range_selector.currentIndexChanged.connect(self.onRangeChanged)
+        # ...and the registers worth prefetching are the new date's
+        self.date_selector.dateChanged.connect(lambda: self.prefetcher.start())
         self.subject_selector.currentTextChanged.connect(self.onSubjectChanged)
         self.year_group_selector.currentTextChanged.connect(self.onYearGroupChanged)
         
         main_layout.addLayout(button_layout)
         
-        # Load teacher's subject assignments
-        self.loadTeacherAssignments()
+        # Teacher's subject assignments are loaded when the tab is first shown
+        self.init_load_on_show()
         
+    def load_visible_data(self):
+        """Load this view's data (called when it is first shown)"""
+        self.loadTeacherAssignments()
+    
+    def plan_prefetch_reads(self, subject, year_group):
+        """The reads fetchRegister makes for a class, for the prefetcher"""
+        attendance_date = self.date_selector.date().toString('yyyy-MM-dd')
+        return [
+            class_students_read(year_group),
+            ("get_document", ("attendance", f"{year_group}_{subject}_{attendance_date}"))
+        ]
+    
+    def release(self):
+        """Keep any unsynced changes on disk, then drop the session's data (at logout)"""
+        self.save_draft()
+        super().release()
+    
+    def scheduleDraftSave(self, *args):
+        """Write the draft once edits have paused"""
+        if self.register is not None or self.grid is not None:
+            self.tasks.debounce("save_draft", DRAFT_SAVE_DELAY_MS, self.save_draft)
+    
+    def save_draft(self):
+        """
+        Write the loaded register's unsynced changes to disk (or remove its draft if there are none);
+        the grid keeps a draft per day, the same one that day's register uses
+        """
+        if self.register is not None:
+            self.drafts.save(self.user_uid, self.register[0], self.attendance_model.get_changed_records())
+        if self.grid is not None:
+            subject, year_group, dates = self.grid
+            for day, date in enumerate(dates):
+                self.drafts.save(self.user_uid, f"{year_group}_{subject}_{date}", self.grid_model.get_changed_records(day))
+    
+    def closeRegister(self):
+        """Empty the table, keeping any unsynced changes in the draft"""
+        self.save_draft()
+        self.register = None
+        self.attendance_model.clear()
+    
     def loadTeacherAssignments(self):
-        """Load the subjects and year groups assigned to this teacher"""
-        try:
-            # Debug message to verify user_uid
-            print(f"Loading assignments for teacher ID: {self.user_uid}")
-            
-            # Use query_collection_with_filters instead for more reliable Firestore queries
-            teacher_assignments = self.firebase.query_collection_with_filters(
-                "teacher_assignments", 
-                [("teacher_id", "==", self.user_uid)]
-            )
-            
-            # Enhanced debugging - print each assignment in detail
-            print(f"Found {len(teacher_assignments)} assignments for the teacher")
-            for i, assignment in enumerate(teacher_assignments):
-                print(f"Assignment {i+1}:")
-                print(f"  Subject: {assignment.get('subject')}")
-                print(f"  Year Groups (raw): {assignment.get('year_groups')}")
-                print(f"  Year Groups (type): {type(assignment.get('year_groups'))}")
-            
-            self.teacher_assignments = teacher_assignments
-            
-            # Update the subject selector
-            self.updateSubjectSelector()
-            
-            # Remove auto-selection of first subject
-            # if self.subject_selector.count() > 1:
-            #     self.subject_selector.setCurrentIndex(1)
-                
-        except Exception as e:
-            QMessageBox.warning(self, "Error", f"Failed to load teacher assignments: {str(e)}")
-            print(f"Exception in loadTeacherAssignments: {str(e)}")
+        """Load the subjects and year groups assigned to this teacher in the background"""
+        self.tasks.submit(
+            "load_assignments", self.fetchTeacherAssignments,
+            on_success=self.onTeacherAssignmentsLoaded,
+            on_error=self.onTeacherAssignmentsFailed
+        )
+    
+    def fetchTeacherAssignments(self):
+        """Worker thread: read this teacher's assignments"""
+        # Use query_collection_with_filters instead for more reliable Firestore queries
+        return self.firebase.query_collection_with_filters(
+            "teacher_assignments", 
+            [("teacher_id", "==", self.user_uid)]
+        )
+    
+    def onTeacherAssignmentsLoaded(self, teacher_assignments):
+        self.teacher_assignments = teacher_assignments
+        
+        # Update the subject selector
+        self.updateSubjectSelector()
+        
+        # Read the teacher's classes in the background, so picking one is instant
+        self.prefetcher.set_assignments(teacher_assignments, self.standard_year_groups)
+        
+        # Remove auto-selection of first subject
+        # if self.subject_selector.count() > 1:
+        #     self.subject_selector.setCurrentIndex(1)
+    
+    def onTeacherAssignmentsFailed(self, error):
+        QMessageBox.warning(self, "Error", f"Failed to load teacher assignments: {error}")
+        print(f"Exception in loadTeacherAssignments: {error}")
     
     def updateSubjectSelector(self):
         """Update subject selector with teacher's assigned subjects"""
@@ -142,50 +668,9 @@ class AttendanceRegisterView(QWidget):
         # Add a default prompt
         self.year_group_selector.addItem("-- Select Year Group --", "")
         
-        # Find all year groups for this subject in teacher's assignments
-        assigned_year_groups = set()
-        print(f"\nUpdating year groups for subject: '{subject}'")
-        
-        for assignment in self.teacher_assignments:
-            print(f"Checking assignment with subject: '{assignment.get('subject')}'")
-            
-            # Check subject match with case insensitive comparison
-            if assignment.get("subject", "").lower() == subject.lower():
-                print(f"  Subject match found!")
-                # Get year_groups from assignment and ensure consistent format
-                year_groups = assignment.get("year_groups", [])
-                print(f"  Raw year_groups: {year_groups} (type: {type(year_groups)})")
-                
-                # Handle different possible formats of year_groups
-                if isinstance(year_groups, str):
-                    try:
-                        import ast
-                        year_groups = ast.literal_eval(year_groups)
-                        print(f"  Parsed from string: {year_groups}")
-                    except Exception as e:
-                        print(f"  Failed to parse year_groups string: {e}")
-                        year_groups = [year_groups]
-                elif not isinstance(year_groups, list):
-                    year_groups = [str(year_groups)]
-                
-                print(f"  Processed year_groups: {year_groups}")
-                
-                # Add to our set of assigned year groups (standardized format)
-                for year_group in year_groups:
-                    year_group_str = str(year_group).strip().upper()
-                    # Only add if it's a valid standard year group
-                    if year_group_str in self.standard_year_groups:
-                        assigned_year_groups.add(year_group_str)
-                        print(f"  Added year group: {year_group_str}")
-                    else:
-                        print(f"  Skipped invalid year group: {year_group_str}")
-                        
-        print(f"Final assigned year groups: {assigned_year_groups}")
-        
-        # Add all assigned year groups to dropdown in standard order
-        for year_group in self.standard_year_groups:
-            if year_group in assigned_year_groups:
-                self.year_group_selector.addItem(year_group, year_group)
+        # Assigned year groups for this subject, in standard order
+        for year_group in assigned_year_groups(self.teacher_assignments, subject, self.standard_year_groups):
+            self.year_group_selector.addItem(year_group, year_group)
         
         # Auto-select first year group if available
         if self.year_group_selector.count() > 1:
@@ -193,18 +678,36 @@ class AttendanceRegisterView(QWidget):
     
     def onSubjectChanged(self, subject):
         """Handle subject selection change to work with all subject types"""
+        # A register still loading for the previous selection is stale now
+        self.tasks.cancel("load_register")
+        self.tasks.cancel("load_grid")
         if self.subject_selector.currentData():
             # Update year group selector for this subject
             self.updateYearGroupSelector(subject)
             # Clear any previously loaded students
-            self.attendance_table.setRowCount(0)
+            self.closeRegister()
+            self.closeGrid()
     
     def onYearGroupChanged(self, year_group):
+        self.tasks.cancel("load_register")
+        self.tasks.cancel("load_grid")
         # Don't auto-load students on year group change
         # if self.year_group_selector.currentData():
         #     self.loadStudents()
         pass
     
+    def onRangeChanged(self, index):
+        """Switch between the one-day register and the multi-day grid"""
+        grid_mode = self.isGridMode()
+        self.attendance_table.setVisible(not grid_mode)
+        self.grid_table.setVisible(grid_mode)
+        self.end_date_selector.setEnabled(self.range_selector.currentData() is None)
+        # Marking everyone present would start a register on every day shown
+        self.mark_all_present_btn.setEnabled(not grid_mode)
+    
+    def isGridMode(self):
+        return self.range_selector.currentData() != 1
+    
     def loadStudents(self):
         # Load students based on subject and year group
         subject = self.subject_selector.currentData()
@@ -212,169 +715,364 @@ class AttendanceRegisterView(QWidget):
         
         if not subject or not year_group:
             return
-            
+        
+        if self.isGridMode():
+            self.loadGrid(subject, year_group)
+            return
+        
+        self.closeGrid()
+        self.closeRegister()
+        self.prefetcher.expire()
+        attendance_date = self.date_selector.date().toString('yyyy-MM-dd')
+        self.tasks.submit(
+            "load_register", self.fetchRegister, subject, year_group, attendance_date,
+            on_success=lambda register: self.onRegisterLoaded(subject, year_group, attendance_date, register),
+            on_error=self.onRegisterFailed
+        )
+    
+    @timed_operation("load_attendance_register")
+    def fetchRegister(self, subject, year_group, attendance_date):
+        """
+        Worker thread: read the students taking a subject and any saved attendance
+        Returns: (students, existing_records, document exists), with
+        existing_records None if the year group has no students, or None for
+        an invalid year group
+        """
+        class_students = self.fetchClassStudents(subject, year_group)
+        if class_students is None:
+            return None
+        found, filtered_students = class_students
+        if not found:
+            return [], None, False
+        
+        # Format attendance document ID consistently
+        attendance_doc_id = f"{year_group}_{subject}_{attendance_date}"
+        
+        # Load existing attendance records if any
+        existing_attendance = None
         try:
-            self.attendance_table.setRowCount(0)
-            
-            # Standardize year group format for querying
-            standardized_year_group = year_group.strip().upper()
-            if standardized_year_group not in self.standard_year_groups:
-                print(f"Invalid year group format: {year_group}")
-                return
-                
-            # Use exact year group match to ensure consistency with student management
-            students = self.firebase.query_collection_with_filters(
-                "students", 
-                [("year_group", "==", standardized_year_group)]
+            existing_attendance = self.firebase.get_document("attendance", attendance_doc_id)
+        except Exception as e:
+            print(f"No existing attendance found: {str(e)}")
+        
+        existing_records = existing_attendance.get("records", {}) if existing_attendance else {}
+        
+        return filtered_students, existing_records, existing_attendance is not None
+    
+    def fetchClassStudents(self, subject, year_group):
+        """
+        Worker thread: read the students in a year group who take a subject
+        Returns: (whether the year group has any students, students taking the
+        subject), or None for an invalid year group
+        """
+        # Standardize year group format for querying
+        standardized_year_group = year_group.strip().upper()
+        if standardized_year_group not in self.standard_year_groups:
+            print(f"Invalid year group format: {year_group}")
+            return None
+        
+        students, filtered_students = read_class_students(self.firebase, subject, standardized_year_group)
+        return bool(students), filtered_students
+    
+    def onRegisterLoaded(self, subject, year_group, attendance_date, register):
+        """Fill the register table, restoring any changes that were never synced"""
+        if register is None:
+            return
+        filtered_students, existing_records, exists = register
+        if existing_records is None:
+            QMessageBox.information(self, "No Students", f"No students found for year group {year_group}")
+            return
+        
+        # Rank this class higher at this time of the week, and read again what was just used
+        self.prefetcher.record_use(subject, year_group)
+        self.prefetcher.start()
+        
+        doc_id = f"{year_group}_{subject}_{attendance_date}"
+        self.register = (doc_id, subject, year_group, attendance_date, exists)
+        self.attendance_model.load(filtered_students, existing_records, self.drafts.load(self.user_uid, doc_id))
+        
+        restored = len(self.attendance_model.dirty_ids)
+        if restored:
+            QMessageBox.information(
+                self,
+                "Unsaved Changes Restored",
+                f"Attendance changes for {restored} student(s) that were never saved have been restored. "
+                "Press Save Attendance to send them."
             )
-            
-            if not students:
-                print(f"No students found for year group: {year_group}")
+    
+    def closeGrid(self):
+        """Empty the grid, keeping any unsynced changes in the drafts"""
+        self.save_draft()
+        self.grid = None
+        self.grid_model.clear()
+    
+    def gridDates(self):
+        """
+        The school days picked for the grid, as "yyyy-MM-dd" strings, or None
+        for the term range (found from the terms when the grid is read)
+        """
+        start = self.date_selector.date()
+        day_count = self.range_selector.currentData()
+        if day_count == TERM_RANGE:
+            return None
+        if day_count is None:
+            days = school_days(start, end=self.end_date_selector.date())
+        else:
+            days = school_days(start, day_count)
+        return [day.toString("yyyy-MM-dd") for day in days]
+    
+    def loadGrid(self, subject, year_group):
+        """Load the class's attendance for every day in the picked range"""
+        dates = self.gridDates()
+        if dates == []:
+            QMessageBox.warning(self, "Warning", "There are no school days between the dates picked")
+            return
+        
+        self.closeRegister()
+        self.closeGrid()
+        self.prefetcher.expire()
+        attendance_date = self.date_selector.date().toString("yyyy-MM-dd")
+        self.tasks.submit(
+            "load_grid", self.fetchGrid, subject, year_group, dates or attendance_date,
+            on_success=lambda grid: self.onGridLoaded(subject, year_group, attendance_date, grid),
+            on_error=self.onRegisterFailed
+        )
+    
+    def fetchTermDates(self, attendance_date):
+        """Worker thread: the school days of the term a date is in, or [] if no term includes it"""
+        term = term_containing(self.firebase.get_collection("terms"), attendance_date)
+        if term is None:
+            return []
+        days = school_days(
+            QDate.fromString(term["start_date"], "yyyy-MM-dd"),
+            end=QDate.fromString(term["end_date"], "yyyy-MM-dd")
+        )
+        return [day.toString("yyyy-MM-dd") for day in days]
+    
+    @timed_operation("load_attendance_grid")
+    def fetchGrid(self, subject, year_group, dates):
+        """
+        Worker thread: read the class and every day's register in one batch
+        dates: "yyyy-MM-dd" strings, or one such date to show its whole term
+        Returns: (students, dates, each date's records or None), with dates []
+        if no term includes the date, or None for an invalid year group
+        """
+        class_students = self.fetchClassStudents(subject, year_group)
+        if class_students is None:
+            return None
+        found, filtered_students = class_students
+        if not found:
+            return [], [], None
+        if isinstance(dates, str):
+            dates = self.fetchTermDates(dates)
+            if not dates:
+                return filtered_students, [], None
+        
+        documents = self.firebase.batch_get_documents(
+            "attendance", [f"{year_group}_{subject}_{date}" for date in dates]
+        )
+        day_records = []
+        for date in dates:
+            document = documents.get(f"{year_group}_{subject}_{date}")
+            day_records.append(document.get("records", {}) if document else None)
+        return filtered_students, dates, day_records
+    
+    def onGridLoaded(self, subject, year_group, attendance_date, grid):
+        """Fill the attendance grid, restoring any changes that were never synced"""
+        if grid is None:
+            return
+        filtered_students, dates, day_records = grid
+        if day_records is None:
+            if dates == []:
+                QMessageBox.warning(self, "Warning", f"No term with start and end dates includes {attendance_date}")
+            else:
                 QMessageBox.information(self, "No Students", f"No students found for year group {year_group}")
-                return
-                
-            print(f"Found {len(students)} students for year group {year_group}")
-            
-            # Debug - print each student and their subjects
-            for student in students:
-                print(f"Student: {student.get('name')}, Year: {student.get('year_group')}, Subjects: {student.get('subjects')}")
-            
-            # Filter students by subject
-            filtered_students = []
-            for student in students:
-                student_subjects = student.get("subjects", [])
-                
-                # Enhanced handling of different subject formats
-                clean_subjects = []
-                
-                # Case 1: It's already a clean list of strings
-                if isinstance(student_subjects, list):
-                    clean_subjects = [str(s).strip() for s in student_subjects]
-                    
-                # Case 2: It's a string representation of a list
-                elif isinstance(student_subjects, str):
-                    # Check if it looks like a Python list representation
-                    if student_subjects.startswith('[') and student_subjects.endswith(']'):
-                        try:
-                            import ast
-                            # Use ast.literal_eval to safely parse the string to a list
-                            parsed_subjects = ast.literal_eval(student_subjects)
-                            if isinstance(parsed_subjects, list):
-                                clean_subjects = [str(s).strip() for s in parsed_subjects]
-                            else:
-                                clean_subjects = [student_subjects.strip()]
-                        except Exception as e:
-                            print(f"Error parsing subjects: {e}")
-                            # If parsing fails, treat as a single string
-                            clean_subjects = [s.strip() for s in student_subjects.split(",")]
-                    else:
-                        # It's a regular comma-separated string
-                        clean_subjects = [s.strip() for s in student_subjects.split(",")]
-                
-                # Print clean subjects for debugging
-                print(f"Looking for subject '{subject}' in cleaned subjects: {clean_subjects}")
-                
-                # Case-insensitive comparison with clean subjects
-                if any(s.lower() == subject.lower() for s in clean_subjects):
-                    filtered_students.append(student)
-            
-            print(f"After filtering: {len(filtered_students)} students taking {subject}")
-            
-            # Format attendance document ID consistently
-            attendance_date = self.date_selector.date().toString('yyyy-MM-dd')
-            attendance_doc_id = f"{year_group}_{subject}_{attendance_date}"
-            
-            # Load existing attendance records if any
-            existing_attendance = None
-            try:
-                existing_attendance = self.firebase.get_document("attendance", attendance_doc_id)
-            except Exception as e:
-                print(f"No existing attendance found: {str(e)}")
-            
-            existing_records = existing_attendance.get("records", {}) if existing_attendance else {}
-            
-            for i, student in enumerate(filtered_students):
-                self.attendance_table.insertRow(i)
-                
-                # Build student name from first_name and last_name if available
-                first_name = student.get("first_name", "")
-                last_name = student.get("last_name", "")
-                
-                if first_name or last_name:
-                    student_name = f"{first_name} {last_name}".strip()
-                else:
-                    # Fallback to old name field
-                    student_name = student.get("name", "")
-                
-                name_item = QTableWidgetItem(student_name)
-                name_item.setData(Qt.UserRole, student.get("id", ""))
-                self.attendance_table.setItem(i, 0, name_item)
-                
-                # Year group - ensure consistent format
-                year_group_item = QTableWidgetItem(student.get("year_group", ""))
-                self.attendance_table.setItem(i, 1, year_group_item)
-                
-                # Present/absent dropdown
-                present_combo = QComboBox()
-                present_combo.addItems(["Present", "Absent", "Late"])
-                
-                # Set value from existing records if available
-                student_id = student.get("id", "")
-                if student_id in existing_records:
-                    status = existing_records[student_id].get("status", "Present")
-                    index = present_combo.findText(status)
-                    if index >= 0:
-                        present_combo.setCurrentIndex(index)
-                
-                self.attendance_table.setCellWidget(i, 2, present_combo)
-                
-                # Notes
-                notes_text = ""
-                if student_id in existing_records:
-                    notes_text = existing_records[student_id].get("notes", "")
-                notes_item = QTableWidgetItem(notes_text)
-                self.attendance_table.setItem(i, 3, notes_item)
-            
-            # Resize columns to fit content
-            self.attendance_table.resizeColumnsToContents()
-            self.attendance_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
-            
-        except Exception as e:
-            QMessageBox.warning(self, "Error", f"Failed to load students: {str(e)}")
-            print(f"Exception in loadStudents: {str(e)}, type: {type(e)}")
+            return
+        
+        self.prefetcher.record_use(subject, year_group)
+        self.prefetcher.start()
+        
+        self.grid = (subject, year_group, dates)
+        day_drafts = [self.drafts.load(self.user_uid, f"{year_group}_{subject}_{date}") for date in dates]
+        self.grid_model.load(filtered_students, dates, day_records, day_drafts)
+        
+        restored = sum(len(dirty_ids) for dirty_ids in self.grid_model.dirty_ids)
+        if restored:
+            QMessageBox.information(
+                self,
+                "Unsaved Changes Restored",
+                f"{restored} attendance change(s) that were never saved have been restored. "
+                "Press Save Attendance to send them."
+            )
+    
+    def markSelected(self, status):
+        """Give every selected student (or, in the grid, every selected day) the same status"""
+        if self.isGridMode():
+            cells = [(index.row(), index.column()) for index in self.grid_table.selectionModel().selectedIndexes()]
+            self.grid_model.set_status(status, cells)
+            return
+        rows = sorted({index.row() for index in self.attendance_table.selectionModel().selectedRows()})
+        self.attendance_model.set_status(status, rows)
+    
+    def onRegisterFailed(self, error):
+        QMessageBox.warning(self, "Error", f"Failed to load students: {error}")
+        print(f"Exception in loadStudents: {error}")
     
     def saveAttendance(self):
-        # Save attendance using REST API
-        selected_date = self.date_selector.date().toString("yyyy-MM-dd")
-        subject = self.subject_selector.currentData()
-        year_group = self.year_group_selector.currentData()
+        """Send the students changed since the last sync (everyone, for a new register)"""
+        if self.isGridMode():
+            self.saveGrid()
+            return
+        if self.register is None:
+            QMessageBox.warning(self, "Warning", "Please load the students for a subject and year group first")
+            return
+        doc_id, subject, year_group, selected_date, exists = self.register
         
-        if not subject or not year_group:
-            QMessageBox.warning(self, "Warning", "Please select a subject and year group first")
+        changed_records = self.attendance_model.get_changed_records()
+        if exists and not changed_records:
+            QMessageBox.information(self, "Up to Date", "There are no attendance changes to save")
             return
-            
+        
+        attendance_data = {
+            "subject": subject,
+            "year_group": year_group,
+            "date": selected_date,
+            "records": self.attendance_model.get_records()
+        }
+        # A new register is written whole; an existing one only gets the changed students
+        changed_ids = list(changed_records) if exists else None
+        
+        # On disk before it goes out, in case the app closes mid-sync
+        self.save_draft()
+        self.save_btn.setEnabled(False)
+        self.tasks.submit(
+            f"save_attendance:{doc_id}", self.writeAttendance, doc_id, attendance_data, changed_ids,
+            on_success=lambda result: self.onAttendanceSaved(doc_id, attendance_data["records"], changed_ids),
+            on_error=self.onAttendanceSaveFailed
+        )
+    
+    @timed_operation("save_attendance")
+    def writeAttendance(self, doc_id, attendance_data, changed_ids):
+        """Worker thread: write an attendance document, or just the changed students' records"""
+        if changed_ids is None:
+            return self.firebase.create_document("attendance", doc_id, attendance_data)
+        return self.firebase.update_document_fields(
+            "attendance", doc_id, attendance_data,
+            [("records", student_id) for student_id in changed_ids]
+        )
+    
+    def onAttendanceSaved(self, doc_id, sent_records, changed_ids):
+        self.save_btn.setEnabled(True)
+        
+        # Edits made while the save was in flight stay dirty (and in the draft)
+        if self.register is not None and self.register[0] == doc_id:
+            self.register = self.register[:4] + (True,)
+            self.attendance_model.mark_synced(sent_records)
+            self.save_draft()
+        else:
+            # The register was closed meanwhile; its draft may still hold what was just sent
+            draft = self.drafts.load(self.user_uid, doc_id)
+            self.drafts.save(self.user_uid, doc_id, {
+                student_id: record for student_id, record in draft.items()
+                if sent_records.get(student_id) != record
+            })
+        
+        count = len(sent_records) if changed_ids is None else len(changed_ids)
+        QMessageBox.information(self, "Success", f"Attendance saved successfully ({count} student(s) updated)")
+    
+    def saveGrid(self):
+        """Send every changed day of the grid in one commit"""
+        if self.grid is None:
+            QMessageBox.warning(self, "Warning", "Please load the students for a subject and year group first")
+            return
+        grid = self.grid
+        subject, year_group, dates = grid
+        
+        changed_days = self.grid_model.changed_days()
+        if not changed_days:
+            QMessageBox.information(self, "Up to Date", "There are no attendance changes to save")
+            return
+        
+        changes = []
+        for day, records, changed_ids in changed_days:
+            date = dates[day]
+            attendance_data = {"subject": subject, "year_group": year_group, "date": date, "records": records}
+            if self.grid_model.saved[day]:
+                field_paths = [("records", student_id) for student_id in changed_ids]
+            else:
+                # A new register is written with everyone on it and the fields that describe it;
+                # the commit only creates it if nobody else has meanwhile
+                field_paths = [("subject",), ("year_group",), ("date",)] + [
+                    ("records", student_id) for student_id in records
+                ]
+            changes.append((f"{year_group}_{subject}_{date}", attendance_data, field_paths))
+        
+        # On disk before it goes out, in case the app closes mid-sync
+        self.save_draft()
+        self.save_btn.setEnabled(False)
+        self.tasks.submit(
+            f"save_attendance_grid:{year_group}_{subject}", self.writeGrid, changes,
+            on_success=lambda created: self.onGridSaved(grid, changed_days, created),
+            on_error=self.onGridSaveFailed
+        )
+    
+    @timed_operation("save_attendance_grid")
+    def writeGrid(self, changes):
+        """
+        Worker thread: write the changed students of every changed day
+        Returns: the registers someone else created meanwhile ({doc_id: document}),
+        if the commit was stopped by them; nothing was written then
+        """
         try:
-            # Format document ID consistently with loadStudents
-            doc_id = f"{year_group}_{subject}_{selected_date}"
-            
-            attendance_data = {
-                "subject": subject,
-                "year_group": year_group,
-                "date": selected_date,
-                "records": {}
-            }
-            
-            for row in range(self.attendance_table.rowCount()):
-                student_id = self.attendance_table.item(row, 0).data(Qt.UserRole)
-                status = self.attendance_table.cellWidget(row, 2).currentText()
-                notes = self.attendance_table.item(row, 3).text()
-                
-                attendance_data["records"][student_id] = {
-                    "status": status,
-                    "notes": notes
-                }
-            
-            self.firebase.create_document("attendance", doc_id, attendance_data)
-            QMessageBox.information(self, "Success", "Attendance saved successfully")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to save attendance: {str(e)}")
+            self.firebase.commit_document_changes("attendance", changes)
+        except WriteConflictError as e:
+            if not e.created:
+                raise
+            return e.created
+        return {}
+    
+    def onGridSaved(self, grid, changed_days, created):
+        self.save_btn.setEnabled(True)
+        subject, year_group, dates = grid
+        if created:
+            if self.grid is not grid:
+                self.onGridSaveFailed("another teacher saved the same register meanwhile")
+                return
+            # Take the other teacher's register for the students not changed here, then send ours over it
+            for day, date in enumerate(dates):
+                document = created.get(f"{year_group}_{subject}_{date}")
+                if document is not None:
+                    self.grid_model.merge_saved(day, document.get("records", {}))
+            self.saveGrid()
+            return
+        
+        # Edits made while the save was in flight stay dirty (and in the drafts)
+        if self.grid is grid:
+            self.grid_model.mark_synced([(day, records) for day, records, changed_ids in changed_days])
+            self.save_draft()
+        else:
+            # The grid was closed meanwhile; the drafts may still hold what was just sent
+            for day, records, changed_ids in changed_days:
+                doc_id = f"{year_group}_{subject}_{dates[day]}"
+                draft = self.drafts.load(self.user_uid, doc_id)
+                self.drafts.save(self.user_uid, doc_id, {
+                    student_id: record for student_id, record in draft.items()
+                    if records.get(student_id) != record
+                })
+        QMessageBox.information(self, "Success", f"Attendance saved successfully for {len(changed_days)} day(s)")
+    
+    def onGridSaveFailed(self, error):
+        self.save_btn.setEnabled(True)
+        QMessageBox.critical(
+            self, "Error",
+            f"Failed to save attendance: {error}\n\n"
+            "Your changes are kept on this computer and will be restored when you open these registers again."
+        )
+    
+    def onAttendanceSaveFailed(self, error):
+        self.save_btn.setEnabled(True)
+        QMessageBox.critical(
+            self, "Error",
+            f"Failed to save attendance: {error}\n\n"
+            "Your changes are kept on this computer and will be restored when you open this register again."
+        )
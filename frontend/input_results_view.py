@@ -1,11 +1,42 @@
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QPushButton, QTableView, QTableWidget, QTableWidgetItem,
     QHBoxLayout, QComboBox, QMessageBox, QFormLayout, QSpinBox,
-    QGridLayout, QGroupBox, QHeaderView, QStyledItemDelegate
+    QGridLayout, QGroupBox, QHeaderView, QStyledItemDelegate, QApplication
 )
 from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
-from PySide6.QtGui import QFont
+from PySide6.QtGui import QFont, QKeySequence, QShortcut
 from utils.firebase_client import FirebaseClient
+from utils.class_rosters import assigned_year_groups, class_students_read, read_class_students
+from frontend.lazy_tabs import LoadOnShowMixin
+from frontend.task_runner import TaskRunner
+from frontend.row_diff import reconcile_rows
+from frontend.roster_prefetch import RosterPrefetcher
+from frontend.item_roles import DISPLAY_ROLE, EDIT_ROLE, USER_ROLE, HORIZONTAL, NO_ITEM_FLAGS, READ_ONLY_FLAGS, EDITABLE_FLAGS
+from utils.student_search_index import student_display_name
+from services.firebase_transport import timed_operation
+
+# Result category shown in each grade column, from column 3 on
+GRADE_CATEGORIES = ["current_grade", "target_grade", "homework", "behaviour", "punctuality"]  # Were "achievement" and "target"
+
+def previous_term(terms, term_id):
+    """
+    The term that ended most recently before another one starts, going by their dates
+    Returns: (previous term or None, terms without dates that couldn't be placed)
+    """
+    others = [term for term in terms if term.get('id') != term_id]
+    undated = [term for term in others if not (term.get('start_date') and term.get('end_date'))]
+    current = next((term for term in terms if term.get('id') == term_id), None)
+    if current is None or not current.get('start_date'):
+        return None, undated
+    
+    # yyyy-MM-dd dates compare correctly as text
+    earlier = [
+        term for term in others
+        if term not in undated and term['end_date'] <= current['start_date']
+    ]
+    if not earlier:
+        return None, undated
+    return max(earlier, key=lambda term: (term['end_date'], term['start_date'])), undated
 
 class GradeDelegate(QStyledItemDelegate):
     """Delegate for grade columns in results table to provide dropdowns"""
@@ -46,19 +77,21 @@ class ResultsTableModel(QAbstractTableModel):
     
     def __init__(self, students=None):
         super().__init__()
-        self.students = students or []
+        self.students = list(students or [])
         self.headers = ["ID", "Name", "Year Group", "Current Grade", "Target Grade", "Homework", "Behaviour", "Punctuality"]
         self.grades = ["1", "2", "3", "4", "5", "6", "7", "8", "9"]  # Numeric grades
         
+        # ID, name and year group text of each student, worked out once when loaded
+        self.student_cells = {student.get('id', ''): self._make_cells(student) for student in self.students}
+        
         # Clear all previous results to avoid data from previous subjects interfering
         self.results = {}
         
         # Initialize default grade of "1" for every student for all categories
-        categories = ["current_grade", "target_grade", "homework", "behaviour", "punctuality"]
         for student in self.students:
             student_id = student.get('id', '')
             if student_id:
-                self.results[student_id] = {category: "1" for category in categories}
+                self.results[student_id] = {category: "1" for category in GRADE_CATEGORIES}
     
     def rowCount(self, parent=QModelIndex()):
         return len(self.students)
@@ -74,30 +107,19 @@ class ResultsTableModel(QAbstractTableModel):
         col = index.column()
         student = self.students[row]
         
-        if role == Qt.DisplayRole:
-            if col == 0:
-                return student.get('id', '')
-            elif col == 1:
-                # Build student name from first_name and last_name if available
-                first_name = student.get('first_name', '')
-                last_name = student.get('last_name', '')
-                
-                if first_name or last_name:
-                    return f"{first_name} {last_name}".strip()
-                else:
-                    # Fallback to old name field
-                    return student.get('name', '')
-            elif col == 2:
-                return student.get('year_group', '')
-            elif col >= 3 and col <= 7:  # Grade columns
+        if role == DISPLAY_ROLE:
+            if col <= 2:
+                cells = self.student_cells.get(student.get('id', ''))
+                return (cells or self._make_cells(student))[col]
+            elif col <= 7:  # Grade columns
                 student_id = student.get('id', '')
                 if student_id in self.results:
-                    category = self._get_category_for_column(col)
+                    category = GRADE_CATEGORIES[col - 3]
                     return self.results[student_id].get(category, "1")
                 return "1"  # Default grade
                 
         # Store student ID in user role for reference
-        if role == Qt.UserRole:
+        if role == USER_ROLE:
             return student.get('id', '')
             
         return None
@@ -106,7 +128,7 @@ class ResultsTableModel(QAbstractTableModel):
         if not index.isValid() or index.column() < 3 or index.column() > 7:
             return False
             
-        if role == Qt.EditRole:
+        if role == EDIT_ROLE:
             student_id = self.students[index.row()].get('id', '')
             category = self._get_category_for_column(index.column())
             
@@ -123,47 +145,53 @@ class ResultsTableModel(QAbstractTableModel):
     
     def flags(self, index):
         if not index.isValid():
-            return Qt.NoItemFlags
+            return NO_ITEM_FLAGS
             
         # Make only the grade columns editable
         if index.column() >= 3 and index.column() <= 7:
-            return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
+            return EDITABLE_FLAGS
             
-        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        return READ_ONLY_FLAGS
     
     def headerData(self, section, orientation, role=Qt.DisplayRole):
-        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+        if orientation == HORIZONTAL and role == DISPLAY_ROLE:
             return self.headers[section]
         return None
     
     def update_students(self, students):
         """Update the model with student data and set default grade of 1"""
-        self.beginResetModel()
-        self.students = students
+        old_results = self.results
         
         # Clear all previous results to avoid data from previous subjects interfering
         self.results = {}
         
         # Initialize default grade of "1" for every student for all categories
-        categories = ["current_grade", "target_grade", "homework", "behaviour", "punctuality"]
-        for student in self.students:
+        for student in students:
             student_id = student.get('id', '')
             if student_id:
-                self.results[student_id] = {category: "1" for category in categories}
-                
-        self.endResetModel()
+                self.results[student_id] = {category: "1" for category in GRADE_CATEGORIES}
+        
+        # Rows being removed may still be asked for their text until the diff has gone through
+        new_cells = {student.get('id', ''): self._make_cells(student) for student in students}
+        self.student_cells.update(new_cells)
+        
+        # Only rows that came, went or now show different details or grades are updated
+        reconcile_rows(
+            self, self.students, students, key=lambda student: student.get('id', ''),
+            changed=lambda old, new: old != new or old_results.get(new.get('id', '')) != self.results.get(new.get('id', ''))
+        )
+        self.student_cells = new_cells
     
     def set_existing_results(self, results_data):
         """Load existing results data and reset missing grades to 1"""
         # Initialize with defaults for all students
-        categories = ["current_grade", "target_grade", "homework", "behaviour", "punctuality"]
         self.results = {}
         
         for student in self.students:
             student_id = student.get('id', '')
             if student_id:
                 # Initialize with default grades
-                self.results[student_id] = {category: "1" for category in categories}
+                self.results[student_id] = {category: "1" for category in GRADE_CATEGORIES}
                 
                 # Update with existing data if available
                 if student_id in results_data:
@@ -181,7 +209,7 @@ class ResultsTableModel(QAbstractTableModel):
                             self.results[student_id]["target_grade"] = student_results["target"]
                         
                         # Also handle current naming if present
-                        for category in categories:
+                        for category in GRADE_CATEGORIES:
                             if category in student_results:
                                 self.results[student_id][category] = student_results[category]
                 
@@ -194,34 +222,122 @@ class ResultsTableModel(QAbstractTableModel):
         """Return the current results dictionary"""
         return self.results
     
+    def set_grades(self, changes):
+        """
+        Set many grades in one pass, with a single change signal for the lot
+        changes: (row, column, grade) for each cell; cells outside the grade
+        columns and values that aren't grades are skipped
+        Returns: number of cells whose grade changed
+        """
+        changed_rows = []
+        changed_columns = []
+        for row, col, grade in changes:
+            category = self._get_category_for_column(col)
+            grade = str(grade).strip()
+            if category is None or not 0 <= row < len(self.students) or grade not in self.grades:
+                continue
+            student_results = self.results.setdefault(self.students[row].get('id', ''), {})
+            if student_results.get(category, "1") == grade:
+                continue
+            student_results[category] = grade
+            changed_rows.append(row)
+            changed_columns.append(col)
+        
+        # One range over every changed cell, rather than a repaint per cell
+        if changed_rows:
+            self.dataChanged.emit(
+                self.index(min(changed_rows), min(changed_columns)),
+                self.index(max(changed_rows), max(changed_columns)),
+                [DISPLAY_ROLE, EDIT_ROLE]
+            )
+        return len(changed_rows)
+    
+    def apply_grade(self, indexes, grade):
+        """Give every selected grade cell the same grade"""
+        return self.set_grades((index.row(), index.column(), grade) for index in indexes)
+    
+    def fill_down(self, indexes):
+        """
+        Copy the top selected grade in each column to the selected cells below it
+        A single selected cell in a column is filled from the cell above it.
+        """
+        rows_by_column = {}
+        for index in indexes:
+            rows_by_column.setdefault(index.column(), []).append(index.row())
+        
+        changes = []
+        for col, rows in rows_by_column.items():
+            rows.sort()
+            source_row = rows[0] if len(rows) > 1 else rows[0] - 1
+            if source_row < 0:
+                continue
+            grade = self.data(self.index(source_row, col), DISPLAY_ROLE)
+            changes.extend((row, col, grade) for row in rows if row != source_row)
+        return self.set_grades(changes)
+    
+    def paste_block(self, top_row, left_column, text):
+        """
+        Paste tab-separated rows of grades (as copied from a spreadsheet) with
+        their top left cell at (top_row, left_column)
+        Returns: (number of cells changed, number of values that couldn't be pasted)
+        """
+        changes = []
+        skipped = 0
+        for row_offset, line in enumerate(text.splitlines()):
+            for col_offset, value in enumerate(line.split("\t")):
+                value = value.strip()
+                if not value:
+                    continue
+                row = top_row + row_offset
+                col = left_column + col_offset
+                if row >= len(self.students) or self._get_category_for_column(col) is None or value not in self.grades:
+                    skipped += 1
+                    continue
+                changes.append((row, col, value))
+        return self.set_grades(changes), skipped
+    
+    def copy_targets(self, previous_results):
+        """
+        Set each student's target grade to the one saved for them in another term
+        Returns: number of students who had a target grade there
+        """
+        col = 3 + GRADE_CATEGORIES.index("target_grade")
+        changes = []
+        for row, student in enumerate(self.students):
+            student_results = previous_results.get(student.get('id', ''))
+            if isinstance(student_results, dict):
+                # Older documents call it "target"
+                target = student_results.get("target_grade", student_results.get("target"))
+                if target:
+                    changes.append((row, col, target))
+        self.set_grades(changes)
+        return len(changes)
+    
+    def _make_cells(self, student):
+        """ID, name and year group text for a student"""
+        return (student.get('id', ''), student_display_name(student), student.get('year_group', ''))
+    
     def _get_category_for_column(self, column):
         """Map column index to category name"""
-        if column == 3:
-            return "current_grade"  # Changed from "achievement"
-        elif column == 4:
-            return "target_grade"   # Changed from "target"
-        elif column == 5:
-            return "homework"
-        elif column == 6:
-            return "behaviour"
-        elif column == 7:
-            return "punctuality"
+        if 0 <= column - 3 < len(GRADE_CATEGORIES):
+            return GRADE_CATEGORIES[column - 3]
         return None
 
-class InputResultsView(QWidget):
+class InputResultsView(LoadOnShowMixin, QWidget):
     """View for inputting student results"""
     
-    def __init__(self, id_token, user_uid):
+    def __init__(self, id_token, user_uid, prefetched=None):
         super().__init__()
         self.id_token = id_token
         self.user_uid = user_uid
-        self.firebase = FirebaseClient(id_token=self.id_token)
+        self.firebase = FirebaseClient(id_token=self.id_token, prefetched=prefetched)
+        self.tasks = TaskRunner(self)  # Runs Firebase calls off the GUI thread
+        self.prefetcher = RosterPrefetcher(self, self.firebase, self.plan_prefetch_reads, self.user_uid)
         self.teacher_assignments = []  # Store teacher's subject assignments
         self.standard_year_groups = ["Y7", "Y8", "Y9", "Y10", "Y11"]  # Standard year groups matching student management
         self.terms = []  # Store available terms
         self.setup_ui()
-        self.loadTeacherAssignments()
-        self.loadTerms()  # Load terms from Firebase
+        self.init_load_on_show()
     
     def setup_ui(self):
         """Set up the user interface"""
@@ -275,7 +391,9 @@ class InputResultsView(QWidget):
         
         # Set up table view properties
         self.results_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.results_table.setSelectionBehavior(QTableView.SelectRows)
+        # Cells rather than whole rows are selected, so bulk edits can target a block of grades
+        self.results_table.setSelectionBehavior(QTableView.SelectItems)
+        self.results_table.setSelectionMode(QTableView.ExtendedSelection)
         
         # Add the grade delegate for all grade columns
         grade_delegate = GradeDelegate(self.results_table)
@@ -287,6 +405,43 @@ class InputResultsView(QWidget):
         
         main_layout.addWidget(self.results_table)
         
+        # Bulk editing of the selected grade cells
+        bulk_group = QGroupBox("Bulk Edit")
+        bulk_layout = QHBoxLayout()
+        
+        self.bulk_grade_selector = QComboBox()
+        self.bulk_grade_selector.addItems(self.results_model.grades)
+        bulk_layout.addWidget(QLabel("Grade:"))
+        bulk_layout.addWidget(self.bulk_grade_selector)
+        
+        apply_button = QPushButton("Apply to Selection")
+        apply_button.clicked.connect(self.apply_grade_to_selection)
+        bulk_layout.addWidget(apply_button)
+        
+        fill_down_button = QPushButton("Fill Down")
+        fill_down_button.setToolTip("Copy the top selected grade down each column (Ctrl+D)")
+        fill_down_button.clicked.connect(self.fill_down)
+        bulk_layout.addWidget(fill_down_button)
+        
+        paste_button = QPushButton("Paste")
+        paste_button.setToolTip("Paste grades copied from a spreadsheet at the selected cell (Ctrl+V)")
+        paste_button.clicked.connect(self.paste_grades)
+        bulk_layout.addWidget(paste_button)
+        
+        self.copy_targets_button = QPushButton("Copy Last Term's Targets")
+        self.copy_targets_button.clicked.connect(self.copy_last_term_targets)
+        bulk_layout.addWidget(self.copy_targets_button)
+        
+        bulk_layout.addStretch()
+        bulk_group.setLayout(bulk_layout)
+        main_layout.addWidget(bulk_group)
+        
+        # Spreadsheet shortcuts while the table has focus
+        for key, slot in ((QKeySequence.Paste, self.paste_grades), (QKeySequence("Ctrl+D"), self.fill_down)):
+            shortcut = QShortcut(key, self.results_table)
+            shortcut.setContext(Qt.WidgetWithChildrenShortcut)
+            shortcut.activated.connect(slot)
+        
         # Save button
         self.save_button = QPushButton("Save Results")
         self.save_button.clicked.connect(self.save_results)
@@ -299,64 +454,88 @@ class InputResultsView(QWidget):
         self.year_group_selector.currentTextChanged.connect(self.onYearGroupChanged)
         self.term_dropdown.currentIndexChanged.connect(self.onTermChanged)
     
+    def load_visible_data(self):
+        """Load this view's data (called when it is first shown)"""
+        self.loadTeacherAssignments()
+        self.loadTerms()
+    
+    def plan_prefetch_reads(self, subject, year_group):
+        """The reads fetchStudents makes for a class, for the prefetcher"""
+        reads = [class_students_read(year_group)]
+        term_id = self.term_dropdown.currentData()
+        if term_id:
+            reads.append(("get_document", ("results", f"{term_id}_{year_group}_{subject}")))
+        return reads
+    
     def loadTerms(self):
-        """Load academic terms from Firebase"""
-        try:
-            # Get terms from Firebase
-            self.terms = self.firebase.get_collection("terms")
-            print(f"Loaded {len(self.terms)} terms from database")
-            
-            # Clear and populate the dropdown
-            self.term_dropdown.clear()
-            self.term_dropdown.addItem("-- Select Term --", "")
-            
-            # Sort terms by year (recent first)
-            sorted_terms = sorted(self.terms, key=lambda x: (x.get('year', ''), x.get('name', '')), reverse=True)
-            
-            # Add each term to the dropdown
-            for term in sorted_terms:
-                term_id = term.get('id', '')
-                term_name = term.get('name', '')
-                term_year = term.get('year', '')
-                display_text = f"{term_name} {term_year}"
-                self.term_dropdown.addItem(display_text, term_id)
-                
-            # Auto-select the first term if available
-            if self.term_dropdown.count() > 1:
-                self.term_dropdown.setCurrentIndex(1)
-                
-        except Exception as e:
-            QMessageBox.warning(self, "Error", f"Failed to load terms: {str(e)}")
-            print(f"Exception in loadTerms: {str(e)}")
+        """Load academic terms from Firebase in the background"""
+        self.tasks.submit(
+            "load_terms", self.firebase.get_collection, "terms",
+            on_success=self.onTermsLoaded,
+            on_error=self.onTermsFailed
+        )
+    
+    def onTermsLoaded(self, terms):
+        """Populate the term dropdown"""
+        self.terms = terms
+        print(f"Loaded {len(self.terms)} terms from database")
+        
+        # Clear and populate the dropdown
+        self.term_dropdown.clear()
+        self.term_dropdown.addItem("-- Select Term --", "")
+        
+        # Sort terms by year (recent first)
+        sorted_terms = sorted(self.terms, key=lambda x: (x.get('year', ''), x.get('name', '')), reverse=True)
+        
+        # Add each term to the dropdown
+        for term in sorted_terms:
+            term_id = term.get('id', '')
+            term_name = term.get('name', '')
+            term_year = term.get('year', '')
+            display_text = f"{term_name} {term_year}"
+            self.term_dropdown.addItem(display_text, term_id)
+            
+        # Auto-select the first term if available
+        if self.term_dropdown.count() > 1:
+            self.term_dropdown.setCurrentIndex(1)
+        
+        # Saved results can be prefetched now the term is known
+        self.prefetcher.start()
+    
+    def onTermsFailed(self, error):
+        QMessageBox.warning(self, "Error", f"Failed to load terms: {error}")
+        print(f"Exception in loadTerms: {error}")
     
     def loadTeacherAssignments(self):
-        """Load the subjects and year groups assigned to this teacher"""
-        try:
-            # Debug message to verify user_uid
-            print(f"Loading assignments for teacher ID: {self.user_uid}")
-            
-            # Use query_collection_with_filters to get assignments
-            teacher_assignments = self.firebase.query_collection_with_filters(
-                "teacher_assignments", 
-                [("teacher_id", "==", self.user_uid)]
-            )
-            
-            # Debug - print found assignments
-            print(f"Found {len(teacher_assignments)} assignments for the teacher")
-            for i, assignment in enumerate(teacher_assignments):
-                print(f"Assignment {i+1}:")
-                print(f"  Subject: {assignment.get('subject')}")
-                print(f"  Year Groups (raw): {assignment.get('year_groups')}")
-                print(f"  Year Groups (type): {type(assignment.get('year_groups'))}")
-            
-            self.teacher_assignments = teacher_assignments
-            
-            # Update the subject selector
-            self.updateSubjectSelector()
-            
-        except Exception as e:
-            QMessageBox.warning(self, "Error", f"Failed to load teacher assignments: {str(e)}")
-            print(f"Exception in loadTeacherAssignments: {str(e)}")
+        """Load the subjects and year groups assigned to this teacher in the background"""
+        self.tasks.submit(
+            "load_assignments", self.fetchTeacherAssignments,
+            on_success=self.onTeacherAssignmentsLoaded,
+            on_error=self.onTeacherAssignmentsFailed
+        )
+    
+    def fetchTeacherAssignments(self):
+        """Worker thread: read this teacher's assignments"""
+        # Use query_collection_with_filters to get assignments
+        teacher_assignments = self.firebase.query_collection_with_filters(
+            "teacher_assignments", 
+            [("teacher_id", "==", self.user_uid)]
+        )
+        
+        return teacher_assignments
+    
+    def onTeacherAssignmentsLoaded(self, teacher_assignments):
+        self.teacher_assignments = teacher_assignments
+        
+        # Update the subject selector
+        self.updateSubjectSelector()
+        
+        # Read the teacher's classes in the background, so picking one is instant
+        self.prefetcher.set_assignments(teacher_assignments, self.standard_year_groups)
+    
+    def onTeacherAssignmentsFailed(self, error):
+        QMessageBox.warning(self, "Error", f"Failed to load teacher assignments: {error}")
+        print(f"Exception in loadTeacherAssignments: {error}")
     
     def updateSubjectSelector(self):
         """Update subject selector with teacher's assigned subjects"""
@@ -383,53 +562,15 @@ class InputResultsView(QWidget):
         # Add a default prompt
         self.year_group_selector.addItem("-- Select Year Group --", "")
         
-        # Find all year groups for this subject in teacher's assignments
-        assigned_year_groups = set()
-        print(f"\nUpdating year groups for subject: '{subject}'")
-        
-        for assignment in self.teacher_assignments:
-            print(f"Checking assignment with subject: '{assignment.get('subject')}'")
-            
-            # Check subject match with case insensitive comparison
-            if assignment.get("subject", "").lower() == subject.lower():
-                print(f"  Subject match found!")
-                # Get year_groups from assignment and ensure consistent format
-                year_groups = assignment.get("year_groups", [])
-                print(f"  Raw year_groups: {year_groups} (type: {type(year_groups)})")
-                
-                # Handle different possible formats of year_groups
-                if isinstance(year_groups, str):
-                    try:
-                        import ast
-                        year_groups = ast.literal_eval(year_groups)
-                        print(f"  Parsed from string: {year_groups}")
-                    except Exception as e:
-                        print(f"  Failed to parse year_groups string: {e}")
-                        year_groups = [year_groups]
-                elif not isinstance(year_groups, list):
-                    year_groups = [str(year_groups)]
-                
-                print(f"  Processed year_groups: {year_groups}")
-                
-                # Add to our set of assigned year groups (standardized format)
-                for year_group in year_groups:
-                    year_group_str = str(year_group).strip().upper()
-                    # Only add if it's a valid standard year group
-                    if year_group_str in self.standard_year_groups:
-                        assigned_year_groups.add(year_group_str)
-                        print(f"  Added year group: {year_group_str}")
-                    else:
-                        print(f"  Skipped invalid year group: {year_group_str}")
-                        
-        print(f"Final assigned year groups: {assigned_year_groups}")
-        
-        # Add all assigned year groups to dropdown in standard order
-        for year_group in self.standard_year_groups:
-            if year_group in assigned_year_groups:
-                self.year_group_selector.addItem(year_group, year_group)
+        # Assigned year groups for this subject, in standard order
+        for year_group in assigned_year_groups(self.teacher_assignments, subject, self.standard_year_groups):
+            self.year_group_selector.addItem(year_group, year_group)
     
     def onSubjectChanged(self, subject):
         """Handle subject selection change"""
+        # Whatever was loading belongs to the previous selection
+        self.tasks.cancel("load_students")
+        self.tasks.cancel("check_results")
         if self.subject_selector.currentData():
             # Update year group selector for this subject
             self.updateYearGroupSelector(subject)
@@ -438,17 +579,27 @@ class InputResultsView(QWidget):
             
             # Try to load students immediately if a year group is already selected
             if self.year_group_selector.currentData() and self.term_dropdown.currentData():
-                self.load_students(auto_triggered=True)
+                self.scheduleAutoLoad()
 
     def onYearGroupChanged(self, year_group):
         """Handle year group selection change"""
+        self.tasks.cancel("load_students")
+        self.tasks.cancel("check_results")
         # If a year group is selected and a subject is selected, load students
         if (self.year_group_selector.currentData() and self.subject_selector.currentData() 
             and self.term_dropdown.currentData()):
-            self.load_students(auto_triggered=True)
+            self.scheduleAutoLoad()
+    
+    def scheduleAutoLoad(self):
+        """Load students once the selectors have stopped changing"""
+        # Repopulating the year group box fires several changes in a row; only the last one loads
+        self.tasks.debounce("load_students", 250, lambda: self.load_students(auto_triggered=True))
 
     def onTermChanged(self, index):
         """Handle term selection change"""
+        # The saved results worth prefetching are this term's
+        self.prefetcher.start()
+        
         # Skip if no valid selection or if required fields aren't selected
         if index <= 0 or not self.subject_selector.currentData() or not self.year_group_selector.currentData():
             return
@@ -459,8 +610,15 @@ class InputResultsView(QWidget):
         term_name = self.term_dropdown.currentText()
         
         # Check if results already exist for this combination
-        existing_results = self.check_existing_results(subject, year_group, term_id)
-        
+        self.tasks.submit(
+            "check_results", self.check_existing_results, subject, year_group, term_id,
+            on_success=lambda existing_results: self.onExistingResultsChecked(
+                subject, year_group, term_name, existing_results
+            )
+        )
+    
+    def onExistingResultsChecked(self, subject, year_group, term_name, existing_results):
+        """Apply saved results for the selected term, or reset to default grades"""
         if existing_results:
             # Inform user that results exist and will be loaded
             QMessageBox.information(
@@ -481,11 +639,7 @@ class InputResultsView(QWidget):
             for student in self.results_model.students:
                 student_id = student.get('id', '')
                 if student_id:
-                    self.results_model.results[student_id] = {
-                        category: "1" for category in [
-                            "current_grade", "target_grade", "homework", "behaviour", "punctuality"
-                        ]
-                    }
+                    self.results_model.results[student_id] = {category: "1" for category in GRADE_CATEGORIES}
                     
             # Refresh the table display
             if self.results_model.students:
@@ -495,7 +649,7 @@ class InputResultsView(QWidget):
                 )
     
     def check_existing_results(self, subject, year_group, term_id):
-        """Check if results exist for the given subject, year group and term"""
+        """Check if results exist for the given subject, year group and term (blocking; runs on a worker)"""
         if not subject or not year_group or not term_id:
             return None
             
@@ -531,100 +685,204 @@ class InputResultsView(QWidget):
         term_id = self.term_dropdown.currentData()
         term_display = self.term_dropdown.currentText()
         
-        try:
-            # Standardize year group format for querying
-            standardized_year_group = year_group.strip().upper()
-            if standardized_year_group not in self.standard_year_groups:
-                print(f"Invalid year group format: {year_group}")
+        # Standardize year group format for querying
+        standardized_year_group = year_group.strip().upper()
+        if standardized_year_group not in self.standard_year_groups:
+            print(f"Invalid year group format: {year_group}")
+            return
+        
+        # The loaded students replace the results check for the term
+        self.tasks.cancel("check_results")
+        self.prefetcher.expire()
+        self.tasks.submit(
+            "load_students", self.fetchStudents, subject, standardized_year_group, year_group, term_id,
+            on_success=lambda loaded: self.onStudentsLoaded(
+                subject, year_group, term_id, term_display, auto_triggered, loaded
+            ),
+            on_error=lambda error: self.onStudentsFailed(auto_triggered, error)
+        )
+    
+    @timed_operation("load_results_students")
+    def fetchStudents(self, subject, standardized_year_group, year_group, term_id):
+        """
+        Worker thread: read the year group, keep students taking the subject
+        and read any results already saved for the term
+        Returns: (students found in the year group, students taking the subject, existing results)
+        """
+        students, filtered_students = read_class_students(self.firebase, subject, standardized_year_group)
+        if not students:
+            return 0, [], None
+        
+        if not filtered_students:
+            return len(students), [], None
+            
+        # Check for existing results using our helper method
+        existing_results = self.check_existing_results(subject, year_group, term_id)
+        return len(students), filtered_students, existing_results
+    
+    def onStudentsLoaded(self, subject, year_group, term_id, term_display, auto_triggered, loaded):
+        """Show loaded students and any saved results"""
+        student_count, filtered_students, existing_results = loaded
+        
+        # Rank this class higher at this time of the week, and read again what was just used
+        self.prefetcher.record_use(subject, year_group)
+        self.prefetcher.start()
+        
+        if not student_count:
+            if not auto_triggered:
+                QMessageBox.information(self, "No Students", f"No students found for year group {year_group}")
+            return
+        
+        if not filtered_students:
+            if not auto_triggered:
+                QMessageBox.information(self, "No Students", f"No students found in {year_group} taking {subject}")
+            return
+        
+        # Update the results model with the filtered students
+        self.results_model.update_students(filtered_students)
+        
+        # Load existing results if available
+        if existing_results:
+            self.results_model.set_existing_results(existing_results)
+            # Inform the user we're loading saved results, but only if not auto-triggered
+            if not auto_triggered:
+                QMessageBox.information(
+                    self, 
+                    "Existing Results Loaded", 
+                    f"Previously saved results for {subject}, {year_group} in {term_display} have been loaded."
+                )
+        else:
+            # Otherwise, the update_students method will have set default grade "1"
+            if not auto_triggered:  # Only show message when explicitly clicked
+                QMessageBox.information(
+                    self, 
+                    "Students Loaded", 
+                    f"Loaded {len(filtered_students)} students for {subject}, {year_group}.\n\n"
+                    f"No existing results found for {term_display if term_id else 'the selected term'}.\n\n"
+                    "Default grades of '1' have been applied. Adjust as needed and save."
+                )
+    
+    def onStudentsFailed(self, auto_triggered, error):
+        if not auto_triggered:  # Only show errors for explicit user actions
+            QMessageBox.warning(self, "Error", f"Failed to load students: {error}")
+        print(f"Exception in load_students: {error}")
+    
+    def selected_grade_cells(self):
+        """Selected cells in the grade columns, or None (after a warning) if there are none"""
+        indexes = [
+            index for index in self.results_table.selectionModel().selectedIndexes()
+            if self.results_model._get_category_for_column(index.column()) is not None
+        ]
+        if not indexes:
+            QMessageBox.warning(self, "No Selection", "Please select one or more grade cells.")
+            return None
+        return indexes
+    
+    def apply_grade_to_selection(self):
+        """Give every selected grade cell the grade chosen in the bulk edit box"""
+        indexes = self.selected_grade_cells()
+        if indexes:
+            self.results_model.apply_grade(indexes, self.bulk_grade_selector.currentText())
+    
+    def fill_down(self):
+        """Copy the top selected grade down each selected column"""
+        indexes = self.selected_grade_cells()
+        if indexes:
+            self.results_model.fill_down(indexes)
+    
+    def paste_grades(self):
+        """Paste a block of grades from the clipboard, starting at the selected cell"""
+        text = QApplication.clipboard().text()
+        if not text.strip():
+            return
+        indexes = self.selected_grade_cells()
+        if not indexes:
+            return
+        
+        # A single copied grade goes into every selected cell, as in a spreadsheet
+        if "\t" not in text.strip() and "\n" not in text.strip():
+            if text.strip() not in self.results_model.grades:
+                QMessageBox.warning(self, "Invalid Grade", f"'{text.strip()}' is not a grade.")
                 return
-                
-            students = self.firebase.query_collection_with_filters(
-                "students", 
-                [("year_group", "==", standardized_year_group)]
+            self.results_model.apply_grade(indexes, text.strip())
+            return
+        
+        top_row = min(index.row() for index in indexes)
+        left_column = min(index.column() for index in indexes)
+        changed, skipped = self.results_model.paste_block(top_row, left_column, text)
+        if skipped:
+            QMessageBox.warning(
+                self,
+                "Paste Incomplete",
+                f"{skipped} value(s) were not pasted because they fell outside the grade columns "
+                f"or are not grades from {self.results_model.grades[0]} to {self.results_model.grades[-1]}."
             )
-            
-            if not students:
-                print(f"No students found for year group: {year_group}")
-                if not auto_triggered:
-                    QMessageBox.information(self, "No Students", f"No students found for year group {year_group}")
-                return
-                
-            print(f"Found {len(students)} students for year group {year_group}")
-            
-            # Filter students by subject
-            filtered_students = []
-            for student in students:
-                student_subjects = student.get("subjects", [])
-                
-                # Enhanced handling of different subject formats
-                clean_subjects = []
-                
-                # Case 1: It's already a clean list of strings
-                if isinstance(student_subjects, list):
-                    clean_subjects = [str(s).strip() for s in student_subjects]
-                    
-                # Case 2: It's a string representation of a list
-                elif isinstance(student_subjects, str):
-                    # Check if it looks like a Python list representation
-                    if student_subjects.startswith('[') and student_subjects.endswith(']'):
-                        try:
-                            import ast
-                            # Use ast.literal_eval to safely parse the string to a list
-                            parsed_subjects = ast.literal_eval(student_subjects)
-                            if isinstance(parsed_subjects, list):
-                                clean_subjects = [str(s).strip() for s in parsed_subjects]
-                            else:
-                                clean_subjects = [student_subjects.strip()]
-                        except Exception as e:
-                            print(f"Error parsing subjects: {e}")
-                            # If parsing fails, treat as a single string
-                            clean_subjects = [s.strip() for s in student_subjects.split(",")]
-                    else:
-                        # It's a regular comma-separated string
-                        clean_subjects = [s.strip() for s in student_subjects.split(",")]
-                
-                # Case-insensitive comparison with clean subjects
-                if any(s.lower() == subject.lower() for s in clean_subjects):
-                    filtered_students.append(student)
-            
-            print(f"After filtering: {len(filtered_students)} students taking {subject}")
-            
-            if not filtered_students:
-                if not auto_triggered:
-                    QMessageBox.information(self, "No Students", f"No students found in {year_group} taking {subject}")
+    
+    def copy_last_term_targets(self):
+        """Fill in target grades from the results saved for the previous term"""
+        subject = self.subject_selector.currentData()
+        year_group = self.year_group_selector.currentData()
+        if not self.results_model.students:
+            QMessageBox.warning(self, "No Students", "Please load students first.")
+            return
+        
+        term_id = self.term_dropdown.currentData()
+        if not term_id:
+            QMessageBox.warning(self, "Selection Error", "Please select a term.")
+            return
+        current = next((term for term in self.terms if term.get('id') == term_id), {})
+        if not current.get('start_date'):
+            QMessageBox.warning(
+                self, "Term Dates Missing",
+                f"{self.term_dropdown.currentText()} has no start date, so the term before it isn't known. "
+                "Add its dates under Manage Terms."
+            )
+            return
+        
+        previous, undated = previous_term(self.terms, term_id)
+        if previous is None:
+            QMessageBox.warning(self, "No Previous Term", "There is no term that ended before the selected one started.")
+            return
+        previous_term_id = previous.get('id', '')
+        previous_term_name = f"{previous.get('name', '')} {previous.get('year', '')}"
+        
+        if undated:
+            # One of these might be the real previous term
+            names = ", ".join(f"{term.get('name', '')} {term.get('year', '')}" for term in undated)
+            confirm = QMessageBox.question(
+                self, "Term Dates Missing",
+                f"These terms have no dates and were not considered: {names}.\n\n"
+                f"Copy target grades from {previous_term_name}?",
+                QMessageBox.Yes | QMessageBox.No
+            )
+            if confirm != QMessageBox.Yes:
                 return
-                
-            # Check for existing results using our helper method
-            existing_results = self.check_existing_results(subject, year_group, term_id)
-            
-            # Update the results model with the filtered students
-            self.results_model.update_students(filtered_students)
-            
-            # Load existing results if available
-            if existing_results:
-                self.results_model.set_existing_results(existing_results)
-                # Inform the user we're loading saved results, but only if not auto-triggered
-                if not auto_triggered:
-                    QMessageBox.information(
-                        self, 
-                        "Existing Results Loaded", 
-                        f"Previously saved results for {subject}, {year_group} in {term_display} have been loaded."
-                    )
-            else:
-                # Otherwise, the update_students method will have set default grade "1"
-                if not auto_triggered:  # Only show message when explicitly clicked
-                    QMessageBox.information(
-                        self, 
-                        "Students Loaded", 
-                        f"Loaded {len(filtered_students)} students for {subject}, {year_group}.\n\n"
-                        f"No existing results found for {term_display if term_id else 'the selected term'}.\n\n"
-                        "Default grades of '1' have been applied. Adjust as needed and save."
-                    )
-            
-        except Exception as e:
-            if not auto_triggered:  # Only show errors for explicit user actions
-                QMessageBox.warning(self, "Error", f"Failed to load students: {str(e)}")
-            print(f"Exception in load_students: {str(e)}, type: {type(e)}")
+        
+        self.copy_targets_button.setEnabled(False)
+        self.tasks.submit(
+            "copy_targets", self.check_existing_results, subject, year_group, previous_term_id,
+            on_success=lambda previous_results: self.onPreviousTargetsLoaded(previous_term_name, previous_results),
+            on_error=self.onPreviousTargetsFailed
+        )
+    
+    def onPreviousTargetsLoaded(self, previous_term_name, previous_results):
+        self.copy_targets_button.setEnabled(True)
+        copied = self.results_model.copy_targets(previous_results) if previous_results else 0
+        if not copied:
+            QMessageBox.information(
+                self, "No Targets", f"No target grades were saved for this class in {previous_term_name}."
+            )
+        elif copied < len(self.results_model.students):
+            QMessageBox.information(
+                self,
+                "Targets Copied",
+                f"Copied target grades for {copied} of {len(self.results_model.students)} students from {previous_term_name}."
+            )
+    
+    def onPreviousTargetsFailed(self, error):
+        self.copy_targets_button.setEnabled(True)
+        QMessageBox.warning(self, "Error", f"Failed to load last term's targets: {error}")
+        print(f"Exception in copy_last_term_targets: {error}")
     
     def save_results(self):
         """Handle saving student results"""
@@ -645,31 +903,44 @@ class InputResultsView(QWidget):
             QMessageBox.warning(self, "No Results", "No grades have been entered yet.")
             return
             
-        try:
-            # Format a document ID for results - using a consistent format for easy retrieval
-            results_doc_id = f"{term_id}_{year_group}_{subject}"
-            
-            # Prepare data to save
-            data_to_save = {
-                "term_id": term_id,
-                "year_group": year_group,
-                "subject": subject,
-                "teacher_id": self.user_uid,
-                "student_results": results_data,
-                "timestamp": self.firebase.get_server_timestamp(),
-                "term_name": self.term_dropdown.currentText()
-            }
-            
-            # Save to Firebase
-            self.firebase.create_document("results", results_doc_id, data_to_save)
-            
-            # Show success message with details
-            QMessageBox.information(
-                self, 
-                "Success", 
-                f"Grades saved successfully!\n\nSubject: {subject}\nYear Group: {year_group}\nTerm: {term_display}"
-            )
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to save results: {str(e)}")
-            print(f"Exception in save_results: {str(e)}")
+        # Format a document ID for results - using a consistent format for easy retrieval
+        results_doc_id = f"{term_id}_{year_group}_{subject}"
+        
+        # Prepare data to save
+        data_to_save = {
+            "term_id": term_id,
+            "year_group": year_group,
+            "subject": subject,
+            "teacher_id": self.user_uid,
+            "student_results": results_data,
+            "timestamp": self.firebase.get_server_timestamp(),
+            "term_name": self.term_dropdown.currentText()
+        }
+        
+        # Save to Firebase
+        self.save_button.setEnabled(False)
+        self.tasks.submit(
+            f"save_results:{results_doc_id}", self.writeResults, results_doc_id, data_to_save,
+            on_success=lambda result: self.onResultsSaved(subject, year_group, term_display),
+            on_error=self.onResultsSaveFailed
+        )
+    
+    @timed_operation("save_results")
+    def writeResults(self, results_doc_id, data_to_save):
+        """Worker thread: write the results document"""
+        return self.firebase.create_document("results", results_doc_id, data_to_save)
+    
+    def onResultsSaved(self, subject, year_group, term_display):
+        self.save_button.setEnabled(True)
+        
+        # Show success message with details
+        QMessageBox.information(
+            self, 
+            "Success", 
+            f"Grades saved successfully!\n\nSubject: {subject}\nYear Group: {year_group}\nTerm: {term_display}"
+        )
+    
+    def onResultsSaveFailed(self, error):
+        self.save_button.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"Failed to save results: {error}")
+        print(f"Exception in save_results: {error}")
@@ -0,0 +1,14 @@
+from PySide6.QtCore import Qt
+
+# Qt enum values for table models, looked up once. Reading a member off Qt
+# takes microseconds in PySide6, and data() and flags() run for every cell
+# on every repaint, so the models compare against these instead.
+DISPLAY_ROLE = Qt.DisplayRole
+EDIT_ROLE = Qt.EditRole
+USER_ROLE = Qt.UserRole
+FOREGROUND_ROLE = Qt.ForegroundRole
+HORIZONTAL = Qt.Horizontal
+
+NO_ITEM_FLAGS = Qt.NoItemFlags
+READ_ONLY_FLAGS = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+EDITABLE_FLAGS = Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
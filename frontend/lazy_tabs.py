@@ -0,0 +1,100 @@
+import importlib
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QTabWidget
+from PySide6.QtCore import QTimer
+
+def import_view(module_name, class_name):
+    """Import a view class when its tab is first built, keeping the module off the start-up path"""
+    return getattr(importlib.import_module(module_name), class_name)
+
+class LoadOnShowMixin:
+    """
+    Defers a view's data load until the view is first shown
+
+    Views call init_load_on_show() in __init__ instead of loading straight
+    away, and implement load_visible_data(). The load runs just after the
+    view is shown, so it paints first. refresh_data() reloads immediately if
+    the view is visible, otherwise the next time it is shown.
+    """
+
+    def init_load_on_show(self):
+        self.data_loaded = False
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self.data_loaded:
+            self.data_loaded = True
+            QTimer.singleShot(0, self.load_visible_data)
+
+    def refresh_data(self):
+        """Reload now if visible, otherwise when next shown"""
+        if self.isVisible():
+            self.data_loaded = True
+            self.load_visible_data()
+        else:
+            self.data_loaded = False
+
+    def release(self):
+        """Cancel outstanding work and drop the session's cached data (at logout)"""
+        tasks = getattr(self, "tasks", None)
+        if tasks is not None:
+            tasks.cancel_all()
+        prefetcher = getattr(self, "prefetcher", None)
+        if prefetcher is not None:
+            prefetcher.cancel()
+        firebase = getattr(self, "firebase", None)
+        if firebase is not None:
+            firebase.release()
+
+class LazyTabWidget(QTabWidget):
+    """Tab widget that only constructs a tab's view the first time it is selected"""
+
+    def __init__(self):
+        super().__init__()
+        self._factories = {}  # key -> callable returning the view
+        self._pages = {}      # key -> placeholder page
+        self._views = {}      # key -> constructed view
+        self.currentChanged.connect(self._build_current)
+
+    def add_lazy_tab(self, key, factory, label):
+        """Add a tab whose view is created by factory() on first selection"""
+        page = QWidget()
+        layout = QVBoxLayout(page)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self._factories[key] = factory
+        self._pages[key] = page
+        self.addTab(page, label)
+        self._build_current(self.currentIndex())
+
+    def view(self, key):
+        """Return a tab's view, or None if it hasn't been created yet"""
+        return self._views.get(key)
+
+    def built_views(self):
+        """Views created so far"""
+        return list(self._views.values())
+
+    def release_views(self):
+        """Release every view built so far; the widgets go with the dashboard"""
+        for view in self._views.values():
+            if hasattr(view, "release"):
+                view.release()
+        self._views.clear()
+        self._factories.clear()
+        self._pages.clear()
+
+    def current_view(self):
+        """The selected tab's view, or None if it hasn't been created yet"""
+        page = self.currentWidget()
+        for key, candidate in self._pages.items():
+            if candidate is page:
+                return self._views.get(key)
+        return None
+
+    def _build_current(self, index):
+        page = self.widget(index)
+        for key, candidate in self._pages.items():
+            if candidate is page and key not in self._views:
+                view = self._factories[key]()
+                self._views[key] = view
+                page.layout().addWidget(view)
+                return
@@ -6,6 +6,14 @@ from PySide6.QtCore import Signal, Qt, QSettings
 from PySide6.QtGui import QFont
 
 from backend.auth_manager import AuthManager
+from services.prewarm import start_prewarm
+
+# Imported in the background while the login form is showing: the dashboards and the
+# views of their first tabs. Other tabs' views are imported when first opened.
+DASHBOARD_MODULES = (
+    "frontend.admin_dashboard", "frontend.manage_students_view",
+    "frontend.teacher_dashboard", "frontend.attendance_register_view"
+)
 
 class LoginView(QWidget):
     """Login view for authentication"""
@@ -67,6 +75,10 @@ class LoginView(QWidget):
         self.remember_checkbox = QCheckBox("Remember my details")
         main_layout.addWidget(self.remember_checkbox)
         
+        # Stay signed in checkbox (keeps the session between launches)
+        self.stay_signed_in_checkbox = QCheckBox("Stay signed in on this computer")
+        main_layout.addWidget(self.stay_signed_in_checkbox)
+        
         # Add spacing
         main_layout.addSpacerItem(QSpacerItem(20, 20))
         
@@ -94,6 +106,11 @@ class LoginView(QWidget):
         
         self.setLayout(main_layout)
     
+    def showEvent(self, event):
+        """Start warming up connections and dashboard imports once the form is visible"""
+        super().showEvent(event)
+        start_prewarm(DASHBOARD_MODULES)
+    
     def handle_login(self):
         """Handle login button click"""
         email = self.email_input.text().strip()
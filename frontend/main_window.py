@@ -1,136 +1,397 @@
-from PySide6.QtWidgets import QMainWindow, QStackedWidget, QMessageBox
-from PySide6.QtCore import Slot
+import threading
+
+from PySide6.QtWidgets import QMainWindow, QStackedWidget, QMessageBox, QWidget, QVBoxLayout, QLabel, QProgressBar
+from PySide6.QtCore import Slot, Signal, Qt, QTimer
 
 from frontend.login_view import LoginView
-from frontend.signup_view import SignupView
-from frontend.admin_dashboard import AdminDashboard
-from frontend.teacher_dashboard import TeacherDashboard
 
 from backend.auth_manager import AuthManager
 from backend.firestore_manager import FirestoreManager
+from backend.token_claims import get_profile_from_claims
+from backend.credential_provider import get_credential_provider
+from backend.session_store import SessionStore
+from services.firebase_transport import timed_operation
+from utils.snapshot_cache import get_snapshot_cache, WARM_SESSION_TTL
+from utils.bootstrap_prefetch import get_bootstrap_reads, prefetch_bootstrap
+from utils.startup_profiler import get_startup_profiler
 
 class MainWindow(QMainWindow):
     """Main window for the School Management System application"""
-    
+
+    # Emitted from background threads; delivered on the GUI thread
+    credentials_refreshed = Signal()
+    session_ended = Signal(str)
+    bootstrap_progress = Signal(int, int)  # done, total
+    bootstrap_finished = Signal(str, str, str, dict)  # user_uid, role, name, prefetched
+    profile_loaded = Signal(str, dict, str)  # user_uid, profile, error message
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("School Management System")
         self.resize(1200, 800)
-        
+
         # Initialize managers
         self.auth_manager = AuthManager()
         self.firestore_manager = FirestoreManager()
-        
+        self.credentials = get_credential_provider()
+        self.session_store = SessionStore()
+        self.snapshot_cache = get_snapshot_cache()
+        self.profiler = get_startup_profiler()
+
         # Initialize current user data
         self.current_user = None
         self.id_token = None
         self.user_uid = None
-        
+        self.resuming_session = False
+        self.restoring_warm_session = False
+
         # Set up the stacked widget for different views
         self.stacked_widget = QStackedWidget()
         self.setCentralWidget(self.stacked_widget)
-        
+
         # Create views
         self.login_view = LoginView()
-        self.signup_view = SignupView()
+        self.signup_view = None  # Created the first time someone asks to sign up
+        self.loading_view = self.create_loading_view()
         self.admin_dashboard = None
         self.teacher_dashboard = None
-        
+
         # Add views to stacked widget
         self.stacked_widget.addWidget(self.login_view)
-        self.stacked_widget.addWidget(self.signup_view)
-        
+        self.stacked_widget.addWidget(self.loading_view)
+
         # Connect signals from login view
         self.login_view.login_successful.connect(self.on_login_successful)
         self.login_view.signup_requested.connect(self.show_signup_view)
-        
-        # Connect signals from signup view
-        self.signup_view.signup_successful.connect(self.on_signup_successful)
-        self.signup_view.login_requested.connect(self.show_login_view)
-        
-        # Show login view by default
+
+        # Keep the saved session's refresh token current and finish resuming once a token arrives
+        self.credentials.add_listener(self.on_credentials_changed)
+        self.credentials_refreshed.connect(self.on_credentials_refreshed)
+        self.session_ended.connect(self.on_session_ended)
+        self.bootstrap_progress.connect(self.on_bootstrap_progress)
+        self.bootstrap_finished.connect(self.on_bootstrap_finished)
+        self.profile_loaded.connect(self.on_profile_loaded)
+
+        # Show login view by default, unless a saved session can be resumed
         self.stacked_widget.setCurrentWidget(self.login_view)
-    
+        self.resume_saved_session()
+
+    def create_loading_view(self):
+        """Page shown while a dashboard's data is prefetched"""
+        loading_view = QWidget()
+        layout = QVBoxLayout(loading_view)
+        layout.setContentsMargins(300, 0, 300, 0)
+        layout.addStretch()
+
+        label = QLabel("Loading school data...")
+        label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(label)
+
+        self.loading_progress = QProgressBar()
+        layout.addWidget(self.loading_progress)
+        layout.addStretch()
+        return loading_view
+
+    def resume_saved_session(self):
+        """Show the last user's dashboard from cached data while their token is exchanged"""
+        session = self.session_store.load()
+        if not session:
+            return
+
+        print(f"Resuming saved session for {session['user_uid']}")
+        self.profiler.begin("login")
+        self.resuming_session = True
+        self.user_uid = session["user_uid"]
+        self.login_view.stay_signed_in_checkbox.setChecked(True)
+
+        self.credentials.resume(session["refresh_token"], self.user_uid)
+        self.snapshot_cache.open(self.user_uid, serve=True)
+        self.show_dashboard(session["role"], session["name"])
+
+        # Exchange the refresh token off the GUI thread
+        threading.Thread(target=self._exchange_saved_token, daemon=True).start()
+
+    def _exchange_saved_token(self):
+        """Background thread: get a fresh ID token for the saved session"""
+        self.credentials.refresh()
+        # On success or a revoked session on_credentials_changed fires; on network errors the provider retries
+
+    def on_credentials_changed(self, provider):
+        """Called by the credential provider (possibly from a background thread)"""
+        if provider.refresh_token and self.session_store.load():
+            self.session_store.update_refresh_token(provider.refresh_token)
+        if provider.id_token:
+            self.credentials_refreshed.emit()
+        elif provider.session_error:
+            self.session_ended.emit(provider.session_error)
+
+    @Slot()
+    def on_credentials_refreshed(self):
+        """Switch a resumed dashboard from cached to live data"""
+        if not self.resuming_session:
+            return
+        self.resuming_session = False
+        self.id_token = self.credentials.id_token
+        self.snapshot_cache.stop_serving()
+
+        dashboard = self.stacked_widget.currentWidget()
+        if dashboard in (self.admin_dashboard, self.teacher_dashboard):
+            dashboard.refresh_data()
+
+    @Slot(str)
+    def on_session_ended(self, error_message):
+        """The session was revoked or expired; ask the user to log in again"""
+        self.id_token = None
+        self.user_uid = None
+        self.resuming_session = False
+        self.restoring_warm_session = False
+        self.close_dashboards()
+        self.session_store.clear()
+        self.snapshot_cache.close(delete=True)
+        self.auth_manager.clear_auth_state()
+        self.show_login_view()
+        QMessageBox.information(self, "Session Expired", "Please log in again.")
+        print(f"Session ended: {error_message}")
+
     @Slot(str, str)
     def on_login_successful(self, id_token, user_uid):
         """Handle successful login"""
+        self.profiler.begin("login")
         self.id_token = id_token
         self.user_uid = user_uid
-        
-        # Get the user's profile from Firestore
-        success, profile, error_message = self.firestore_manager.get_user_profile(id_token, user_uid)
-        
-        if not success:
+
+        # Checking the token may fetch Google's certificates, so find the role off the GUI thread
+        self.loading_progress.setRange(0, 0)
+        self.stacked_widget.setCurrentWidget(self.loading_view)
+        threading.Thread(target=self._load_profile, args=(user_uid, id_token), daemon=True).start()
+
+    def _load_profile(self, user_uid, id_token):
+        """Background thread: find the user's role and name"""
+        # Prefer the role stamped into the signed token; only read Firestore if it's missing
+        profile = get_profile_from_claims(id_token, self.firestore_manager.firebase_service.project_id, user_uid)
+        error_message = ""
+        if profile is None:
+            success, profile, error_message = self.firestore_manager.get_user_profile(id_token, user_uid)
+            if not success:
+                profile = {}
+        self.profile_loaded.emit(user_uid, profile or {}, error_message or "")
+
+    @Slot(str, dict, str)
+    def on_profile_loaded(self, user_uid, profile, error_message):
+        # Ignore a profile for a user who has since logged out
+        if user_uid != self.user_uid or self.stacked_widget.currentWidget() is not self.loading_view:
+            return
+
+        if not profile:
+            self.show_login_view()
             QMessageBox.critical(self, "Error", f"Failed to get user profile: {error_message}")
             return
-        
+
         role = profile.get("role", "")
         name = profile.get("name", "")
-        
-        # Show the appropriate dashboard based on the user's role
-        if role == "administrator":
-            if not self.admin_dashboard:
-                self.admin_dashboard = AdminDashboard(self.id_token, self.user_uid, name)
-                self.stacked_widget.addWidget(self.admin_dashboard)
-                # Connect logout signal
-                self.admin_dashboard.logout_requested.connect(self.handle_logout)
-            self.stacked_widget.setCurrentWidget(self.admin_dashboard)
-        elif role == "teacher":
-            if not self.teacher_dashboard:
-                self.teacher_dashboard = TeacherDashboard(self.id_token, self.user_uid, name)
-                self.stacked_widget.addWidget(self.teacher_dashboard)
-                # Connect logout signal
-                self.teacher_dashboard.logout_requested.connect(self.handle_logout)
-            self.stacked_widget.setCurrentWidget(self.teacher_dashboard)
-        else:
+
+        # Nothing is saved or cached for a role no dashboard exists for
+        if not get_bootstrap_reads(role, user_uid):
+            self.show_login_view()
             QMessageBox.warning(self, "Unknown Role", f"User has unknown role: {role}")
-    
+            return
+
+        self.remember_session(role, name, self.login_view.email_input.text().strip())
+
+        # Fetch the dashboard's data, then show it
+        self.start_bootstrap(role, name)
+
     @Slot(str, str, str, str)
     def on_signup_successful(self, id_token, user_uid, role, name):
         """Handle successful signup"""
+        self.profiler.begin("login")
         self.id_token = id_token
         self.user_uid = user_uid
-        
-        # Show the appropriate dashboard based on the user's role
+        self.snapshot_cache.open(self.user_uid, persist=False)
+
+        # Fetch the dashboard's data, then show it
+        self.start_bootstrap(role, name)
+
+    def start_bootstrap(self, role, name):
+        """
+        Fetch the reference data a dashboard needs concurrently, then show it
+        Returns: False if the role is unknown
+        """
+        reads = get_bootstrap_reads(role, self.user_uid)
+        if not reads:
+            return False
+
+        # The same user logging straight back in: show their last reads at once, then go live
+        if self.snapshot_cache.serving:
+            self.restoring_warm_session = True
+            return self.show_dashboard(role, name)
+
+        self.loading_progress.setRange(0, len(reads))
+        self.loading_progress.setValue(0)
+        self.stacked_widget.setCurrentWidget(self.loading_view)
+
+        threading.Thread(
+            target=self._run_bootstrap, args=(self.user_uid, self.id_token, role, name), daemon=True
+        ).start()
+        return True
+
+    @timed_operation("bootstrap_prefetch")
+    def _run_bootstrap(self, user_uid, id_token, role, name):
+        """Background thread: run the bootstrap reads"""
+        prefetched = prefetch_bootstrap(
+            role, user_uid, id_token, progress=lambda done, total: self.bootstrap_progress.emit(done, total)
+        )
+        self.bootstrap_finished.emit(user_uid, role, name, prefetched)
+
+    @Slot(int, int)
+    def on_bootstrap_progress(self, done, total):
+        self.loading_progress.setValue(done)
+
+    @Slot(str, str, str, dict)
+    def on_bootstrap_finished(self, user_uid, role, name, prefetched):
+        # Ignore results for a user who has since logged out
+        if user_uid != self.user_uid or self.stacked_widget.currentWidget() is not self.loading_view:
+            return
+        self.show_dashboard(role, name, prefetched)
+
+    def show_dashboard(self, role, name, prefetched=None):
+        """
+        Show the dashboard for a role, creating it on first use
+        Returns: False if the role is unknown
+        """
+        # Dashboards are imported on first use (usually already pre-imported by the login view)
         if role == "administrator":
             if not self.admin_dashboard:
-                self.admin_dashboard = AdminDashboard(self.id_token, self.user_uid, name)
+                from frontend.admin_dashboard import AdminDashboard
+                self.admin_dashboard = AdminDashboard(self.id_token, self.user_uid, name, prefetched)
                 self.stacked_widget.addWidget(self.admin_dashboard)
                 # Connect logout signal
                 self.admin_dashboard.logout_requested.connect(self.handle_logout)
             self.stacked_widget.setCurrentWidget(self.admin_dashboard)
         elif role == "teacher":
             if not self.teacher_dashboard:
-                self.teacher_dashboard = TeacherDashboard(self.id_token, self.user_uid, name)
+                from frontend.teacher_dashboard import TeacherDashboard
+                self.teacher_dashboard = TeacherDashboard(self.id_token, self.user_uid, name, prefetched)
                 self.stacked_widget.addWidget(self.teacher_dashboard)
                 # Connect logout signal
                 self.teacher_dashboard.logout_requested.connect(self.handle_logout)
             self.stacked_widget.setCurrentWidget(self.teacher_dashboard)
-    
+        else:
+            return False
+
+        # Queued behind the visible tab's own load, which its show event has just scheduled
+        dashboard = self.stacked_widget.currentWidget()
+        QTimer.singleShot(0, lambda: self.on_dashboard_shown(role, dashboard))
+        return True
+
+    def on_dashboard_shown(self, role, dashboard):
+        # Timed from profiler.begin("login"), across the profile and bootstrap reads
+        self.profiler.end("login", "login_to_dashboard")
+        self.profiler.end("login", f"{role}_dashboard_ready")
+        self.call_when_loaded(dashboard, lambda: self.on_dashboard_loaded(role, dashboard))
+
+    def on_dashboard_loaded(self, role, dashboard):
+        self.profiler.end("login", f"{role}_dashboard_interactive")
+
+        # Shown from the warm reads of a quick re-login: now fetch the live data
+        if self.restoring_warm_session and dashboard is self.stacked_widget.currentWidget():
+            self.restoring_warm_session = False
+            self.snapshot_cache.stop_serving()
+            dashboard.refresh_data()
+
+    def call_when_loaded(self, dashboard, callback):
+        """Call callback once the dashboard's visible tab has finished loading"""
+        view = dashboard.tab_widget.current_view()
+        tasks = getattr(view, "tasks", None)
+        if tasks is None or not tasks.has_pending():
+            callback()
+            return
+
+        def on_idle():
+            tasks.idle.disconnect(on_idle)
+            callback()
+        tasks.idle.connect(on_idle)
+
+    def close_dashboards(self):
+        """Destroy the dashboards, releasing their per-user caches, models and background work"""
+        for dashboard in (self.admin_dashboard, self.teacher_dashboard):
+            if dashboard:
+                dashboard.release()
+                self.stacked_widget.removeWidget(dashboard)
+                dashboard.deleteLater()
+        self.admin_dashboard = None
+        self.teacher_dashboard = None
+
+    def remember_session(self, role, name, email):
+        """Save or forget the session depending on the "stay signed in" choice, and record its reads"""
+        persist = False
+        if self.login_view.stay_signed_in_checkbox.isChecked() and self.credentials.refresh_token:
+            persist = self.session_store.save(self.credentials.refresh_token, self.user_uid, role, name, email)
+        else:
+            self.session_store.clear()
+
+        # Serve the warm reads if this user has only just logged out (see start_bootstrap);
+        # anyone else's are discarded here
+        warm = self.snapshot_cache.has_warm(self.user_uid)
+        self.snapshot_cache.open(self.user_uid, serve=warm, persist=persist)
+
     @Slot()
     def show_signup_view(self):
         """Switch to signup view"""
+        if self.signup_view is None:
+            from frontend.signup_view import SignupView
+            self.signup_view = SignupView()
+            self.stacked_widget.addWidget(self.signup_view)
+
+            # Connect signals from signup view
+            self.signup_view.signup_successful.connect(self.on_signup_successful)
+            self.signup_view.login_requested.connect(self.show_login_view)
         self.stacked_widget.setCurrentWidget(self.signup_view)
-    
+
     @Slot()
     def show_login_view(self):
         """Switch to login view"""
         self.stacked_widget.setCurrentWidget(self.login_view)
-        
+
     @Slot()
     def handle_logout(self):
         """Handle logout request from dashboards"""
-        # Clear authentication state
+        dashboard = self.stacked_widget.currentWidget()
+        if dashboard is self.admin_dashboard and dashboard.is_busy():
+            QMessageBox.warning(
+                self, "Still Working",
+                "Staff accounts are still being created. Log out once provisioning has finished."
+            )
+            return
+
+        # Clear authentication state (this also stops background token refreshes)
         self.id_token = None
         self.user_uid = None
-        self.auth_manager.id_token = None
-        self.auth_manager.user_uid = None
-        
+        self.resuming_session = False
+        self.restoring_warm_session = False
+        self.auth_manager.clear_auth_state()
+
+        # The next user gets freshly built dashboards
+        self.close_dashboards()
+
+        # Logging out explicitly ends "stay signed in" and removes the offline copy. The reads
+        # stay in memory for a while in case the same user logs straight back in.
+        self.session_store.clear()
+        self.snapshot_cache.close(delete=True, keep_warm=True)
+        QTimer.singleShot(WARM_SESSION_TTL * 1000, self.snapshot_cache.expire_warm)
+
         # Reset login form (clear password but keep email if it's remembered)
         self.login_view.password_input.clear()
-        
+
         # Switch to the login view
         self.show_login_view()
-        
+
         # Optional: Show logout confirmation
         QMessageBox.information(self, "Logged Out", "You have been successfully logged out.")
+
+    def closeEvent(self, event):
+        """Save the offline snapshot so the next launch can render immediately, and any attendance drafts"""
+        self.snapshot_cache.save()
+        if self.teacher_dashboard:
+            self.teacher_dashboard.save_drafts()
+        super().closeEvent(event)
@@ -1,99 +1,215 @@
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QPushButton, QTableView,
     QHBoxLayout, QFormLayout, QLineEdit, QMessageBox, QComboBox,
-    QCheckBox, QGroupBox, QGridLayout
+    QCheckBox, QGroupBox, QGridLayout, QHeaderView
 )
-from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, Signal
 from PySide6.QtGui import QFont
-from utils.firebase_client import FirebaseClient
+from utils.firebase_client import FirebaseClient, DEFAULT_PAGE_SIZE
+from frontend.lazy_tabs import LoadOnShowMixin
+from frontend.optimistic_rows import OptimisticRowsMixin
+from frontend.row_diff import reconcile_rows
+from frontend.task_runner import TaskRunner
+from frontend.item_roles import DISPLAY_ROLE, FOREGROUND_ROLE, HORIZONTAL
+from services.firebase_transport import timed_operation
+from utils.student_search_index import StudentSearchIndex
 import uuid
 
-class StudentTableModel(QAbstractTableModel):
-    """Table model for students"""
+YEAR_GROUPS = ["Y7", "Y8", "Y9", "Y10", "Y11"]
+
+class StudentTableModel(OptimisticRowsMixin, QAbstractTableModel):
+    """
+    Table model for students
+    
+    Shows the students of a StudentSearchIndex that match the current filter.
+    rows holds their positions in the index, in display order; filtering and
+    sorting only rearrange those positions, and display text and sort keys
+    come precomputed from the index.
+    
+    Students are loaded a page at a time: while more_available is set, the
+    view's fetchMore() (when the last row comes into sight) emits
+    moreRequested, and the owner answers with add_students(). Students added
+    or deleted here are shown or hidden at once with insert_student() and
+    remove_student(), without reading the collection again.
+    """
     
-    def __init__(self, students=None):
+    moreRequested = Signal()
+    
+    def __init__(self, search_index=None):
         super().__init__()
-        self.students = students or []
+        self.search_index = search_index if search_index is not None else StudentSearchIndex()
+        self.rows = []  # index positions of the visible students, in display order
+        self.sort_column = -1  # -1 keeps the order students were loaded in
+        self.descending = False
+        self.query = ""
+        self.year_group = None
+        self.more_available = False  # more pages of students are waiting to be read
+        self.fetching = False        # a page has been requested and not yet added
         self.headers = ["ID", "Name", "Year Group", "Subjects"]
+        self.init_optimistic_rows()
     
     def rowCount(self, parent=QModelIndex()):
-        return len(self.students)
+        return len(self.rows)
     
     def columnCount(self, parent=QModelIndex()):
         return len(self.headers)
     
     def data(self, index, role=Qt.DisplayRole):
-        if not index.isValid() or role != Qt.DisplayRole:
+        if not index.isValid():
             return None
         
-        student = self.students[index.row()]
-        col = index.column()
-        
-        if col == 0:
-            return student.get('id', '')
-        elif col == 1:
-            # Display full name by combining first_name and last_name
-            first_name = student.get('first_name', '')
-            last_name = student.get('last_name', '')
-            
-            # If either first_name or last_name exists, use them
-            if first_name or last_name:
-                return f"{first_name} {last_name}".strip()
-            
-            # Fallback to old 'name' field for backward compatibility
-            return student.get('name', '')
-        elif col == 2:
-            return student.get('year_group', '')
-        elif col == 3:
-            subjects = student.get('subjects', [])
-            if isinstance(subjects, list):
-                return ", ".join(subjects)
-            return str(subjects)
+        display = self.search_index.display[self.rows[index.row()]]
+        if role == FOREGROUND_ROLE:
+            return self.pending_foreground(display[0])
+        if role != DISPLAY_ROLE:
+            return None
         
-        return None
+        return display[index.column()]
     
     def headerData(self, section, orientation, role=Qt.DisplayRole):
-        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+        if orientation == HORIZONTAL and role == DISPLAY_ROLE:
             return self.headers[section]
         return None
     
-    def update_students(self, students):
+    def student_at(self, row):
+        """The student dictionary shown in a row"""
+        return self.search_index.students[self.rows[row]]
+    
+    def row_of(self, student_id):
+        """Row showing a student, or None"""
+        position = self.search_index.positions.get(student_id)
+        if position is None or position in self.search_index.removed:
+            return None
+        try:
+            return self.rows.index(position)
+        except ValueError:
+            return None  # Filtered out
+    
+    def set_search_index(self, search_index, more_available=False):
+        """Replace the roster (after a reload); nothing is shown until apply_filter()"""
         self.beginResetModel()
-        self.students = students
+        self.search_index = search_index
+        self.rows = []
+        self.pending_ids.clear()
+        self.more_available = more_available
+        self.fetching = False
         self.endResetModel()
     
+    def add_students(self, students, more_available):
+        """
+        Add a page of students to the roster and show those matching the current filter
+        Returns: dict of year group -> number of loaded students matching the query
+        """
+        self.search_index.add_students(students)
+        self.more_available = more_available
+        self.fetching = False
+        return self.apply_filter(self.query, self.year_group)
+    
+    def insert_student(self, student):
+        """
+        Add a student that is being saved, greyed out until set_pending(id, False)
+        Returns: dict of year group -> number of loaded students matching the query
+        """
+        self.pending_ids.add(student['id'])
+        self.search_index.add_students([student])
+        return self.apply_filter(self.query, self.year_group)
+    
+    def remove_student(self, student_id):
+        """
+        Hide a student (deleted, or whose save failed)
+        Returns: dict of year group -> number of loaded students matching the query
+        """
+        position = self.search_index.positions.get(student_id)
+        if position is not None:
+            self.search_index.remove(position)
+        self.pending_ids.discard(student_id)
+        return self.apply_filter(self.query, self.year_group)
+    
+    def restore_student(self, student_id):
+        """
+        Show a student hidden by remove_student() again
+        Returns: dict of year group -> number of loaded students matching the query
+        """
+        position = self.search_index.positions.get(student_id)
+        if position is not None:
+            self.search_index.restore(position)
+        return self.apply_filter(self.query, self.year_group)
+    
+    def fetch_failed(self):
+        """The requested page didn't arrive; let the view ask again"""
+        self.fetching = False
+    
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.more_available and not self.fetching
+    
+    def fetchMore(self, parent=QModelIndex()):
+        if self.canFetchMore(parent):
+            self.fetching = True
+            self.moreRequested.emit()
+    
+    def apply_filter(self, query, year_group=None):
+        """
+        Show the students matching a search query and year group (None = all years)
+        Returns: dict of year group -> number of loaded students matching the query
+        """
+        self.query = query
+        self.year_group = year_group
+        matches = self.search_index.match(query)
+        visible = self.search_index.filter_year(matches, year_group)
+        self.show_rows(self.ordered(visible))
+        return self.search_index.facet_counts(matches)
+    
+    def ordered(self, positions):
+        """Positions (None = everyone) in the current sort order"""
+        if self.sort_column < 0:
+            if positions is None:
+                return list(range(len(self.search_index)))
+            return sorted(positions)
+        return self.search_index.sorted_positions(positions, self.sort_column, self.descending)
+    
+    def show_rows(self, new_rows):
+        """
+        Change the visible rows with row removals and insertions rather than a reset
+        
+        Old and new rows are in the same sort order, so the view keeps its
+        scroll position and selection.
+        """
+        reconcile_rows(self, self.rows, new_rows)
+    
     def sort(self, column, order):
         """Sort table by given column number and order"""
-        self.beginResetModel()
+        self.layoutAboutToBeChanged.emit()
         
-        # Define sort key functions based on column
-        if column == 0:  # ID
-            self.students = sorted(self.students, key=lambda x: x.get('id', ''), 
-                                 reverse=(order == Qt.DescendingOrder))
-        elif column == 1:  # Name
-            self.students = sorted(self.students, key=lambda x: (x.get('first_name', '').lower(), x.get('last_name', '').lower()), 
-                                 reverse=(order == Qt.DescendingOrder))
-        elif column == 2:  # Year Group
-            self.students = sorted(self.students, key=lambda x: x.get('year_group', ''), 
-                                 reverse=(order == Qt.DescendingOrder))
-        elif column == 3:  # Subjects
-            self.students = sorted(self.students, 
-                                 key=lambda x: ", ".join(x.get('subjects', [])) if isinstance(x.get('subjects', []), list) else str(x.get('subjects', [])), 
-                                 reverse=(order == Qt.DescendingOrder))
+        persistent = self.persistentIndexList()
+        positions = [self.rows[index.row()] for index in persistent]
         
-        self.endResetModel()
+        self.sort_column = column
+        self.descending = order == Qt.DescendingOrder
+        self.rows = self.ordered(self.rows)
+        
+        # Keep the selection and current cell on the same students
+        if persistent:
+            row_of = {position: row for row, position in enumerate(self.rows)}
+            self.changePersistentIndexList(
+                persistent,
+                [self.index(row_of[position], index.column()) for position, index in zip(positions, persistent)]
+            )
+        
+        self.layoutChanged.emit()
 
-class ManageStudentsView(QWidget):
+class ManageStudentsView(LoadOnShowMixin, QWidget):
     """View for managing student records"""
     
-    def __init__(self, id_token, user_uid):
+    def __init__(self, id_token, user_uid, prefetched=None):
         super().__init__()
         self.id_token = id_token
         self.user_uid = user_uid
-        self.firebase = FirebaseClient(id_token=self.id_token)
+        self.firebase = FirebaseClient(id_token=self.id_token, prefetched=prefetched)
         self.all_students = []  # Store all students for filtering
+        self.next_cursor = None  # Where the next page of students starts
+        self.tasks = TaskRunner(self)  # Runs Firebase calls off the GUI thread
         self.setup_ui()
-        self.load_students()
+        self.init_load_on_show()
     
     def setup_ui(self):
         """Set up the user interface"""
@@ -107,15 +223,22 @@ class ManageStudentsView(QWidget):
         title_label.setFont(title_font)
         main_layout.addWidget(title_label)
         
-        # Filter by Year Group
+        # Search and filter by Year Group
         filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("Search:"))
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Name, ID or subject")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.textChanged.connect(self.filter_students)
+        filter_layout.addWidget(self.search_input)
         filter_layout.addWidget(QLabel("Filter by Year Group:"))
         self.year_filter_dropdown = QComboBox()
-        self.year_filter_dropdown.addItem("All")
-        self.year_filter_dropdown.addItems(["Y7", "Y8", "Y9", "Y10", "Y11"])
-        self.year_filter_dropdown.currentTextChanged.connect(self.filter_students)
+        # Item data holds the year group; the text also shows how many students match the search
+        self.year_filter_dropdown.addItem("All", None)
+        for year_group in YEAR_GROUPS:
+            self.year_filter_dropdown.addItem(year_group, year_group)
+        self.year_filter_dropdown.currentIndexChanged.connect(self.filter_students)
         filter_layout.addWidget(self.year_filter_dropdown)
-        filter_layout.addStretch()
         main_layout.addLayout(filter_layout)
         
         # Student input form
@@ -129,7 +252,7 @@ class ManageStudentsView(QWidget):
         form_layout.addRow("Last Name:", self.last_name_input)
         
         self.year_group_dropdown = QComboBox()
-        self.year_group_dropdown.addItems(["Y7", "Y8", "Y9", "Y10", "Y11"])
+        self.year_group_dropdown.addItems(YEAR_GROUPS)
         form_layout.addRow("Year Group:", self.year_group_dropdown)
         
         # Add subject selection
@@ -175,12 +298,15 @@ class ManageStudentsView(QWidget):
         self.students_table = QTableView()
         self.student_model = StudentTableModel()
         
-        # Set up proxy model for sorting
-        self.proxy_model = QSortFilterProxyModel()
-        self.proxy_model.setSourceModel(self.student_model)
-        self.students_table.setModel(self.proxy_model)
+        self.students_table.setModel(self.student_model)
+        self.students_table.setSelectionBehavior(QTableView.SelectRows)
+        # Size columns from the first rows only, and keep rows one height, so large rosters stay quick
+        self.students_table.horizontalHeader().setResizeContentsPrecision(50)
+        self.students_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         
-        # Enable sorting
+        # Enable sorting (the model sorts with keys precomputed by the search index).
+        # Start in load order, so pages loaded while scrolling are added at the bottom.
+        self.students_table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
         self.students_table.setSortingEnabled(True)
         self.students_table.horizontalHeader().setSectionsClickable(True)
         self.students_table.horizontalHeader().setStyleSheet("::section { background-color: #f0f0f0; }")
@@ -197,34 +323,89 @@ class ManageStudentsView(QWidget):
         self.add_student_button.clicked.connect(self.add_student)
         self.clear_form_button.clicked.connect(self.clear_form)
         self.delete_student_button.clicked.connect(self.delete_student)
+        self.student_model.moreRequested.connect(self.load_more_students)
+    
+    def load_visible_data(self):
+        """Load this view's data (called when it is first shown)"""
+        self.load_students()
     
     def load_students(self):
-        """Load students from Firebase"""
-        try:
-            students = self.firebase.get_collection("students")
-            self.all_students = students  # Store all students
-            
-            # Apply current filter
-            self.filter_students(self.year_filter_dropdown.currentText())
-            
-            # Adjust column widths
-            self.students_table.resizeColumnsToContents()
-        except Exception as e:
-            QMessageBox.warning(self, "Error", f"Failed to load students: {str(e)}")
-    
-    def filter_students(self, year_group):
-        """Filter students by year group"""
-        if year_group == "All":
-            self.student_model.update_students(self.all_students)
-        else:
-            filtered_students = [s for s in self.all_students if s.get('year_group') == year_group]
-            self.student_model.update_students(filtered_students)
+        """Load the first page of students from Firebase in the background; the table asks for the rest"""
+        self.tasks.submit(
+            "load_students", self.fetch_student_page, None,
+            on_success=self.on_students_loaded,
+            on_error=lambda error: QMessageBox.warning(self, "Error", f"Failed to load students: {error}")
+        )
+    
+    def load_more_students(self):
+        """Load the next page of students (the table has scrolled, or been filtered, to its last row)"""
+        self.tasks.submit(
+            "load_students", self.fetch_student_page, self.next_cursor,
+            on_success=self.on_more_students_loaded,
+            on_error=self.on_more_students_failed
+        )
+    
+    @timed_operation("load_students_page")
+    def fetch_student_page(self, cursor):
+        """Worker thread: read one page of students, in ID order"""
+        return self.firebase.get_collection_page("students", DEFAULT_PAGE_SIZE, cursor)
+    
+    def on_students_loaded(self, page):
+        """Show the first page of students"""
+        students, self.next_cursor = page
+        search_index = StudentSearchIndex(students)
+        self.all_students = search_index.students  # Grows as more pages are added
+        self.student_model.set_search_index(search_index, more_available=self.next_cursor is not None)
+        
+        # Apply current search and filter
+        self.filter_students()
+        
+        # Adjust column widths
+        self.students_table.resizeColumnsToContents()
+        self.fetch_more_if_short()
+    
+    def on_more_students_loaded(self, page):
+        students, self.next_cursor = page
+        year_counts = self.student_model.add_students(students, self.next_cursor is not None)
+        self.update_year_counts(year_counts)
+        self.fetch_more_if_short()
+    
+    def on_more_students_failed(self, error):
+        self.student_model.fetch_failed()
+        QMessageBox.warning(self, "Error", f"Failed to load more students: {error}")
+    
+    @timed_operation("filter_students")
+    def filter_students(self, *args):
+        """Show the students matching the search box and year group"""
+        year_counts = self.student_model.apply_filter(
+            self.search_input.text(), self.year_filter_dropdown.currentData()
+        )
+        self.update_year_counts(year_counts)
+        self.fetch_more_if_short()
+    
+    def fetch_more_if_short(self):
+        """
+        Keep loading pages while the last row is in sight
+        
+        The table only asks for more when it is scrolled or laid out again, so
+        a search that hides every loaded student would otherwise stop there.
+        """
+        model = self.student_model
+        if not model.canFetchMore():
+            return
+        last_row = model.rowCount() - 1
+        if last_row < 0 or self.students_table.viewport().rect().intersects(
+            self.students_table.visualRect(model.index(last_row, 0))
+        ):
+            model.fetchMore()
+    
+    def update_year_counts(self, year_counts):
+        """Show how many loaded students in each year group match the search ("+" while more can load)"""
+        more = "+" if self.student_model.more_available else ""
         
-        # Preserve sorting if already sorted
-        if self.students_table.horizontalHeader().sortIndicatorSection() >= 0:
-            section = self.students_table.horizontalHeader().sortIndicatorSection()
-            order = self.students_table.horizontalHeader().sortIndicatorOrder()
-            self.students_table.sortByColumn(section, order)
+        self.year_filter_dropdown.setItemText(0, f"All ({sum(year_counts.values())}{more})")
+        for i, year_group in enumerate(YEAR_GROUPS, start=1):
+            self.year_filter_dropdown.setItemText(i, f"{year_group} ({year_counts.get(year_group, 0)}{more})")
     
     def add_student(self):
         """Handle adding a new student"""
@@ -250,30 +431,38 @@ class ManageStudentsView(QWidget):
             QMessageBox.warning(self, "Input Error", "Please select at least one subject.")
             return
         
-        try:
-            # Generate a unique student ID
-            student_id = str(uuid.uuid4())
-            
-            # Create the student in Firebase with first_name and last_name
-            student_data = {
-                "first_name": first_name,
-                "last_name": last_name,
-                "year_group": year_group,
-                "subjects": selected_subjects
-            }
-            
-            self.firebase.create_document("students", student_id, student_data)
-            
-            # Refresh the students list
-            self.load_students()
-            
-            # Only clear the name fields, keep subject selections
-            self.first_name_input.clear()
-            self.last_name_input.clear()
-            
-            QMessageBox.information(self, "Success", "Student added successfully.")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to add student: {str(e)}")
+        # Generate a unique student ID
+        student_id = str(uuid.uuid4())
+        
+        # Create the student in Firebase with first_name and last_name
+        student_data = {
+            "first_name": first_name,
+            "last_name": last_name,
+            "year_group": year_group,
+            "subjects": selected_subjects
+        }
+        
+        # Show the student straight away (greyed out until the server confirms it)
+        year_counts = self.student_model.insert_student({"id": student_id, **student_data})
+        self.update_year_counts(year_counts)
+        
+        # Only clear the name fields, keep subject selections, ready for the next student
+        self.first_name_input.clear()
+        self.last_name_input.clear()
+        self.first_name_input.setFocus()
+        
+        self.tasks.submit(
+            f"add_student:{student_id}", self.firebase.create_document, "students", student_id, student_data,
+            on_success=lambda result: self.student_model.set_pending(student_id, False),
+            on_error=lambda error: self.on_student_add_failed(student_id, first_name, last_name, error)
+        )
+    
+    def on_student_add_failed(self, student_id, first_name, last_name, error):
+        self.update_year_counts(self.student_model.remove_student(student_id))
+        QMessageBox.critical(
+            self, "Error",
+            f"Failed to add student '{first_name} {last_name}': {error}\n\nThe student has been removed from the list."
+        )
     
     def delete_student(self):
         """Delete the selected student"""
@@ -282,14 +471,16 @@ class ManageStudentsView(QWidget):
             QMessageBox.warning(self, "Selection Error", "Please select a student to delete.")
             return
         
-        # Get the source model index from proxy model
-        source_row = self.proxy_model.mapToSource(selected_indexes[0]).row()
-        student = self.student_model.students[source_row]
+        student = self.student_model.student_at(selected_indexes[0].row())
         student_id = student.get('id', '')
         
         if not student_id:
             return
         
+        if self.student_model.is_pending(student_id):
+            QMessageBox.warning(self, "Please Wait", "This student is still being saved. Try again in a moment.")
+            return
+        
         # Build student name from first_name and last_name if available
         first_name = student.get('first_name', '')
         last_name = student.get('last_name', '')
@@ -311,23 +502,18 @@ class ManageStudentsView(QWidget):
         if confirm != QMessageBox.Yes:
             return
         
-        try:
-            # Delete the student using the REST API
-            url = f"{self.firebase.base_url}/students/{student_id}?key={self.firebase.api_key}"
-            headers = {}
-            if self.firebase.id_token:
-                headers["Authorization"] = f"Bearer {self.firebase.id_token}"
-            
-            import requests
-            response = requests.delete(url, headers=headers)
-            response.raise_for_status()
-            
-            # Refresh the students list
-            self.load_students()
-            
-            QMessageBox.information(self, "Success", "Student deleted successfully.")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to delete student: {str(e)}")
+        # Remove the row now and delete the student using the REST API, putting it back if that fails
+        self.update_year_counts(self.student_model.remove_student(student_id))
+        self.tasks.submit(
+            f"delete_student:{student_id}", self.firebase.delete_document, "students", student_id,
+            on_error=lambda error: self.on_student_delete_failed(student_id, student_name, error)
+        )
+    
+    def on_student_delete_failed(self, student_id, student_name, error):
+        self.update_year_counts(self.student_model.restore_student(student_id))
+        QMessageBox.critical(
+            self, "Error", f"Failed to delete student '{student_name}': {error}\n\nThe student has been put back."
+        )
     
     def clear_form(self):
         """Clear the input form"""
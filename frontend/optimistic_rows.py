@@ -0,0 +1,113 @@
+from PySide6.QtCore import QModelIndex
+from PySide6.QtGui import QColor
+from frontend.row_diff import reconcile_rows
+from frontend.item_roles import FOREGROUND_ROLE
+
+# Text colour of rows whose write hasn't been confirmed by the server yet
+PENDING_COLOR = QColor("gray")
+
+class OptimisticRowsMixin:
+    """
+    Lets a table model show a write straight away and undo it if the server rejects it
+
+    Models call init_optimistic_rows() in __init__ and answer
+    the foreground role with pending_foreground(record_id), so rows still being
+    saved are greyed out. Models that implement make_cells(record) get each
+    record's display text worked out once, when it arrives, and data() just
+    looks it up with cells(record). List-backed models set records_attr to the name of
+    their list of record dicts (each with an 'id') and get row-level
+    insert_record(), remove_record() and restore_record(), so a single add or
+    delete never needs the collection to be downloaded again, and
+    replace_records(), which applies a fresh snapshot as a keyed row diff.
+    """
+
+    records_attr = None
+
+    def init_optimistic_rows(self):
+        self.pending_ids = set()  # ids of records whose write is still in flight
+        self.row_cells = {}       # record id -> tuple of display text per column
+    
+    def make_cells(self, record):
+        """Display text of every column for a record (models override this)"""
+        return None
+    
+    def cells(self, record):
+        """A record's display text per column, worked out when it was loaded"""
+        cells = self.row_cells.get(record.get('id'))
+        if cells is None:
+            cells = self.make_cells(record)
+        return cells
+
+    def pending_foreground(self, record_id):
+        return PENDING_COLOR if record_id in self.pending_ids else None
+
+    def is_pending(self, record_id):
+        return record_id in self.pending_ids
+
+    def set_pending(self, record_id, pending):
+        """Mark a record as being saved (greyed out) or confirmed"""
+        if pending:
+            self.pending_ids.add(record_id)
+        else:
+            self.pending_ids.discard(record_id)
+        row = self.row_of(record_id)
+        if row is not None:
+            self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1), [FOREGROUND_ROLE])
+
+    def row_of(self, record_id):
+        """Row showing a record, or None"""
+        for row, record in enumerate(getattr(self, self.records_attr)):
+            if record.get('id') == record_id:
+                return row
+        return None
+
+    def replace_records(self, new_records):
+        """
+        Show a fresh snapshot of the records, changing only the rows that differ
+        Records still being saved stay at the end if the snapshot doesn't have them yet.
+        """
+        records = getattr(self, self.records_attr)
+        new_ids = {record.get('id') for record in new_records}
+        unsaved = [record for record in records if record.get('id') in self.pending_ids and record.get('id') not in new_ids]
+        self.pending_ids.intersection_update({record.get('id') for record in unsaved})
+        new_records = list(new_records) + unsaved
+        
+        # Rows being removed may still be asked for their text until the diff has gone through
+        new_cells = {record.get('id'): self.make_cells(record) for record in new_records}
+        self.row_cells.update(new_cells)
+        reconcile_rows(self, records, new_records, key=lambda record: record.get('id'))
+        self.row_cells = new_cells
+    
+    def insert_record(self, record, row=None, pending=True):
+        """Show a record (at the end unless row is given), greyed out until set_pending(id, False)"""
+        records = getattr(self, self.records_attr)
+        row = len(records) if row is None else min(row, len(records))
+        if pending:
+            self.pending_ids.add(record.get('id'))
+        self.row_cells[record.get('id')] = self.make_cells(record)
+        self.beginInsertRows(QModelIndex(), row, row)
+        records.insert(row, record)
+        self.endInsertRows()
+
+    def remove_record(self, record_id):
+        """
+        Remove a record's row
+        Returns: (row, record) to pass to restore_record(), or None if it isn't shown
+        """
+        row = self.row_of(record_id)
+        if row is None:
+            return None
+        records = getattr(self, self.records_attr)
+        self.beginRemoveRows(QModelIndex(), row, row)
+        record = records.pop(row)
+        self.endRemoveRows()
+        self.pending_ids.discard(record_id)
+        self.row_cells.pop(record_id, None)
+        return row, record
+
+    def restore_record(self, removed):
+        """Put back a row taken out by remove_record()"""
+        # A reload in the meantime may already show it again
+        if removed is not None and self.row_of(removed[1].get('id')) is None:
+            row, record = removed
+            self.insert_record(record, row, pending=False)
@@ -0,0 +1,229 @@
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QLabel, QPushButton, QTableView,
+    QHBoxLayout, QMessageBox, QFileDialog, QProgressBar, QSpinBox
+)
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, Signal, Slot
+from PySide6.QtGui import QFont
+from frontend.item_roles import DISPLAY_ROLE, HORIZONTAL
+from backend.provisioning import StaffProvisioner, read_staff_csv, write_report, summarize_results
+import threading
+import os
+
+class ProvisionTableModel(QAbstractTableModel):
+    """Table model for staff CSV rows and their provisioning results"""
+
+    def __init__(self, rows=None):
+        super().__init__()
+        self.rows = rows or []
+        self.headers = ["Row", "Email", "Name", "Role", "Status", "Error"]
+        self.keys = ["row", "email", "name", "role", "status", "error"]
+
+    def rowCount(self, parent=QModelIndex()):
+        return len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != DISPLAY_ROLE:
+            return None
+        return str(self.rows[index.row()].get(self.keys[index.column()], ""))
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == HORIZONTAL and role == DISPLAY_ROLE:
+            return self.headers[section]
+        return None
+
+    def update_rows(self, rows):
+        self.beginResetModel()
+        self.rows = rows
+        self.endResetModel()
+
+    def update_result(self, result):
+        """Show the outcome of one row"""
+        for position, row in enumerate(self.rows):
+            if row["row"] == result["row"]:
+                self.rows[position] = dict(row, status=result["status"], error=result["error"])
+                self.dataChanged.emit(self.index(position, 0), self.index(position, len(self.headers) - 1))
+                return
+
+class ProvisionStaffView(QWidget):
+    """View for creating staff accounts in bulk from a CSV file"""
+
+    # Emitted from the provisioning thread; delivered on the GUI thread
+    row_finished = Signal(int, int, dict)  # done, total, result
+    provisioning_finished = Signal(list)
+
+    def __init__(self, id_token, user_uid):
+        super().__init__()
+        self.id_token = id_token
+        self.user_uid = user_uid
+        self.csv_path = ""
+        self.csv_rows = []
+        self.results = []
+        self.provisioning = False
+        self.setup_ui()
+
+        self.row_finished.connect(self.on_row_finished)
+        self.provisioning_finished.connect(self.on_provisioning_finished)
+
+    def setup_ui(self):
+        """Set up the user interface"""
+        main_layout = QVBoxLayout()
+
+        # Title
+        title_label = QLabel("Provision Staff Accounts")
+        title_font = QFont()
+        title_font.setPointSize(14)
+        title_font.setBold(True)
+        title_label.setFont(title_font)
+        main_layout.addWidget(title_label)
+
+        help_label = QLabel(
+            "Choose a CSV with email, name, role and (optional) password columns. "
+            "Rows without a password get a temporary one, listed in the saved report."
+        )
+        help_label.setWordWrap(True)
+        main_layout.addWidget(help_label)
+
+        # Controls
+        controls_layout = QHBoxLayout()
+        self.choose_button = QPushButton("Choose CSV...")
+        controls_layout.addWidget(self.choose_button)
+
+        controls_layout.addWidget(QLabel("Parallel sign-ups:"))
+        self.workers_spinbox = QSpinBox()
+        self.workers_spinbox.setRange(1, 16)
+        self.workers_spinbox.setValue(8)
+        controls_layout.addWidget(self.workers_spinbox)
+
+        controls_layout.addStretch()
+        self.start_button = QPushButton("Create Accounts")
+        self.start_button.setEnabled(False)
+        controls_layout.addWidget(self.start_button)
+
+        self.save_report_button = QPushButton("Save Report...")
+        self.save_report_button.setEnabled(False)
+        controls_layout.addWidget(self.save_report_button)
+        main_layout.addLayout(controls_layout)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setValue(0)
+        main_layout.addWidget(self.progress_bar)
+
+        self.status_label = QLabel("No file selected")
+        main_layout.addWidget(self.status_label)
+
+        # Rows and results
+        self.rows_table = QTableView()
+        self.rows_model = ProvisionTableModel()
+        self.rows_table.setModel(self.rows_model)
+        main_layout.addWidget(self.rows_table)
+
+        self.setLayout(main_layout)
+
+        # Connect signals
+        self.choose_button.clicked.connect(self.choose_csv)
+        self.start_button.clicked.connect(self.start_provisioning)
+        self.save_report_button.clicked.connect(self.save_report)
+
+    def choose_csv(self):
+        """Load and validate a staff CSV"""
+        path, _ = QFileDialog.getOpenFileName(self, "Choose Staff CSV", "", "CSV Files (*.csv)")
+        if not path:
+            return
+
+        try:
+            self.csv_rows = read_staff_csv(path)
+        except (OSError, ValueError) as e:
+            QMessageBox.critical(self, "Error", f"Could not read CSV: {str(e)}")
+            return
+
+        self.csv_path = path
+        self.results = []
+        preview = [dict(row, status="invalid" if row["error"] else "ready") for row in self.csv_rows]
+        self.rows_model.update_rows(preview)
+
+        invalid = sum(1 for row in self.csv_rows if row["error"])
+        self.status_label.setText(f"{os.path.basename(path)}: {len(self.csv_rows)} rows, {invalid} invalid")
+        self.progress_bar.setValue(0)
+        self.start_button.setEnabled(len(self.csv_rows) > invalid)
+        self.save_report_button.setEnabled(False)
+
+    def start_provisioning(self):
+        """Create the accounts on a background thread"""
+        reply = QMessageBox.question(
+            self, "Create Accounts",
+            f"Create accounts for the valid rows in {os.path.basename(self.csv_path)}?",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+
+        self.start_button.setEnabled(False)
+        self.choose_button.setEnabled(False)
+        self.progress_bar.setRange(0, len(self.csv_rows))
+        self.progress_bar.setValue(0)
+        self.status_label.setText("Creating accounts...")
+        self.provisioning = True
+
+        provisioner = StaffProvisioner(self.id_token, workers=self.workers_spinbox.value())
+        rows = list(self.csv_rows)
+
+        def run():
+            try:
+                results = provisioner.provision(
+                    rows, lambda done, total, result: self.row_finished.emit(done, total, dict(result))
+                )
+            except Exception as e:
+                print(f"Provisioning failed: {str(e)}")
+                results = []
+            self.provisioning_finished.emit(results)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    @Slot(int, int, dict)
+    def on_row_finished(self, done, total, result):
+        self.progress_bar.setValue(done)
+        self.rows_model.update_result(result)
+
+    @Slot(list)
+    def on_provisioning_finished(self, results):
+        self.provisioning = False
+        self.results = results
+        self.choose_button.setEnabled(True)
+        self.save_report_button.setEnabled(bool(results))
+
+        if not results:
+            QMessageBox.critical(self, "Error", "Provisioning stopped unexpectedly; see the console for details.")
+            self.status_label.setText("Provisioning failed")
+            return
+
+        summary = ", ".join(f"{count} {status}" for status, count in sorted(summarize_results(results).items()))
+        self.status_label.setText(f"Finished: {summary}")
+        QMessageBox.information(
+            self, "Provisioning Finished",
+            f"{summary}\n\nSave the report to hand out temporary passwords."
+        )
+
+    def is_provisioning(self):
+        return self.provisioning
+
+    def release(self):
+        """Forget the loaded CSV and the report, which holds temporary passwords (at logout)"""
+        self.csv_rows = []
+        self.results = []
+        self.rows_model.update_rows([])
+
+    def save_report(self):
+        """Save the per-row result report"""
+        default_path = f"{os.path.splitext(self.csv_path)[0]}_results.csv"
+        path, _ = QFileDialog.getSaveFileName(self, "Save Report", default_path, "CSV Files (*.csv)")
+        if not path:
+            return
+
+        try:
+            write_report(self.results, path)
+            QMessageBox.information(self, "Report Saved", f"Report saved to {path}")
+        except OSError as e:
+            QMessageBox.critical(self, "Error", f"Could not save report: {str(e)}")
@@ -6,28 +6,24 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Qt, QDate
 from PySide6.QtGui import QFont, QColor
 from utils.firebase_client import FirebaseClient
-from docx import Document
-from docx.shared import Pt, Inches, RGBColor, Cm
-from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_COLOR_INDEX
-from docx.enum.table import WD_ALIGN_VERTICAL, WD_TABLE_ALIGNMENT, WD_CELL_VERTICAL_ALIGNMENT
-from docx.enum.section import WD_ORIENT
-from docx.oxml.ns import qn, nsdecls
-from docx.oxml import OxmlElement, parse_xml
-from docx.shared import Twips
+from frontend.lazy_tabs import LoadOnShowMixin
+from frontend.task_runner import TaskRunner
+from services.firebase_transport import timed_operation
 
-class ReportsView(QWidget):
+class ReportsView(LoadOnShowMixin, QWidget):
     """View for generating and viewing student performance reports"""
     
-    def __init__(self, id_token, user_uid, is_admin=False):
+    def __init__(self, id_token, user_uid, is_admin=False, prefetched=None):
         super().__init__()
         self.id_token = id_token
         self.user_uid = user_uid
         self.is_admin = is_admin
-        self.firebase = FirebaseClient(id_token=self.id_token)
+        self.firebase = FirebaseClient(id_token=self.id_token, prefetched=prefetched)
+        self.tasks = TaskRunner(self)  # Runs Firebase calls off the GUI thread
         self.standard_year_groups = ["Y7", "Y8", "Y9", "Y10", "Y11"]
         self.students_by_year = {}  # Cache students by year group
         self.setup_ui()
-        self.load_terms()
+        self.init_load_on_show()
     
     def setup_ui(self):
         """Set up the user interface"""
@@ -106,26 +102,43 @@ class ReportsView(QWidget):
         
         self.setLayout(main_layout)
     
+    def load_visible_data(self):
+        """Load this view's data (called when it is first shown)"""
+        self.load_terms()
+    
+    def release(self):
+        """Cancel loads and drop cached students (at logout)"""
+        super().release()
+        self.students_by_year.clear()
+    
     def load_terms(self):
-        """Load available academic terms"""
-        try:
-            terms = self.firebase.get_collection("terms")
-            
-            self.term_filter.clear()
-            self.term_filter.addItem("-- Select Term --", "")
-            
-            for term in terms:
-                term_id = term.get('id', '')
-                term_name = term.get('name', '')
-                term_year = term.get('year', '')
-                display_text = f"{term_name} {term_year}"
-                self.term_filter.addItem(display_text, term_id)
-                
-        except Exception as e:
-            QMessageBox.warning(self, "Error", f"Failed to load terms: {str(e)}")
+        """Load available academic terms in the background"""
+        self.tasks.submit(
+            "load_terms", self.fetch_terms,
+            on_success=self.on_terms_loaded,
+            on_error=lambda error: QMessageBox.warning(self, "Error", f"Failed to load terms: {error}")
+        )
+    
+    @timed_operation("load_terms")
+    def fetch_terms(self):
+        """Worker thread: read all terms"""
+        return self.firebase.get_collection("terms")
+    
+    def on_terms_loaded(self, terms):
+        self.term_filter.clear()
+        self.term_filter.addItem("-- Select Term --", "")
+        
+        for term in terms:
+            term_id = term.get('id', '')
+            term_name = term.get('name', '')
+            term_year = term.get('year', '')
+            display_text = f"{term_name} {term_year}"
+            self.term_filter.addItem(display_text, term_id)
     
     def on_year_group_changed(self, year_group):
         """Handle year group selection change"""
+        # Students still loading for the previous year group must not fill the selector
+        self.tasks.cancel("load_students")
         if year_group == "-- Select Year Group --":
             self.student_filter.clear()
             self.student_filter.addItem("-- Select Student --")
@@ -137,26 +150,25 @@ class ReportsView(QWidget):
     
     def load_students_by_year_group(self, year_group):
         """Load students for the selected year group"""
-        try:
-            # Check if we already have this year group's students cached
-            if year_group in self.students_by_year:
-                self.update_student_selector(self.students_by_year[year_group])
-                return
-                
-            # Query students by year group
-            students = self.firebase.query_collection_with_filters(
-                "students", 
-                [("year_group", "==", year_group)]
-            )
-            
-            # Cache the results
-            self.students_by_year[year_group] = students
-            
-            # Update the student selector
-            self.update_student_selector(students)
+        # Check if we already have this year group's students cached
+        if year_group in self.students_by_year:
+            self.update_student_selector(self.students_by_year[year_group])
+            return
             
-        except Exception as e:
-            QMessageBox.warning(self, "Error", f"Failed to load students: {str(e)}")
+        # Query students by year group
+        self.tasks.submit(
+            "load_students", self.firebase.query_collection_with_filters,
+            "students", [("year_group", "==", year_group)],
+            on_success=lambda students: self.on_students_loaded(year_group, students),
+            on_error=lambda error: QMessageBox.warning(self, "Error", f"Failed to load students: {error}")
+        )
+    
+    def on_students_loaded(self, year_group, students):
+        # Cache the results
+        self.students_by_year[year_group] = students
+        
+        # Update the student selector
+        self.update_student_selector(students)
     
     def update_student_selector(self, students):
         """Update the student selector dropdown with the provided students"""
@@ -206,109 +218,129 @@ class ReportsView(QWidget):
             )
             return
             
-        try:
-            # Show loading indicator
-            self.setCursor(Qt.WaitCursor)
-            
-            # Get the student details for display
-            student_name = self.student_filter.currentText()
-            term_name = self.term_filter.currentText()
-            
-            # Update the student info display
-            self.student_info_label.setText(
-                f"<b>Student:</b> {student_name} | <b>Year Group:</b> {year_group} | <b>Term:</b> {term_name}"
-            )
-            
-            # Query Firestore for all results matching this term
-            results = self.firebase.query_collection_with_filters(
-                "results", 
-                [("term_id", "==", term_id)]
-            )
-            
-            # Clear existing table data
-            self.report_table.setRowCount(0)
-            
-            # Process results
-            if not results:
-                QMessageBox.information(self, "No Data", f"No results found for {term_name}")
-                self.setCursor(Qt.ArrowCursor)
-                return
-                
-            # Find all subjects this student has grades for
-            student_grades = []
-            
-            for result in results:
-                # Check if this document contains results for our student
-                student_results = result.get('student_results', {})
-                if student_id in student_results:
-                    subject = result.get('subject', 'Unknown')
-                    grades_data = student_results[student_id]
-                    
-                    # Handle both old format (string) and new format (dict)
-                    grades = {
-                        "current_grade": "",
-                        "target_grade": "", 
-                        "homework": "", 
-                        "behaviour": "", 
-                        "punctuality": ""
-                    }
-                    
-                    if isinstance(grades_data, str):
-                        # Legacy format - just contains achievement/current grade
-                        grades["current_grade"] = grades_data
-                    elif isinstance(grades_data, dict):
-                        # Handle both old and new category names
-                        if "achievement" in grades_data:
-                            grades["current_grade"] = grades_data["achievement"]
-                        if "target" in grades_data:
-                            grades["target_grade"] = grades_data["target"]
-                        
-                        # Handle current naming convention
-                        for category in grades.keys():
-                            if category in grades_data:
-                                grades[category] = grades_data[category]
-                                
-                    student_grades.append({
-                        'subject': subject,
-                        'grades': grades
-                    })
-            
-            # Sort by subject name
-            student_grades.sort(key=lambda x: x['subject'])
+        # Show loading indicator
+        self.setCursor(Qt.WaitCursor)
+        self.generate_report_button.setEnabled(False)
+        
+        # Get the student details for display
+        student_name = self.student_filter.currentText()
+        term_name = self.term_filter.currentText()
+        
+        # Update the student info display
+        self.student_info_label.setText(
+            f"<b>Student:</b> {student_name} | <b>Year Group:</b> {year_group} | <b>Term:</b> {term_name}"
+        )
+        
+        self.tasks.submit(
+            "generate_report", self.fetch_report, student_id, year_group, term_id,
+            on_success=lambda student_grades: self.show_report(term_name, student_grades),
+            on_error=self.on_report_failed
+        )
+    
+    @timed_operation("generate_report")
+    def fetch_report(self, student_id, year_group, term_id):
+        """
+        Worker thread: read the term's results and pick out this student's grades
+        Returns: list of {'subject', 'grades'} sorted by subject, or None if the term has no results
+        """
+        # Query Firestore for all results matching this term
+        results = self.firebase.query_collection_with_filters(
+            "results", 
+            [("term_id", "==", term_id)]
+        )
+        
+        if not results:
+            return None
             
-            # Display results in the table
-            for i, grade_info in enumerate(student_grades):
-                self.report_table.insertRow(i)
-                
-                # Get the subject and grades
-                subject = grade_info['subject']
-                grades = grade_info['grades']
+        # Find all subjects this student has grades for
+        student_grades = []
+        
+        for result in results:
+            # Check if this document contains results for our student
+            student_results = result.get('student_results', {})
+            if student_id in student_results:
+                subject = result.get('subject', 'Unknown')
+                grades_data = student_results[student_id]
                 
-                # Set the subject cell
-                self.report_table.setItem(i, 0, QTableWidgetItem(subject))
+                # Handle both old format (string) and new format (dict)
+                grades = {
+                    "current_grade": "",
+                    "target_grade": "", 
+                    "homework": "", 
+                    "behaviour": "", 
+                    "punctuality": ""
+                }
                 
-                # Set the grade cells for each category using updated category names
-                categories = ["current_grade", "target_grade", "homework", "behaviour", "punctuality"]
-                for j, category in enumerate(categories):
-                    value = grades.get(category, "")
-                    item = QTableWidgetItem(value)
-                    item.setTextAlignment(Qt.AlignCenter)
+                if isinstance(grades_data, str):
+                    # Legacy format - just contains achievement/current grade
+                    grades["current_grade"] = grades_data
+                elif isinstance(grades_data, dict):
+                    # Handle both old and new category names
+                    if "achievement" in grades_data:
+                        grades["current_grade"] = grades_data["achievement"]
+                    if "target" in grades_data:
+                        grades["target_grade"] = grades_data["target"]
                     
-                    # Remove color formatting from the view - only keep it in the export
-                    self.report_table.setItem(i, j + 1, item)
-            
-            # Optionally, fetch attendance data as well if we want to show percentage
-            self.load_attendance_data(student_id, year_group, term_id)
-            
-            self.setCursor(Qt.ArrowCursor)
-            
-        except Exception as e:
-            self.setCursor(Qt.ArrowCursor)
-            QMessageBox.warning(self, "Error", f"Failed to generate report: {str(e)}")
-            print(f"Error generating report: {str(e)}")
+                    # Handle current naming convention
+                    for category in grades.keys():
+                        if category in grades_data:
+                            grades[category] = grades_data[category]
+                            
+                student_grades.append({
+                    'subject': subject,
+                    'grades': grades
+                })
+        
+        # Sort by subject name
+        student_grades.sort(key=lambda x: x['subject'])
+        
+        # Optionally, fetch attendance data as well if we want to show percentage
+        self.load_attendance_data(student_id, year_group, term_id)
+        
+        return student_grades
+    
+    def show_report(self, term_name, student_grades):
+        """Fill the report table with the student's grades"""
+        self.setCursor(Qt.ArrowCursor)
+        self.generate_report_button.setEnabled(True)
+        
+        # Clear existing table data
+        self.report_table.setRowCount(0)
+        
+        # Process results
+        if student_grades is None:
+            QMessageBox.information(self, "No Data", f"No results found for {term_name}")
+            return
+        
+        # Display results in the table
+        for i, grade_info in enumerate(student_grades):
+            self.report_table.insertRow(i)
+            
+            # Get the subject and grades
+            subject = grade_info['subject']
+            grades = grade_info['grades']
+            
+            # Set the subject cell
+            self.report_table.setItem(i, 0, QTableWidgetItem(subject))
+            
+            # Set the grade cells for each category using updated category names
+            categories = ["current_grade", "target_grade", "homework", "behaviour", "punctuality"]
+            for j, category in enumerate(categories):
+                value = grades.get(category, "")
+                item = QTableWidgetItem(value)
+                item.setTextAlignment(Qt.AlignCenter)
+                
+                # Remove color formatting from the view - only keep it in the export
+                self.report_table.setItem(i, j + 1, item)
+    
+    def on_report_failed(self, error):
+        self.setCursor(Qt.ArrowCursor)
+        self.generate_report_button.setEnabled(True)
+        QMessageBox.warning(self, "Error", f"Failed to generate report: {error}")
+        print(f"Error generating report: {error}")
 
     def load_attendance_data(self, student_id, year_group, term_id):
-        """Load attendance data for the student"""
+        """Load attendance data for the student (runs on the report worker)"""
         try:
             # This would need to analyze attendance records from the attendance collection
             # and calculate attendance percentages
@@ -334,6 +366,14 @@ class ReportsView(QWidget):
         if self.report_table.rowCount() == 0:
             QMessageBox.warning(self, "No Data", "There is no report data to export.")
             return
+        
+        # python-docx (and lxml) are only imported by users who actually export
+        from docx import Document
+        from docx.shared import Pt, Cm
+        from docx.enum.text import WD_ALIGN_PARAGRAPH
+        from docx.enum.section import WD_ORIENT
+        from docx.oxml.ns import qn, nsdecls
+        from docx.oxml import OxmlElement, parse_xml
             
         try:
             # Get file save location from user
@@ -0,0 +1,111 @@
+import time
+import requests
+from frontend.task_runner import TaskRunner
+from utils.class_usage import get_class_usage
+from utils.class_rosters import assigned_classes
+
+# Prefetches wait behind any other background work
+PREFETCH_PRIORITY = -1
+
+# At most this many of a teacher's classes are prefetched, most likely first
+MAX_PREFETCHED_CLASSES = 12
+
+# Prefetched reads older than this (seconds) are dropped, so a class opened later is read live
+ROSTER_PREFETCH_MAX_AGE = 10 * 60
+
+class RosterPrefetcher:
+    """
+    Reads a teacher's classes ahead of time, so switching between them is instant
+
+    plan_reads(subject, year_group) returns the FirebaseClient reads a view
+    makes to open a class, as (method name, args). start() makes them for
+    every assigned class, most likely first (see ClassUsageLog), one at a
+    time and behind any other background work, and leaves each result in
+    the client's prefetched results, where the view's own read picks it up.
+    Views call expire() before opening a class, so a stale read is never
+    used, and start() again afterwards to replace what was used.
+    """
+
+    def __init__(self, parent, firebase, plan_reads, user_uid):
+        self.firebase = firebase
+        self.plan_reads = plan_reads
+        self.user_uid = user_uid
+        self.usage = get_class_usage()
+        # Separate from the view's runner, so prefetching never holds up its idle signal
+        self.tasks = TaskRunner(parent)
+        self.classes = []
+        self.queue = []         # (key, method name, args) still to read
+        self.reading = None     # key being read
+        self.fetched_at = {}    # read key -> when it was prefetched
+
+    def set_assignments(self, teacher_assignments, standard_year_groups):
+        """Prefetch for these assignments, replacing anything read for earlier ones"""
+        self.classes = assigned_classes(teacher_assignments, standard_year_groups)
+        for key in self.fetched_at:
+            self.firebase.prefetched.pop(key, None)
+        self.fetched_at = {}
+        self.start()
+
+    def start(self):
+        """Queue every read not already waiting in the client, for the classes most likely to be opened now"""
+        self.expire()
+        queued = set()
+        self.queue = []
+        for subject, year_group in self.usage.rank(self.user_uid, self.classes)[:MAX_PREFETCHED_CLASSES]:
+            for method_name, args in self.plan_reads(subject, year_group):
+                key = getattr(self.firebase, method_name).snapshot_key(*args)
+                if key not in queued and key != self.reading and key not in self.firebase.prefetched:
+                    queued.add(key)
+                    self.queue.append((key, method_name, args))
+        if not self.tasks.is_running("prefetch"):
+            self._read_next()
+
+    def expire(self):
+        """Drop prefetched reads that are too old to show"""
+        cutoff = time.time() - ROSTER_PREFETCH_MAX_AGE
+        for key, fetched_at in list(self.fetched_at.items()):
+            if fetched_at < cutoff or key not in self.firebase.prefetched:
+                self.firebase.prefetched.pop(key, None)
+                del self.fetched_at[key]
+
+    def record_use(self, subject, year_group):
+        """Note that a class was opened, to rank it higher at this time of the week"""
+        self.usage.record(self.user_uid, subject, year_group)
+
+    def cancel(self):
+        """Stop prefetching (at logout)"""
+        self.queue = []
+        self.reading = None
+        self.tasks.cancel_all()
+
+    def _read_next(self):
+        self.reading = None
+        if not self.queue:
+            return
+        key, method_name, args = self.queue.pop(0)
+        self.reading = key
+        self.tasks.submit(
+            "prefetch", self._read, method_name, args, priority=PREFETCH_PRIORITY,
+            on_success=lambda result: self._on_read(key, result),
+            on_error=self._on_failed
+        )
+
+    def _read(self, method_name, args):
+        """Worker thread: make one read"""
+        try:
+            return getattr(self.firebase, method_name)(*args)
+        except requests.HTTPError as e:
+            if method_name == "get_document" and e.response is not None and e.response.status_code == 404:
+                return None  # Not saved yet, which is worth knowing ahead of time too
+            raise
+
+    def _on_read(self, key, result):
+        self.firebase.prefetched[key] = result
+        self.fetched_at[key] = time.time()
+        self._read_next()
+
+    def _on_failed(self, error):
+        # Most likely offline; the view's own reads will report it
+        print(f"Roster prefetch stopped: {error}")
+        self.queue = []
+        self.reading = None
@@ -0,0 +1,114 @@
+from PySide6.QtCore import QModelIndex
+
+# Above this many separate runs of added or removed rows, one reset is cheaper than row signals
+MAX_ROW_CHANGE_RUNS = 200
+
+def reconcile_rows(model, rows, new_rows, key=None, changed=None, max_runs=MAX_ROW_CHANGE_RUNS):
+    """
+    Turn a model's row list into new_rows with row-level signals instead of a reset
+
+    rows is the list the model's data() reads; it is changed in place. Items
+    are matched by key(item) (the item itself if no key is given). Rows that
+    went are removed and rows that came are inserted, each as contiguous runs;
+    kept rows that changed order are rearranged in one layout change that
+    keeps the selection on the same items; and kept rows for which
+    changed(old, new) is true (by default, old != new) get one dataChanged
+    per contiguous range. The view keeps its selection, scroll position and
+    layout caches, and the work is proportional to what changed.
+
+    Falls back to a reset when keys repeat, or when the change breaks into
+    more than max_runs separate runs of rows.
+    """
+    old_keys = [key(item) for item in rows] if key else list(rows)
+    new_keys = [key(item) for item in new_rows] if key else list(new_rows)
+    old_set = set(old_keys)
+    new_set = set(new_keys)
+    if len(old_set) != len(old_keys) or len(new_set) != len(new_keys):
+        _reset(model, rows, new_rows)
+        return
+
+    removed_runs = _runs(old_keys, new_set)
+    inserted_runs = _runs(new_keys, old_set)
+    if len(removed_runs) + len(inserted_runs) > max_runs:
+        _reset(model, rows, new_rows)
+        return
+
+    for start, end in reversed(removed_runs):
+        model.beginRemoveRows(QModelIndex(), start, end - 1)
+        del rows[start:end]
+        model.endRemoveRows()
+
+    kept_keys = [item_key for item_key in old_keys if item_key in new_set]
+    new_kept_keys = [item_key for item_key in new_keys if item_key in old_set]
+    if kept_keys != new_kept_keys:
+        _reorder(model, rows, kept_keys, new_kept_keys)
+
+    # Kept rows are now in their final order, so everything before each run is already in place
+    for start, end in inserted_runs:
+        model.beginInsertRows(QModelIndex(), start, end - 1)
+        rows[start:start] = new_rows[start:end]
+        model.endInsertRows()
+
+    if key is None:
+        return  # Items are their own keys, so kept rows can't have changed
+
+    changed_rows = []
+    for row, item in enumerate(new_rows):
+        old_item = rows[row]
+        if old_item is item:
+            continue
+        rows[row] = item
+        if changed(old_item, item) if changed else old_item != item:
+            changed_rows.append(row)
+    _emit_changed(model, changed_rows)
+
+def _runs(keys, keep):
+    """(start, end) ranges of consecutive keys that are not in keep"""
+    runs = []
+    start = None
+    for i, item_key in enumerate(keys):
+        if item_key in keep:
+            if start is not None:
+                runs.append((start, i))
+                start = None
+        elif start is None:
+            start = i
+    if start is not None:
+        runs.append((start, len(keys)))
+    return runs
+
+def _reorder(model, rows, kept_keys, new_kept_keys):
+    """Rearrange rows (holding the items of kept_keys) into new_kept_keys order as one layout change"""
+    model.layoutAboutToBeChanged.emit()
+
+    new_row_of = {item_key: row for row, item_key in enumerate(new_kept_keys)}
+    persistent = model.persistentIndexList()
+    if persistent:
+        model.changePersistentIndexList(
+            persistent,
+            [model.index(new_row_of[kept_keys[index.row()]], index.column()) for index in persistent]
+        )
+
+    item_of = dict(zip(kept_keys, rows))
+    rows[:] = [item_of[item_key] for item_key in new_kept_keys]
+
+    model.layoutChanged.emit()
+
+def _emit_changed(model, changed_rows):
+    """One dataChanged per contiguous range of changed rows"""
+    if not changed_rows:
+        return
+    last_column = model.columnCount() - 1
+    start = previous = changed_rows[0]
+    for row in changed_rows[1:] + [None]:
+        if row is not None and row == previous + 1:
+            previous = row
+            continue
+        model.dataChanged.emit(model.index(start, 0), model.index(previous, last_column))
+        if row is not None:
+            start = previous = row
+
+def _reset(model, rows, new_rows):
+    model.beginResetModel()
+    rows[:] = new_rows
+    model.endResetModel()
@@ -0,0 +1,143 @@
+import itertools
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QTimer, Signal, Slot
+
+class _TaskSignals(QObject):
+    """Signals a task emits from its worker thread"""
+    finished = Signal(int, object)  # task id, result
+    failed = Signal(int, str)       # task id, error message
+
+class _Task(QRunnable):
+    """Runs one data operation on the thread pool"""
+
+    def __init__(self, task_id, fn, args, kwargs):
+        super().__init__()
+        self.task_id = task_id
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.cancelled = False
+        self.signals = _TaskSignals()
+        # The runner keeps the Python object alive until its result has been delivered
+        self.setAutoDelete(False)
+
+    def run(self):
+        if self.cancelled:
+            # Still report back so the runner can release the task
+            self.signals.finished.emit(self.task_id, None)
+            return
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.failed.emit(self.task_id, str(e))
+        else:
+            self.signals.finished.emit(self.task_id, result)
+
+class TaskRunner(QObject):
+    """
+    Runs a view's network calls on the shared QThreadPool
+
+    submit() runs fn(*args) on a worker thread and calls on_success(result)
+    or on_error(message) back on the GUI thread. Tasks are keyed: submitting
+    a new task under a key that is still running makes the older one stale,
+    so its result is dropped (and it is skipped if it hasn't started yet).
+    debounce() delays a callback until a selector has stopped changing.
+    idle is emitted whenever the last outstanding task has been delivered.
+    """
+
+    idle = Signal()
+
+    _ids = itertools.count(1)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool.globalInstance()
+        self._tasks = {}       # task id -> (task, key, on_success, on_error), until delivered
+        self._current = {}     # key -> task id of the latest task for that key
+        self._timers = {}      # key -> debounce QTimer
+        self._debounced = {}   # key -> callback to run when its timer fires
+
+    def submit(self, key, fn, *args, on_success=None, on_error=None, priority=0, **kwargs):
+        """
+        Run fn(*args, **kwargs) in the background; returns the task id
+        priority: place in the queue while every thread is busy (higher runs first)
+        """
+        self.cancel(key)
+
+        task_id = next(self._ids)
+        task = _Task(task_id, fn, args, kwargs)
+        # Delivered through this GUI-thread object, so callbacks run on the GUI thread
+        task.signals.finished.connect(self._on_finished)
+        task.signals.failed.connect(self._on_failed)
+
+        self._tasks[task_id] = (task, key, on_success, on_error)
+        self._current[key] = task_id
+        self.pool.start(task, priority)
+        return task_id
+
+    def debounce(self, key, delay_ms, callback):
+        """Call callback once, delay_ms after the last debounce() for this key"""
+        self._debounced[key] = callback
+        timer = self._timers.get(key)
+        if timer is None:
+            timer = QTimer(self)
+            timer.setSingleShot(True)
+            timer.timeout.connect(lambda: self._debounced.pop(key, lambda: None)())
+            self._timers[key] = timer
+        timer.start(delay_ms)
+
+    def is_running(self, key):
+        return key in self._current
+
+    def has_pending(self):
+        """True while any task is queued, running or waiting to be delivered"""
+        return bool(self._tasks)
+
+    def cancel(self, key):
+        """Drop the task for a key: skipped if queued, result ignored if already running"""
+        task_id = self._current.pop(key, None)
+        if task_id is None or task_id not in self._tasks:
+            return
+        task = self._tasks[task_id][0]
+        task.cancelled = True
+        if self.pool.tryTake(task):
+            del self._tasks[task_id]  # Never started, so no signal will arrive
+
+    def cancel_all(self):
+        for key in list(self._current):
+            self.cancel(key)
+        for timer in self._timers.values():
+            timer.stop()
+        self._debounced.clear()
+
+    def _take(self, task_id):
+        entry = self._tasks.pop(task_id, None)
+        if entry is None or entry[0].cancelled:
+            return None  # Cancelled or superseded
+        task, key, on_success, on_error = entry
+        if self._current.get(key) == task_id:
+            del self._current[key]
+        return on_success, on_error
+
+    @Slot(int, object)
+    def _on_finished(self, task_id, result):
+        callbacks = self._take(task_id)
+        if callbacks and callbacks[0]:
+            callbacks[0](result)
+        self._emit_if_idle()
+
+    @Slot(int, str)
+    def _on_failed(self, task_id, error_message):
+        callbacks = self._take(task_id)
+        if callbacks is None:
+            self._emit_if_idle()
+            return
+        if callbacks[1]:
+            callbacks[1](error_message)
+        else:
+            print(f"Background task failed: {error_message}")
+        self._emit_if_idle()
+
+    def _emit_if_idle(self):
+        # A callback may have submitted follow-up work (e.g. reload after a save)
+        if not self._tasks:
+            self.idle.emit()
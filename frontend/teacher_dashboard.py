@@ -1,13 +1,11 @@
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-    QStackedWidget, QTabWidget
+    QStackedWidget
 )
 from PySide6.QtCore import Qt, Signal
 from PySide6.QtGui import QFont
 
-from frontend.attendance_register_view import AttendanceRegisterView
-from frontend.input_results_view import InputResultsView
-from frontend.reports_view import ReportsView
+from frontend.lazy_tabs import LazyTabWidget, import_view
 
 class TeacherDashboard(QWidget):
     """Dashboard view for teachers"""
@@ -15,13 +13,12 @@ class TeacherDashboard(QWidget):
     # Add logout signal
     logout_requested = Signal()
     
-    def __init__(self, id_token, user_uid, name=""):
+    def __init__(self, id_token, user_uid, name="", prefetched=None):
         super().__init__()
         self.id_token = id_token
         self.user_uid = user_uid
         self.user_name = name
-        # Debug: Print the user_uid to verify it's set correctly
-        print(f"Teacher Dashboard initialized with user_uid: {self.user_uid}")
+        self.prefetched = prefetched or {}  # Bootstrap reads, handed to each tab's view
         self.setup_ui()
     
     def setup_ui(self):
@@ -52,23 +49,32 @@ class TeacherDashboard(QWidget):
         
         main_layout.addLayout(header_layout)
         
-        # Tab widget for different teacher functions
-        self.tab_widget = QTabWidget()
-        
-        # Create tabs and ensure user_uid is passed correctly
-        self.attendance_tab = AttendanceRegisterView(self.id_token, self.user_uid)
-        self.results_tab = InputResultsView(self.id_token, self.user_uid)
-        self.reports_tab = ReportsView(self.id_token, self.user_uid, is_admin=False)
-        
-        # Add tabs to widget
-        self.tab_widget.addTab(self.attendance_tab, "Attendance Register")
-        self.tab_widget.addTab(self.results_tab, "Input Results")
-        self.tab_widget.addTab(self.reports_tab, "View Reports")
+        # Tab widget for different teacher functions; each tab's module is imported, and its view built and loaded, when first opened
+        self.tab_widget = LazyTabWidget()
+        self.tab_widget.add_lazy_tab("attendance", lambda: import_view("frontend.attendance_register_view", "AttendanceRegisterView")(self.id_token, self.user_uid, prefetched=self.prefetched), "Attendance Register")
+        self.tab_widget.add_lazy_tab("results", lambda: import_view("frontend.input_results_view", "InputResultsView")(self.id_token, self.user_uid, prefetched=self.prefetched), "Input Results")
+        self.tab_widget.add_lazy_tab("reports", lambda: import_view("frontend.reports_view", "ReportsView")(self.id_token, self.user_uid, is_admin=False, prefetched=self.prefetched), "View Reports")
         
         main_layout.addWidget(self.tab_widget)
         
         self.setLayout(main_layout)
     
+    def refresh_data(self):
+        """Reload the tabs built so far (hidden ones reload when next shown)"""
+        for view in self.tab_widget.built_views():
+            view.refresh_data()
+    
+    def save_drafts(self):
+        """Write unsynced changes in the tabs built so far to disk (when the app closes)"""
+        for view in self.tab_widget.built_views():
+            if hasattr(view, "save_draft"):
+                view.save_draft()
+    
+    def release(self):
+        """Release every tab's per-user data and background work (at logout)"""
+        self.tab_widget.release_views()
+        self.prefetched = {}
+    
     def handle_logout(self):
         """Handle logout button click"""
         self.logout_requested.emit()
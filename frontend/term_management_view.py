@@ -1,21 +1,29 @@
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QPushButton, QTableView,
     QHBoxLayout, QFormLayout, QLineEdit, QMessageBox,
-    QComboBox
+    QComboBox, QDateEdit
 )
-from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PySide6.QtCore import Qt, QDate, QAbstractTableModel, QModelIndex
 from PySide6.QtGui import QFont
 from utils.firebase_client import FirebaseClient
+from frontend.lazy_tabs import LoadOnShowMixin
+from frontend.optimistic_rows import OptimisticRowsMixin
+from frontend.task_runner import TaskRunner
+from frontend.item_roles import DISPLAY_ROLE, FOREGROUND_ROLE, HORIZONTAL
+from services.firebase_transport import timed_operation
 from datetime import datetime
 import uuid
 
-class TermTableModel(QAbstractTableModel):
+class TermTableModel(OptimisticRowsMixin, QAbstractTableModel):
     """Table model for academic terms"""
     
+    records_attr = "terms"
+    
     def __init__(self, terms=None):
         super().__init__()
         self.terms = terms or []
-        self.headers = ["ID", "Name", "Year"]  # Removed start and end date headers
+        self.headers = ["ID", "Name", "Year", "Start Date", "End Date"]
+        self.init_optimistic_rows()
     
     def rowCount(self, parent=QModelIndex()):
         return len(self.terms)
@@ -24,42 +32,43 @@ class TermTableModel(QAbstractTableModel):
         return len(self.headers)
     
     def data(self, index, role=Qt.DisplayRole):
-        if not index.isValid() or role != Qt.DisplayRole:
+        if not index.isValid():
             return None
         
         term = self.terms[index.row()]
-        col = index.column()
-        
-        if col == 0:
-            return term.get('id', '')
-        elif col == 1:
-            return term.get('name', '')
-        elif col == 2:
-            return term.get('year', '')
-        # Removed columns for start_date and end_date
+        if role == FOREGROUND_ROLE:
+            return self.pending_foreground(term.get('id'))
+        if role != DISPLAY_ROLE:
+            return None
         
-        return None
+        return self.cells(term)[index.column()]
+    
+    def make_cells(self, term):
+        # Older terms were saved without dates
+        return (
+            term.get('id', ''), term.get('name', ''), term.get('year', ''),
+            term.get('start_date', ''), term.get('end_date', '')
+        )
     
     def headerData(self, section, orientation, role=Qt.DisplayRole):
-        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+        if orientation == HORIZONTAL and role == DISPLAY_ROLE:
             return self.headers[section]
         return None
     
     def update_terms(self, terms):
-        self.beginResetModel()
-        self.terms = terms
-        self.endResetModel()
+        self.replace_records(terms)
 
-class TermManagementView(QWidget):
+class TermManagementView(LoadOnShowMixin, QWidget):
     """View for managing academic terms"""
     
-    def __init__(self, id_token, user_uid):
+    def __init__(self, id_token, user_uid, prefetched=None):
         super().__init__()
         self.id_token = id_token
         self.user_uid = user_uid
-        self.firebase = FirebaseClient(id_token=self.id_token)
+        self.firebase = FirebaseClient(id_token=self.id_token, prefetched=prefetched)
+        self.tasks = TaskRunner(self)  # Runs Firebase calls off the GUI thread
         self.setup_ui()
-        self.load_terms()
+        self.init_load_on_show()
     
     def setup_ui(self):
         """Set up the user interface"""
@@ -88,7 +97,17 @@ class TermManagementView(QWidget):
         self.year_input.setText(current_year)
         form_layout.addRow("Year:", self.year_input)
         
-        # Removed start_date and end_date inputs
+        # Start and end dates, which put the terms in order (e.g. to find the previous term)
+        self.start_date_input = QDateEdit()
+        self.start_date_input.setCalendarPopup(True)
+        self.start_date_input.setDisplayFormat("yyyy-MM-dd")
+        form_layout.addRow("Start Date:", self.start_date_input)
+        
+        self.end_date_input = QDateEdit()
+        self.end_date_input.setCalendarPopup(True)
+        self.end_date_input.setDisplayFormat("yyyy-MM-dd")
+        form_layout.addRow("End Date:", self.end_date_input)
+        self.reset_dates()
         
         button_layout = QHBoxLayout()
         self.add_term_button = QPushButton("Add Term")
@@ -117,15 +136,28 @@ class TermManagementView(QWidget):
         self.clear_form_button.clicked.connect(self.clear_form)
         self.delete_term_button.clicked.connect(self.delete_term)
     
+    def load_visible_data(self):
+        """Load this view's data (called when it is first shown)"""
+        self.load_terms()
+    
     def load_terms(self):
-        """Load terms from Firebase"""
-        try:
-            terms = self.firebase.get_collection("terms")
-            self.term_model.update_terms(terms)
-            # Adjust column widths
-            self.terms_table.resizeColumnsToContents()
-        except Exception as e:
-            QMessageBox.warning(self, "Error", f"Failed to load terms: {str(e)}")
+        """Load terms from Firebase in the background"""
+        self.tasks.submit(
+            "load_terms", self.fetch_terms,
+            on_success=self.on_terms_loaded,
+            on_error=lambda error: QMessageBox.warning(self, "Error", f"Failed to load terms: {error}")
+        )
+    
+    @timed_operation("load_terms")
+    def fetch_terms(self):
+        """Worker thread: read all terms"""
+        return self.firebase.get_collection("terms")
+    
+    def on_terms_loaded(self, terms):
+        """Show loaded terms"""
+        self.term_model.update_terms(terms)
+        # Adjust column widths
+        self.terms_table.resizeColumnsToContents()
     
     def add_term(self):
         """Handle adding a new term"""
@@ -136,29 +168,36 @@ class TermManagementView(QWidget):
             QMessageBox.warning(self, "Input Error", "Please enter a year.")
             return
         
-        # Removed date validation since we no longer have date fields
-        
-        try:
-            # Generate a unique term ID
-            term_id = str(uuid.uuid4())
-            
-            # Create term in Firebase with only name and year
-            term_data = {
-                "name": term_type,
-                "year": year
-            }
-            
-            self.firebase.create_document("terms", term_id, term_data)
-            
-            # Refresh the terms list
-            self.load_terms()
-            
-            # Clear the form
-            self.clear_form()
-            
-            QMessageBox.information(self, "Success", "Term added successfully.")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to add term: {str(e)}")
+        start_date = self.start_date_input.date()
+        end_date = self.end_date_input.date()
+        if end_date <= start_date:
+            QMessageBox.warning(self, "Input Error", "The end date must be after the start date.")
+            return
+        
+        # Generate a unique term ID
+        term_id = str(uuid.uuid4())
+        
+        # Dates are stored as yyyy-MM-dd, so they sort as text
+        term_data = {
+            "name": term_type,
+            "year": year,
+            "start_date": start_date.toString("yyyy-MM-dd"),
+            "end_date": end_date.toString("yyyy-MM-dd")
+        }
+        
+        # Show the term straight away (greyed out until the server confirms it)
+        self.term_model.insert_record({"id": term_id, **term_data})
+        self.clear_form()
+        
+        self.tasks.submit(
+            f"add_term:{term_id}", self.firebase.create_document, "terms", term_id, term_data,
+            on_success=lambda result: self.term_model.set_pending(term_id, False),
+            on_error=lambda error: self.on_term_add_failed(term_id, error)
+        )
+    
+    def on_term_add_failed(self, term_id, error):
+        self.term_model.remove_record(term_id)
+        QMessageBox.critical(self, "Error", f"Failed to add term: {error}\n\nThe term has been removed from the list.")
     
     def delete_term(self):
         """Delete the selected term"""
@@ -174,6 +213,10 @@ class TermManagementView(QWidget):
         if not term_id:
             return
         
+        if self.term_model.is_pending(term_id):
+            QMessageBox.warning(self, "Please Wait", "This term is still being saved. Try again in a moment.")
+            return
+        
         # Confirm deletion
         confirm = QMessageBox.question(
             self,
@@ -185,23 +228,16 @@ class TermManagementView(QWidget):
         if confirm != QMessageBox.Yes:
             return
         
-        try:
-            # Delete the term using the REST API
-            url = f"{self.firebase.base_url}/terms/{term_id}?key={self.firebase.api_key}"
-            headers = {}
-            if self.firebase.id_token:
-                headers["Authorization"] = f"Bearer {self.firebase.id_token}"
-            
-            import requests
-            response = requests.delete(url, headers=headers)
-            response.raise_for_status()
-            
-            # Refresh the terms list
-            self.load_terms()
-            
-            QMessageBox.information(self, "Success", "Term deleted successfully.")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to delete term: {str(e)}")
+        # Remove the row now and delete the term using the REST API, putting it back if that fails
+        removed = self.term_model.remove_record(term_id)
+        self.tasks.submit(
+            f"delete_term:{term_id}", self.firebase.delete_document, "terms", term_id,
+            on_error=lambda error: self.on_term_delete_failed(removed, error)
+        )
+    
+    def on_term_delete_failed(self, removed, error):
+        self.term_model.restore_record(removed)
+        QMessageBox.critical(self, "Error", f"Failed to delete term: {error}\n\nThe term has been put back.")
     
     def clear_form(self):
         """Clear the input form"""
@@ -209,3 +245,9 @@ class TermManagementView(QWidget):
         self.term_type_dropdown.setCurrentIndex(0)
         # Reset year to current year
         self.year_input.setText(str(datetime.now().year))
+        self.reset_dates()
+    
+    def reset_dates(self):
+        """Default to a term starting today and lasting 12 weeks"""
+        self.start_date_input.setDate(QDate.currentDate())
+        self.end_date_input.setDate(QDate.currentDate().addDays(12 * 7))
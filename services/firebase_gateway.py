@@ -0,0 +1,358 @@
+import os
+import sys
+import json
+import time
+import base64
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, unquote, parse_qsl, urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Upstream services the gateway forwards to, by first path segment
+DEFAULT_UPSTREAMS = {
+    "firestore": "https://firestore.googleapis.com",
+    "identitytoolkit": "https://identitytoolkit.googleapis.com",
+    "securetoken": "https://securetoken.googleapis.com"
+}
+
+# Firestore POST methods that only read data and can be cached
+READ_METHODS = (":runQuery", ":batchGet", ":partitionQuery")
+
+# Tag for cache entries whose collection can't be worked out; dropped on any write
+ANY_COLLECTION = "*"
+
+class _CacheEntry:
+    def __init__(self, status, content_type, body, collections, expires_at):
+        self.status = status
+        self.content_type = content_type
+        self.body = body
+        self.collections = collections
+        self.expires_at = expires_at
+
+class _InFlight:
+    """A read that is currently being fetched upstream, shared by identical requests"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+class FirebaseGateway:
+    """
+    Caching gateway shared by the desktops at one school site
+
+    Reads (document GETs, runQuery, batchGet) are cached for a short time and
+    identical concurrent reads are coalesced into one upstream request. Any
+    write passing through the gateway invalidates cached reads of the
+    collections it touches. Auth calls are forwarded without caching.
+    All upstream traffic goes over one pooled session.
+
+    Firestore security rules depend on who is asking, so cached reads are
+    kept per user: an entry is only served to a token upstream has accepted
+    for the same user, and only until that token expires. Concurrent reads
+    are only merged when they carry the same token.
+    """
+
+    def __init__(self, upstreams=None, ttl=30.0, max_entries=5000, pool_size=32, token_ttl=600.0):
+        self.upstreams = dict(DEFAULT_UPSTREAMS)
+        self.upstreams.update(upstreams or {})
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.token_ttl = token_ttl
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(self.upstreams), pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._in_flight = {}
+        # Tokens upstream has accepted: token -> (user ID, accepted until); only these are served from the cache
+        self._accepted_tokens = {}
+        # Bumped by every write so reads that started before it aren't cached
+        self._generation = 0
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "writes": 0, "invalidations": 0}
+
+    def handle(self, method, path, headers, body):
+        """
+        Serve one request from the desktop app
+        Returns: (status, content_type, body_bytes, cache_state)
+        """
+        service, _, rest = path.lstrip("/").partition("/")
+        upstream = self.upstreams.get(service)
+        if not upstream:
+            return 404, "application/json", b'{"error": {"message": "Unknown gateway route"}}', "NONE"
+
+        target = f"{upstream}/{rest}"
+        forward_headers = {k: v for k, v in headers.items() if k.lower() in ("authorization", "content-type")}
+
+        if service != "firestore":
+            status, content_type, content = self._forward(method, target, forward_headers, body)
+            return status, content_type, content, "PASS"
+
+        if self._is_read(method, rest):
+            return self._cached_read(method, target, rest, forward_headers, body)
+
+        status, content_type, content = self._forward(method, target, forward_headers, body)
+        if status < 400:
+            self._invalidate(self._write_collections(method, rest, body))
+        return status, content_type, content, "WRITE"
+
+    def _is_read(self, method, rest):
+        route = urlparse(rest).path
+        return method == "GET" or (method == "POST" and route.endswith(READ_METHODS))
+
+    def _cached_read(self, method, target, rest, headers, body):
+        token = headers.get("Authorization", "")
+        request_key = (method, self._cache_path(rest), body or b"")
+        now = time.monotonic()
+
+        with self._lock:
+            user_id = self._accepted_user(token, now)
+            if user_id is not None:
+                entry = self._cache.get((user_id,) + request_key)
+                if entry and entry.expires_at > now:
+                    self.stats["hits"] += 1
+                    return entry.status, entry.content_type, entry.body, "HIT"
+
+            # Only requests with the same token share one upstream fetch, so upstream checks every token
+            flight_key = (token,) + request_key
+            generation = self._generation
+            waiting = self._in_flight.get(flight_key)
+            if waiting is None:
+                waiting = _InFlight()
+                self._in_flight[flight_key] = waiting
+                leader = True
+            else:
+                leader = False
+
+        if not leader:
+            waiting.done.wait()
+            with self._lock:
+                self.stats["coalesced"] += 1
+            status, content_type, content = waiting.result
+            return status, content_type, content, "COALESCED"
+
+        try:
+            result = self._forward(method, target, headers, body)
+        except Exception:
+            result = (502, "application/json", b'{"error": {"message": "Upstream request failed"}}')
+
+        status, content_type, content = result
+        with self._lock:
+            self.stats["misses"] += 1
+            user_id = self._accept_token(token, now) if status < 400 else None
+            if user_id is not None and generation == self._generation:
+                self._store((user_id,) + request_key, result, self._read_collections(method, rest, body), now)
+            waiting.result = result
+            self._in_flight.pop(flight_key, None)
+        waiting.done.set()
+        return status, content_type, content, "MISS"
+
+    def _cache_path(self, rest):
+        """Request path without the API key, so all desktops share cache entries"""
+        parts = urlparse(rest)
+        query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != "key"]
+        return parts.path + ("?" + urlencode(query) if query else "")
+
+    def _accepted_user(self, token, now):
+        """User ID of a token upstream has accepted and that hasn't expired, otherwise None"""
+        accepted = self._accepted_tokens.get(token)
+        if accepted is None or accepted[1] <= now:
+            return None
+        return accepted[0]
+
+    def _accept_token(self, token, now):
+        """
+        Remember a token upstream has just accepted, until it (or token_ttl) expires
+        Returns: the token's user ID, or None if it has none (its reads aren't cached)
+        """
+        claims = self._token_claims(token)
+        user_id = claims.get("user_id") or claims.get("sub")
+        expires = claims.get("exp")
+        if not user_id or not isinstance(expires, (int, float)):
+            return None
+
+        # exp is wall-clock time; cache times are monotonic
+        accepted_until = min(now + self.token_ttl, now + (expires - time.time()))
+        if accepted_until <= now:
+            return None
+        for stale_token in [t for t, (_, until) in self._accepted_tokens.items() if until <= now]:
+            del self._accepted_tokens[stale_token]
+        self._accepted_tokens[token] = (user_id, accepted_until)
+        return user_id
+
+    def _token_claims(self, token):
+        """
+        Claims of a Firebase ID token, without checking its signature
+        Only used for tokens upstream has just accepted, so the signature is already checked.
+        """
+        scheme, _, jwt = token.partition(" ")
+        if scheme.lower() != "bearer" or jwt.count(".") != 2:
+            return {}
+        payload = jwt.split(".")[1]
+        try:
+            claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        except ValueError:
+            return {}
+        return claims if isinstance(claims, dict) else {}
+
+    def _store(self, key, result, collections, now):
+        if len(self._cache) >= self.max_entries:
+            # Drop expired entries first, then the oldest ones
+            for stale_key in [k for k, e in self._cache.items() if e.expires_at <= now]:
+                del self._cache[stale_key]
+            while len(self._cache) >= self.max_entries:
+                del self._cache[next(iter(self._cache))]
+        status, content_type, content = result
+        self._cache[key] = _CacheEntry(status, content_type, content, collections, now + self.ttl)
+
+    def _invalidate(self, collections):
+        with self._lock:
+            self.stats["writes"] += 1
+            self._generation += 1
+            stale = [
+                key for key, entry in self._cache.items()
+                if ANY_COLLECTION in collections or ANY_COLLECTION in entry.collections
+                or entry.collections & collections
+            ]
+            for key in stale:
+                del self._cache[key]
+            self.stats["invalidations"] += len(stale)
+
+    def _forward(self, method, target, headers, body):
+        response = self.session.request(method, target, headers=headers, data=body, timeout=(5, 60))
+        return response.status_code, response.headers.get("Content-Type", "application/json"), response.content
+
+    def _collection_from_document_path(self, path):
+        """Top-level collection of a path like .../documents/students/abc"""
+        path = unquote(urlparse(path).path)
+        if "/documents/" not in path:
+            return None
+        return path.split("/documents/", 1)[1].split("/")[0].split(":")[0] or None
+
+    def _read_collections(self, method, rest, body):
+        if method == "GET":
+            collection = self._collection_from_document_path(rest)
+            return {collection} if collection else {ANY_COLLECTION}
+
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            return {ANY_COLLECTION}
+
+        collections = set()
+        query = payload.get("structuredQuery", {})
+        for source in query.get("from", []):
+            if source.get("allDescendants"):
+                collections.add(ANY_COLLECTION)
+            elif source.get("collectionId"):
+                collections.add(source["collectionId"])
+        for name in payload.get("documents", []):
+            collection = self._collection_from_document_path(name)
+            collections.add(collection or ANY_COLLECTION)
+
+        # Queries scoped under a parent document (e.g. shards) belong to the parent's collection
+        parent = self._collection_from_document_path(rest)
+        if parent:
+            collections.add(parent)
+        return collections or {ANY_COLLECTION}
+
+    def _write_collections(self, method, rest, body):
+        if urlparse(rest).path.endswith(":commit"):
+            try:
+                writes = json.loads(body or b"{}").get("writes", [])
+            except ValueError:
+                return {ANY_COLLECTION}
+            collections = set()
+            for write in writes:
+                name = write.get("update", {}).get("name") or write.get("delete") or ""
+                collections.add(self._collection_from_document_path(name) or ANY_COLLECTION)
+            return collections or {ANY_COLLECTION}
+
+        collection = self._collection_from_document_path(rest)
+        return {collection} if collection else {ANY_COLLECTION}
+
+class GatewayRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front end passing every request to the shared FirebaseGateway"""
+
+    gateway = None
+    protocol_version = "HTTP/1.1"
+
+    def _serve(self):
+        if self.path == "/_gateway/stats":
+            body = json.dumps(self.gateway.stats).encode("utf-8")
+            self._respond(200, "application/json", body, "NONE")
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else None
+        status, content_type, content, cache_state = self.gateway.handle(
+            self.command, self.path, dict(self.headers.items()), body
+        )
+        self._respond(status, content_type, content, cache_state)
+
+    def _respond(self, status, content_type, content, cache_state):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        self.send_header("X-Gateway-Cache", cache_state)
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = _serve
+    do_POST = _serve
+    do_PATCH = _serve
+    do_DELETE = _serve
+
+    def log_message(self, format, *args):
+        # Keep the console quiet; stats are available at /_gateway/stats
+        pass
+
+def create_server(gateway, host="127.0.0.1", port=8787):
+    """Create (but don't start) an HTTP server for a gateway"""
+    handler = type("BoundGatewayRequestHandler", (GatewayRequestHandler,), {"gateway": gateway})
+    return ThreadingHTTPServer((host, port), handler)
+
+def serve_in_thread(gateway, host="127.0.0.1", port=0):
+    """Start a gateway server on a background thread; port 0 picks a free port"""
+    server = create_server(gateway, host, port)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shared Firebase caching gateway for a school site")
+    parser.add_argument("--host", default=os.getenv("FIREBASE_GATEWAY_HOST", "127.0.0.1"),
+                        help="Address to listen on; the gateway speaks plain HTTP, so only use a "
+                             "non-local address on a trusted school network")
+    parser.add_argument("--port", type=int, default=int(os.getenv("FIREBASE_GATEWAY_PORT", "8787")))
+    parser.add_argument("--ttl", type=float, default=float(os.getenv("FIREBASE_GATEWAY_TTL", "30")),
+                        help="Seconds a cached read stays fresh")
+    parser.add_argument("--firestore-upstream", default=os.getenv("FIREBASE_GATEWAY_FIRESTORE_UPSTREAM"),
+                        help="Override the Firestore host, e.g. a local stand-in or emulator")
+    parser.add_argument("--auth-upstream", default=os.getenv("FIREBASE_GATEWAY_AUTH_UPSTREAM"),
+                        help="Override the Identity Toolkit host")
+    args = parser.parse_args(argv)
+
+    upstreams = {}
+    if args.firestore_upstream:
+        upstreams["firestore"] = args.firestore_upstream.rstrip("/")
+    if args.auth_upstream:
+        upstreams["identitytoolkit"] = args.auth_upstream.rstrip("/")
+
+    gateway = FirebaseGateway(upstreams=upstreams, ttl=args.ttl)
+    server = create_server(gateway, args.host, args.port)
+    print(f"Firebase gateway listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    sys.exit(main())
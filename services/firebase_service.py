@@ -1,12 +1,56 @@
 import os
-from dotenv import load_dotenv
+import threading
 
-load_dotenv()
+# Public Google API hosts used when no gateway is configured
+AUTH_HOST = "https://identitytoolkit.googleapis.com"
+FIRESTORE_HOST = "https://firestore.googleapis.com"
+SECURETOKEN_HOST = "https://securetoken.googleapis.com"
+
+_environment_loaded = False
+_environment_lock = threading.Lock()
+
+def load_environment():
+    """Read .env into the environment the first time configuration is needed"""
+    global _environment_loaded
+    with _environment_lock:
+        if _environment_loaded:
+            return
+        _environment_loaded = True
+        # Imported here so that importing this module stays cheap at start-up
+        from dotenv import load_dotenv
+        load_dotenv()
+
+def get_gateway_url():
+    """Base URL of the shared school gateway, or None to talk to Google directly"""
+    load_environment()
+    gateway_url = os.getenv("FIREBASE_GATEWAY_URL", "").strip()
+    return gateway_url.rstrip("/") or None
+
+def get_auth_base_url():
+    """Base URL for the Firebase Auth REST API, routed through the gateway if configured"""
+    gateway_url = get_gateway_url()
+    if gateway_url:
+        return f"{gateway_url}/identitytoolkit/v1"
+    return f"{AUTH_HOST}/v1"
+
+def get_securetoken_base_url():
+    """Base URL for exchanging refresh tokens, routed through the gateway if configured"""
+    gateway_url = get_gateway_url()
+    if gateway_url:
+        return f"{gateway_url}/securetoken/v1"
+    return f"{SECURETOKEN_HOST}/v1"
+
+def get_firestore_base_url(project_id):
+    """Base URL for a project's Firestore documents, routed through the gateway if configured"""
+    gateway_url = get_gateway_url()
+    host = f"{gateway_url}/firestore" if gateway_url else FIRESTORE_HOST
+    return f"{host}/v1/projects/{project_id}/databases/(default)/documents"
 
 class FirebaseService:
     """Service class for Firebase configuration and endpoints"""
     
     def __init__(self):
+        load_environment()
         self.api_key = os.getenv("FIREBASE_API_KEY")
         self.project_id = os.getenv("FIREBASE_PROJECT_ID")
         
@@ -14,12 +58,13 @@ class FirebaseService:
             raise ValueError("Firebase configuration missing in environment variables")
         
         # Firebase Auth REST API endpoints
-        self.auth_base_url = "https://identitytoolkit.googleapis.com/v1"
+        self.auth_base_url = get_auth_base_url()
         self.signin_endpoint = f"{self.auth_base_url}/accounts:signInWithPassword?key={self.api_key}"
         self.signup_endpoint = f"{self.auth_base_url}/accounts:signUp?key={self.api_key}"
+        self.refresh_endpoint = f"{get_securetoken_base_url()}/token?key={self.api_key}"
         
         # Firestore REST API endpoints
-        self.firestore_base_url = f"https://firestore.googleapis.com/v1/projects/{self.project_id}/databases/(default)/documents"
+        self.firestore_base_url = get_firestore_base_url(self.project_id)
 
     def get_auth_endpoint(self, operation):
         """Get the appropriate authentication endpoint"""
@@ -27,6 +72,8 @@ class FirebaseService:
             return self.signin_endpoint
         elif operation == "signup":
             return self.signup_endpoint
+        elif operation == "refresh":
+            return self.refresh_endpoint
         else:
             raise ValueError(f"Unknown authentication operation: {operation}")
     
@@ -0,0 +1,298 @@
+import os
+import sys
+import gzip
+import json
+import time
+import atexit
+import hashlib
+import functools
+import threading
+from collections import defaultdict, deque
+from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse
+
+import requests
+
+# Transport modes, selected with FIREBASE_TRANSPORT_MODE
+LIVE = "live"
+RECORD = "record"
+REPLAY = "replay"
+
+# Values that must never be written to a cassette
+SENSITIVE_KEYS = {"password", "idToken", "refreshToken", "id_token", "refresh_token", "access_token"}
+REDACTED = "REDACTED"
+
+# Seconds before a request with no explicit timeout gives up (FIREBASE_REQUEST_TIMEOUT)
+DEFAULT_TIMEOUT = 30
+
+class CassetteMissError(requests.ConnectionError):
+    """Raised in replay mode when a request was never recorded"""
+    pass
+
+class ReplayedResponse:
+    """Minimal stand-in for requests.Response built from a cassette entry"""
+
+    def __init__(self, status_code, text, url):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode("utf-8")
+        self.url = url
+        self.headers = {"Content-Type": "application/json"}
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error (replayed) for url: {self.url}", response=self)
+
+class FirebaseTransport:
+    """
+    Shared HTTP transport for all Firebase REST calls
+
+    In live mode requests go straight through a pooled session. In record
+    mode every request and response is also appended, with its timing, to a
+    gzipped JSON-lines cassette. In replay mode responses are served from a
+    cassette instead of the network, optionally paced at the recorded speed.
+    """
+
+    def __init__(self, mode=LIVE, cassette_path=None, replay_speed=0.0, timeout=DEFAULT_TIMEOUT):
+        self.mode = mode
+        self.timeout = timeout
+        self.cassette_path = cassette_path
+        self.replay_speed = replay_speed
+        self.session = requests.Session()
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._cassette = None
+        self._recorded = defaultdict(deque)
+        self._last_played = {}
+        self.operation_timings = defaultdict(list)
+
+        if mode == RECORD:
+            if not cassette_path:
+                raise ValueError("FIREBASE_CASSETTE must be set to record Firebase traffic")
+            self._cassette = gzip.open(cassette_path, "at", encoding="utf-8")
+            atexit.register(self.close)
+        elif mode == REPLAY:
+            if not cassette_path:
+                raise ValueError("FIREBASE_CASSETTE must be set to replay Firebase traffic")
+            self._load_cassette(cassette_path)
+            atexit.register(self.print_operation_summary)
+        elif mode != LIVE:
+            raise ValueError(f"Unknown Firebase transport mode: {mode}")
+
+    def request(self, method, url, **kwargs):
+        """Send (or replay) a request and return the response"""
+        method = method.upper()
+
+        if self.mode == REPLAY:
+            return self._replay(method, url, kwargs.get("json"))
+
+        # A stalled connection must not hang a worker (or the app) forever
+        kwargs.setdefault("timeout", self.timeout)
+        start = time.perf_counter()
+        response = self.session.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - start
+
+        if self.mode == RECORD:
+            self._write({
+                "k": "req",
+                "t": round(start - self._started, 4),
+                "ms": round(elapsed * 1000, 2),
+                "m": method,
+                "u": self._normalize_url(url),
+                "b": self._body_digest(kwargs.get("json")),
+                "s": response.status_code,
+                "r": self._redact_text(response.text)
+            })
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def warm_up(self, urls, timeout=5):
+        """
+        Resolve and open pooled TLS connections to the hosts of these URLs
+        Nothing is recorded, and replay mode makes no connections.
+        Returns: list of origins that were reached
+        """
+        if self.mode == REPLAY:
+            return []
+
+        origins = []
+        for url in urls:
+            parts = urlparse(url)
+            origin = f"{parts.scheme}://{parts.netloc}"
+            if parts.netloc and origin not in origins:
+                origins.append(origin)
+
+        reached = []
+        for origin in origins:
+            try:
+                # Any response will do; reading it returns the connection to the pool
+                self.session.head(f"{origin}/", timeout=timeout)
+                reached.append(origin)
+            except requests.RequestException as e:
+                print(f"Could not pre-connect to {origin}: {str(e)}")
+        return reached
+
+    def record_operation(self, name, elapsed):
+        """Store the wall-clock time of an app-level operation such as generate_report"""
+        with self._lock:
+            self.operation_timings[name].append(elapsed)
+        if self.mode == RECORD:
+            self._write({"k": "op", "n": name, "ms": round(elapsed * 1000, 2)})
+
+    def print_operation_summary(self):
+        """Print how long each timed operation took during this run"""
+        if not self.operation_timings:
+            return
+        print(f"Operation timings ({self.mode}):")
+        for name, timings in sorted(self.operation_timings.items()):
+            total_ms = sum(timings) * 1000
+            print(f"  {name}: {len(timings)} calls, {total_ms:.1f} ms total, {total_ms / len(timings):.1f} ms avg")
+
+    def close(self):
+        """Flush and close the cassette"""
+        with self._lock:
+            if self._cassette:
+                self._cassette.close()
+                self._cassette = None
+        self.print_operation_summary()
+
+    def _write(self, entry):
+        with self._lock:
+            if self._cassette:
+                self._cassette.write(json.dumps(entry, separators=(",", ":")) + "\n")
+                self._cassette.flush()
+
+    def _load_cassette(self, path):
+        """Index recorded responses by request so they can be served in order"""
+        count = 0
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as cassette:
+                for line in cassette:
+                    entry = json.loads(line)
+                    if entry.get("k") == "req":
+                        self._recorded[(entry["m"], entry["u"], entry["b"])].append(entry)
+                        count += 1
+        except EOFError:
+            # The recording app was killed mid-write; keep everything before that point
+            pass
+        print(f"Loaded {count} recorded Firebase requests from {path}")
+
+    def _replay(self, method, url, body):
+        key = (method, self._normalize_url(url), self._body_digest(body))
+        with self._lock:
+            queue = self._recorded.get(key)
+            if queue:
+                entry = queue.popleft()
+                self._last_played[key] = entry
+            else:
+                # The new build may repeat a read the old one made once; serve the last answer again
+                entry = self._last_played.get(key)
+
+        if entry is None:
+            raise CassetteMissError(f"No recorded response for {method} {key[1]}")
+
+        if self.replay_speed > 0:
+            time.sleep(entry["ms"] / 1000 * self.replay_speed)
+        return ReplayedResponse(entry["s"], entry["r"], url)
+
+    def _normalize_url(self, url):
+        """Drop the API key so cassettes can be shared and replayed against any project config"""
+        parts = urlparse(url)
+        query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != "key"]
+        return urlunparse(parts._replace(query=urlencode(query)))
+
+    def _body_digest(self, body):
+        """Stable digest of a JSON body with credentials removed"""
+        if body is None:
+            return ""
+        cleaned = self._redact(body)
+        encoded = json.dumps(cleaned, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        return hashlib.sha1(encoded).hexdigest()[:16]
+
+    def _redact(self, value):
+        if isinstance(value, dict):
+            return {k: (REDACTED if k in SENSITIVE_KEYS else self._redact(v)) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._redact(v) for v in value]
+        return value
+
+    def _redact_text(self, text):
+        try:
+            return json.dumps(self._redact(json.loads(text)), separators=(",", ":"))
+        except ValueError:
+            return text
+
+_transport = None
+_transport_lock = threading.Lock()
+
+def get_transport():
+    """Return the process-wide transport, configured from the environment on first use"""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = FirebaseTransport(
+                mode=os.getenv("FIREBASE_TRANSPORT_MODE", LIVE).lower(),
+                cassette_path=os.getenv("FIREBASE_CASSETTE"),
+                replay_speed=float(os.getenv("FIREBASE_REPLAY_SPEED", "0")),
+                timeout=float(os.getenv("FIREBASE_REQUEST_TIMEOUT", DEFAULT_TIMEOUT))
+            )
+        return _transport
+
+def timed_operation(name):
+    """Decorator recording the wall-clock time of an app operation with the transport"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                get_transport().record_operation(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def summarize_cassette(path):
+    """Print request and operation timings stored in a cassette"""
+    requests_by_endpoint = defaultdict(list)
+    operations = defaultdict(list)
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as cassette:
+            for line in cassette:
+                entry = json.loads(line)
+                if entry.get("k") == "req":
+                    path_part = urlparse(entry["u"]).path.rsplit("/documents", 1)[-1]
+                    requests_by_endpoint[f"{entry['m']} {path_part}"].append(entry["ms"])
+                elif entry.get("k") == "op":
+                    operations[entry["n"]].append(entry["ms"])
+    except EOFError:
+        pass
+
+    print("Requests:")
+    for endpoint, timings in sorted(requests_by_endpoint.items(), key=lambda item: -sum(item[1])):
+        print(f"  {endpoint}: {len(timings)} x, {sum(timings):.1f} ms total")
+    print("Operations:")
+    for name, timings in sorted(operations.items()):
+        print(f"  {name}: {len(timings)} x, {sum(timings):.1f} ms total, {sum(timings) / len(timings):.1f} ms avg")
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python -m services.firebase_transport <cassette.jsonl.gz>")
+        sys.exit(1)
+    summarize_cassette(sys.argv[1])
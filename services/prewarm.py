@@ -0,0 +1,67 @@
+import time
+import threading
+import importlib
+import requests
+from services.firebase_service import (
+    FirebaseService, get_auth_base_url, get_securetoken_base_url, get_firestore_base_url
+)
+from services.firebase_transport import get_transport
+
+_started = False
+_started_lock = threading.Lock()
+
+def prewarm(module_names=()):
+    """
+    Get everything a login needs ready while the user is still typing
+
+    Loads the Firebase config, opens pooled TLS connections to the auth and
+    Firestore hosts, fetches the token signing certificates and imports the
+    given modules (the dashboards). Every step is best effort: anything that
+    fails here simply happens later, on demand, as it did before.
+    """
+    start = time.perf_counter()
+
+    # Dashboard imports don't touch the network, so run them alongside the connections
+    importer = threading.Thread(target=_import_modules, args=(module_names,), daemon=True)
+    importer.start()
+
+    try:
+        service = FirebaseService()
+    except ValueError as e:
+        print(f"Skipping network pre-warm: {str(e)}")
+        service = None
+
+    if service:
+        get_transport().warm_up([
+            get_auth_base_url(),
+            get_securetoken_base_url(),
+            get_firestore_base_url(service.project_id)
+        ])
+
+        # Certificates (and the cryptography import) used to read role claims from the ID token at login
+        from backend.token_claims import load_crypto, get_signing_certs
+        if load_crypto() is not None:
+            try:
+                get_signing_certs()
+            except (requests.RequestException, ValueError) as e:
+                print(f"Could not pre-fetch token certificates: {str(e)}")
+
+    importer.join()
+    print(f"Pre-warm finished in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+def _import_modules(module_names):
+    for module_name in module_names:
+        try:
+            importlib.import_module(module_name)
+        except ImportError as e:
+            print(f"Could not pre-import {module_name}: {str(e)}")
+
+def start_prewarm(module_names=()):
+    """Run prewarm() once per process on a background thread"""
+    global _started
+    with _started_lock:
+        if _started:
+            return False
+        _started = True
+    threading.Thread(target=prewarm, args=(module_names,), daemon=True).start()
+    return True
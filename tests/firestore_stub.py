@@ -0,0 +1,119 @@
+import json
+import base64
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, unquote
+
+def make_token(user_id, expires_at):
+    """An unsigned Firebase-style ID token carrying user_id and exp, as an Authorization header value"""
+    payload = base64.urlsafe_b64encode(json.dumps({"user_id": user_id, "exp": expires_at}).encode()).decode()
+    return f"Bearer header.{payload.rstrip('=')}.signature"
+
+class FirestoreStub:
+    """
+    Small in-memory Firestore REST stand-in, served over HTTP on a free local port
+
+    Supports document GETs and PATCHes and runQuery over a whole collection,
+    which is all the gateway tests need. Only tokens added with accept() are
+    let through (anything else gets 401, like a bad ID token). Every request
+    that reaches it is counted in requests. While hold() is in effect, reads
+    wait until release(), so tests can line concurrent requests up.
+    """
+
+    def __init__(self):
+        self.documents = {}  # "collection/doc_id" -> Firestore fields
+        self.tokens = set()
+        self.requests = []   # (method, path) of every request received
+        self._lock = threading.Lock()
+        self._gate = threading.Event()
+        self._gate.set()
+        self.server = None
+
+    def start(self):
+        """Serve on a background thread; returns the base URL"""
+        handler = type("BoundFirestoreStubHandler", (_FirestoreStubHandler,), {"stub": self})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def stop(self):
+        self._gate.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def accept(self, token):
+        self.tokens.add(token)
+
+    def put(self, path, values):
+        """Store a document of string fields"""
+        self.documents[path] = {name: {"stringValue": value} for name, value in values.items()}
+
+    def hold(self):
+        self._gate.clear()
+
+    def release(self):
+        self._gate.set()
+
+    def request_count(self, method=None):
+        with self._lock:
+            return len([r for r in self.requests if method is None or r[0] == method])
+
+    def handle(self, method, path, headers, body):
+        """Returns: (status, JSON-serialisable body)"""
+        with self._lock:
+            self.requests.append((method, path))
+        if headers.get("Authorization") not in self.tokens:
+            return 401, {"error": {"status": "UNAUTHENTICATED"}}
+
+        route = unquote(urlparse(path).path)
+        if "/documents" not in route:
+            return 404, {"error": {"status": "NOT_FOUND"}}
+        document_path = route.split("/documents", 1)[1].lstrip("/")
+
+        if method == "GET":
+            self._gate.wait()
+            if document_path not in self.documents:
+                return 404, {"error": {"status": "NOT_FOUND"}}
+            return 200, self._document(document_path)
+
+        if method == "POST" and route.endswith(":runQuery"):
+            self._gate.wait()
+            collection = json.loads(body)["structuredQuery"]["from"][0]["collectionId"]
+            return 200, [
+                {"document": self._document(path)} for path in sorted(self.documents)
+                if path.split("/")[0] == collection
+            ]
+
+        if method == "PATCH":
+            self.documents[document_path] = json.loads(body).get("fields", {})
+            return 200, self._document(document_path)
+
+        return 400, {"error": {"status": "INVALID_ARGUMENT"}}
+
+    def _document(self, path):
+        return {
+            "name": f"projects/p/databases/(default)/documents/{path}",
+            "fields": self.documents[path]
+        }
+
+class _FirestoreStubHandler(BaseHTTPRequestHandler):
+    stub = None
+    protocol_version = "HTTP/1.1"
+
+    def _serve(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else None
+        status, payload = self.stub.handle(self.command, self.path, dict(self.headers.items()), body)
+        content = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = _serve
+    do_POST = _serve
+    do_PATCH = _serve
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,108 @@
+import os
+import unittest
+from unittest import mock
+
+from utils.firebase_client import FirebaseClient
+from utils.document_shards import SHARD_MARKER
+
+class MergeFieldsTest(unittest.TestCase):
+    """Three-way merge used when a conditional write finds the document changed"""
+
+    def setUp(self):
+        self.client = FirebaseClient(id_token="token")
+
+    def test_local_changes_win_and_remote_changes_are_kept(self):
+        base = {"subject": "Maths", "year_group": "Y7", "term_id": "t1"}
+        local = {"subject": "Maths", "year_group": "Y8", "term_id": "t1"}
+        remote = {"subject": "French", "year_group": "Y7", "term_id": "t1"}
+
+        merged = self.client._merge_fields(base, local, remote)
+
+        self.assertEqual(merged, {"subject": "French", "year_group": "Y8", "term_id": "t1"})
+
+    def test_maps_merge_student_by_student(self):
+        base = {"records": {"s1": {"status": "Present"}, "s2": {"status": "Present"}}}
+        local = {"records": {"s1": {"status": "Absent"}, "s2": {"status": "Present"}}}
+        remote = {"records": {"s1": {"status": "Present"}, "s2": {"status": "Late"}, "s3": {"status": "Present"}}}
+
+        merged = self.client._merge_fields(base, local, remote)
+
+        self.assertEqual(merged["records"], {
+            "s1": {"status": "Absent"},
+            "s2": {"status": "Late"},
+            "s3": {"status": "Present"}
+        })
+
+    def test_same_field_changed_on_both_sides_keeps_the_local_value(self):
+        merged = self.client._merge_fields({"notes": "a"}, {"notes": "local"}, {"notes": "remote"})
+
+        self.assertEqual(merged, {"notes": "local"})
+
+    def test_field_removed_locally_is_dropped_unless_changed_remotely(self):
+        base = {"subject": "Maths", "notes": "old", "comment": "old"}
+        local = {"subject": "Maths"}
+        remote = {"subject": "Maths", "notes": "old", "comment": "edited"}
+
+        merged = self.client._merge_fields(base, local, remote)
+
+        self.assertEqual(merged, {"subject": "Maths", "comment": "edited"})
+
+    def test_new_local_field_is_added(self):
+        merged = self.client._merge_fields({}, {"date": "2026-10-19"}, {"subject": "Maths"})
+
+        self.assertEqual(merged, {"date": "2026-10-19", "subject": "Maths"})
+
+class PlanShardsTest(unittest.TestCase):
+    """Splitting an oversized per-student map across shard documents"""
+
+    def setUp(self):
+        self.client = FirebaseClient(id_token="token")
+        self.records = {f"student{i:03d}": {"status": "Present", "notes": "x" * 40} for i in range(60)}
+
+    def test_small_map_is_not_sharded(self):
+        data = {"subject": "Maths", "records": {"s1": {"status": "Present"}}}
+
+        parent, shards = self.client._plan_shards("attendance", data)
+
+        self.assertIs(parent, data)
+        self.assertEqual(shards, [])
+
+    def test_collection_without_a_sharded_map_is_left_alone(self):
+        data = {"name": "Autumn", "records": self.records}
+
+        with mock.patch.dict(os.environ, {"FIREBASE_SHARD_THRESHOLD_BYTES": "500"}):
+            parent, shards = self.client._plan_shards("terms", data)
+
+        self.assertIs(parent, data)
+        self.assertEqual(shards, [])
+
+    def test_large_map_is_split_and_the_parent_marked(self):
+        data = {"subject": "Maths", "records": self.records}
+
+        with mock.patch.dict(os.environ, {"FIREBASE_SHARD_THRESHOLD_BYTES": "500"}):
+            parent, shards = self.client._plan_shards("attendance", data)
+
+        self.assertGreater(len(shards), 1)
+        self.assertEqual(parent["records"], {})
+        self.assertEqual(parent["subject"], "Maths")
+        self.assertEqual(parent[SHARD_MARKER], {"field": "records", "count": len(shards)})
+        # Every entry lands in exactly one shard
+        merged = {}
+        for shard in shards:
+            self.assertFalse(set(shard) & set(merged))
+            merged.update(shard)
+        self.assertEqual(merged, self.records)
+        # The caller's document is not changed
+        self.assertEqual(data["records"], self.records)
+
+    def test_results_shard_their_student_results(self):
+        data = {"subject": "Maths", "student_results": self.records}
+
+        with mock.patch.dict(os.environ, {"FIREBASE_SHARD_THRESHOLD_BYTES": "500"}):
+            parent, shards = self.client._plan_shards("results", data)
+
+        self.assertEqual(parent[SHARD_MARKER]["field"], "student_results")
+        self.assertEqual(parent["student_results"], {})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import json
+import time
+import threading
+import unittest
+
+import requests
+
+from services.firebase_gateway import FirebaseGateway, serve_in_thread
+from tests.firestore_stub import FirestoreStub, make_token
+
+DOCUMENTS = "/firestore/v1/projects/p/databases/(default)/documents"
+
+class FirebaseGatewayTest(unittest.TestCase):
+    """The gateway in front of a stub Firestore, both on local ports"""
+
+    def setUp(self):
+        self.stub = FirestoreStub()
+        upstream = self.stub.start()
+        self.addCleanup(self.stub.stop)
+        self.gateway = FirebaseGateway(upstreams={"firestore": upstream}, ttl=60)
+        self.server = serve_in_thread(self.gateway)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+        self.admin = make_token("admin", time.time() + 3600)
+        self.teacher = make_token("teacher", time.time() + 3600)
+        self.stub.accept(self.admin)
+        self.stub.accept(self.teacher)
+        self.stub.put("students/s1", {"first_name": "Ada"})
+        self.stub.put("terms/t1", {"term_name": "Autumn"})
+
+    def get(self, path, token):
+        return requests.get(f"{self.url}{DOCUMENTS}/{path}?key=k", headers={"Authorization": token}, timeout=10)
+
+    def query(self, collection, token):
+        body = {"structuredQuery": {"from": [{"collectionId": collection}]}}
+        return requests.post(
+            f"{self.url}{DOCUMENTS}:runQuery?key=k", data=json.dumps(body),
+            headers={"Authorization": token, "Content-Type": "application/json"}, timeout=10
+        )
+
+    def test_repeated_read_is_served_from_the_cache(self):
+        first = self.get("students/s1", self.admin)
+        second = self.get("students/s1", self.admin)
+
+        self.assertEqual(first.headers["X-Gateway-Cache"], "MISS")
+        self.assertEqual(second.headers["X-Gateway-Cache"], "HIT")
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(self.stub.request_count(), 1)
+
+    def test_different_reads_miss(self):
+        self.get("students/s1", self.admin)
+        response = self.get("terms/t1", self.admin)
+
+        self.assertEqual(response.headers["X-Gateway-Cache"], "MISS")
+        self.assertEqual(self.stub.request_count(), 2)
+
+    def test_identical_concurrent_reads_are_coalesced(self):
+        self.stub.hold()
+        responses = []
+        threads = [
+            threading.Thread(target=lambda: responses.append(self.get("students/s1", self.admin)))
+            for _ in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        # Give the second request time to join the first one's fetch
+        time.sleep(0.3)
+        self.stub.release()
+        for thread in threads:
+            thread.join(10)
+
+        self.assertEqual(sorted(r.headers["X-Gateway-Cache"] for r in responses), ["COALESCED", "MISS"])
+        self.assertEqual(responses[0].json(), responses[1].json())
+        self.assertEqual(self.stub.request_count(), 1)
+
+    def test_cached_reads_are_kept_per_user(self):
+        self.get("students/s1", self.admin)
+
+        other_user = self.get("students/s1", self.teacher)
+        rejected = self.get("students/s1", make_token("admin", time.time() + 3600) + "x")
+
+        self.assertEqual(other_user.headers["X-Gateway-Cache"], "MISS")
+        self.assertEqual(rejected.status_code, 401)
+        self.assertNotIn("fields", rejected.json())
+        self.assertEqual(self.stub.request_count(), 3)
+
+    def test_write_invalidates_reads_of_its_collection(self):
+        self.get("students/s1", self.admin)
+        self.query("students", self.admin)
+        self.get("terms/t1", self.admin)
+
+        fields = {"fields": {"first_name": {"stringValue": "Grace"}}}
+        write = requests.patch(
+            f"{self.url}{DOCUMENTS}/students/s1?key=k",
+            data=json.dumps(fields), headers={"Authorization": self.admin, "Content-Type": "application/json"},
+            timeout=10
+        )
+        student = self.get("students/s1", self.admin)
+        students = self.query("students", self.admin)
+        term = self.get("terms/t1", self.admin)
+
+        self.assertEqual(write.headers["X-Gateway-Cache"], "WRITE")
+        self.assertEqual(student.headers["X-Gateway-Cache"], "MISS")
+        self.assertEqual(student.json()["fields"]["first_name"]["stringValue"], "Grace")
+        self.assertEqual(students.headers["X-Gateway-Cache"], "MISS")
+        self.assertEqual(students.json()[0]["document"]["fields"]["first_name"]["stringValue"], "Grace")
+        self.assertEqual(term.headers["X-Gateway-Cache"], "HIT")
+
+if __name__ == "__main__":
+    unittest.main()
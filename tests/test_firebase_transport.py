@@ -0,0 +1,100 @@
+import os
+import gzip
+import json
+import shutil
+import tempfile
+import unittest
+
+from services.firebase_transport import (
+    FirebaseTransport, CassetteMissError, RECORD, REPLAY, REDACTED
+)
+
+SIGN_IN_URL = "https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword?key=secret-api-key"
+
+class _Response:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.text = json.dumps(body)
+
+class _Session:
+    """Answers every request with the next canned response"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def request(self, method, url, **kwargs):
+        self.requests.append((method, url, kwargs))
+        return self.responses.pop(0)
+
+class CassetteTest(unittest.TestCase):
+    """Recording Firebase traffic to a cassette and replaying it"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.cassette_path = os.path.join(directory, "traffic.jsonl.gz")
+
+    def record(self, *exchanges):
+        """Record (method, url, json body, status, response body) exchanges"""
+        transport = FirebaseTransport(mode=RECORD, cassette_path=self.cassette_path)
+        transport.session = _Session(*[_Response(status, body) for _, _, _, status, body in exchanges])
+        for method, url, body, _, _ in exchanges:
+            transport.request(method, url, json=body)
+        transport.close()
+
+    def cassette_text(self):
+        with gzip.open(self.cassette_path, "rt", encoding="utf-8") as cassette:
+            return cassette.read()
+
+    def test_credentials_and_api_key_are_not_written(self):
+        self.record(("POST", SIGN_IN_URL, {"email": "a@school.org", "password": "hunter2"}, 200,
+                     {"idToken": "id-token", "refreshToken": "refresh-token", "localId": "uid1"}))
+
+        text = self.cassette_text()
+        for secret in ("hunter2", "id-token", "refresh-token", "secret-api-key"):
+            self.assertNotIn(secret, text)
+        entry = json.loads(text.splitlines()[0])
+        self.assertEqual(json.loads(entry["r"]), {"idToken": REDACTED, "refreshToken": REDACTED, "localId": "uid1"})
+        self.assertEqual(entry["s"], 200)
+
+    def test_replay_serves_recorded_responses_in_order(self):
+        url = "https://firestore.googleapis.com/v1/projects/p/databases/(default)/documents/terms/t1?key=k1"
+        self.record(
+            ("GET", url, None, 200, {"fields": {"name": {"stringValue": "Autumn"}}}),
+            ("GET", url, None, 404, {"error": {"status": "NOT_FOUND"}})
+        )
+
+        transport = FirebaseTransport(mode=REPLAY, cassette_path=self.cassette_path)
+        # Any API key replays the same recording
+        other_key = url.replace("key=k1", "key=k2")
+        first = transport.get(other_key)
+        second = transport.get(other_key)
+        repeated = transport.get(other_key)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json()["fields"]["name"]["stringValue"], "Autumn")
+        self.assertEqual(second.status_code, 404)
+        # Extra reads by the new build get the last recorded answer again
+        self.assertEqual(repeated.status_code, 404)
+
+    def test_replay_matches_bodies_with_credentials_removed(self):
+        self.record(("POST", SIGN_IN_URL, {"email": "a@school.org", "password": "hunter2"}, 200, {"localId": "uid1"}))
+
+        transport = FirebaseTransport(mode=REPLAY, cassette_path=self.cassette_path)
+        response = transport.post(SIGN_IN_URL, json={"email": "a@school.org", "password": "another"})
+
+        self.assertEqual(response.json(), {"localId": "uid1"})
+        with self.assertRaises(CassetteMissError):
+            transport.post(SIGN_IN_URL, json={"email": "b@school.org", "password": "hunter2"})
+
+    def test_unrecorded_request_is_a_miss(self):
+        self.record(("GET", SIGN_IN_URL, None, 200, {}))
+
+        transport = FirebaseTransport(mode=REPLAY, cassette_path=self.cassette_path)
+
+        with self.assertRaises(CassetteMissError):
+            transport.get("https://firestore.googleapis.com/v1/other")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+
+from frontend.input_results_view import previous_term
+
+AUTUMN = {"id": "autumn", "start_date": "2025-09-01", "end_date": "2025-12-19"}
+SPRING = {"id": "spring", "start_date": "2026-01-05", "end_date": "2026-03-27"}
+SUMMER = {"id": "summer", "start_date": "2026-04-13", "end_date": "2026-07-17"}
+UNDATED = {"id": "old", "term_name": "Imported"}
+
+class PreviousTermTest(unittest.TestCase):
+    """Finding the term before the selected one for the results comparison"""
+
+    def test_latest_term_that_ended_before_is_chosen(self):
+        previous, undated = previous_term([SUMMER, AUTUMN, SPRING], "summer")
+
+        self.assertEqual(previous, SPRING)
+        self.assertEqual(undated, [])
+
+    def test_first_term_has_no_previous_term(self):
+        self.assertEqual(previous_term([AUTUMN, SPRING, SUMMER], "autumn"), (None, []))
+
+    def test_overlapping_term_is_not_previous(self):
+        overlapping = {"id": "overlap", "start_date": "2026-03-01", "end_date": "2026-04-20"}
+
+        previous, _ = previous_term([AUTUMN, SPRING, overlapping, SUMMER], "summer")
+
+        self.assertEqual(previous, SPRING)
+
+    def test_undated_terms_are_returned_separately(self):
+        half_dated = {"id": "half", "start_date": "2025-01-06"}
+
+        previous, undated = previous_term([AUTUMN, UNDATED, half_dated, SPRING], "spring")
+
+        self.assertEqual(previous, AUTUMN)
+        self.assertEqual(undated, [UNDATED, half_dated])
+
+    def test_undated_or_missing_current_term_has_no_previous_term(self):
+        terms = [AUTUMN, SPRING, UNDATED]
+
+        self.assertEqual(previous_term(terms, "old"), (None, []))
+        self.assertEqual(previous_term(terms, "missing"), (None, [UNDATED]))
+
+if __name__ == "__main__":
+    unittest.main()
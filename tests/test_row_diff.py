@@ -0,0 +1,107 @@
+import unittest
+
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, QPersistentModelIndex, Qt
+
+from frontend.row_diff import reconcile_rows
+
+class _Model(QAbstractTableModel):
+    """Two-column model over (id, name) rows that logs the signals it sends"""
+
+    def __init__(self, rows):
+        super().__init__()
+        self.rows = rows
+        self.signals = []
+        self.rowsRemoved.connect(lambda parent, first, last: self.signals.append(("removed", first, last)))
+        self.rowsInserted.connect(lambda parent, first, last: self.signals.append(("inserted", first, last)))
+        self.layoutChanged.connect(lambda *args: self.signals.append(("layout",)))
+        self.modelReset.connect(lambda: self.signals.append(("reset",)))
+        self.dataChanged.connect(
+            lambda top_left, bottom_right, roles: self.signals.append(
+                ("changed", top_left.row(), bottom_right.row(), bottom_right.column())
+            )
+        )
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 2
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole:
+            return self.rows[index.row()][index.column()]
+        return None
+
+def _by_id(row):
+    return row[0]
+
+class ReconcileRowsTest(unittest.TestCase):
+    """Turning a model's rows into new ones with row signals instead of a reset"""
+
+    def reconcile(self, old, new, **kwargs):
+        model = _Model(list(old))
+        reconcile_rows(model, model.rows, new, **kwargs)
+        self.assertEqual(model.rows, new)
+        return model
+
+    def test_removed_and_inserted_runs(self):
+        old = [("a", "A"), ("b", "B"), ("c", "C"), ("d", "D")]
+        new = [("a", "A"), ("x", "X"), ("y", "Y"), ("d", "D"), ("z", "Z")]
+
+        model = self.reconcile(old, new, key=_by_id)
+
+        self.assertEqual(model.signals, [("removed", 1, 2), ("inserted", 1, 2), ("inserted", 4, 4)])
+
+    def test_unchanged_rows_send_nothing(self):
+        rows = [("a", "A"), ("b", "B")]
+
+        model = self.reconcile(rows, list(rows), key=_by_id)
+
+        self.assertEqual(model.signals, [])
+
+    def test_reorder_is_one_layout_change_that_keeps_the_selection(self):
+        model = _Model([("a", "A"), ("b", "B"), ("c", "C")])
+        selected = QPersistentModelIndex(model.index(0, 1))
+
+        reconcile_rows(model, model.rows, [("c", "C"), ("b", "B"), ("a", "A")], key=_by_id)
+
+        self.assertEqual(model.signals, [("layout",)])
+        self.assertEqual((selected.row(), selected.column()), (2, 1))
+        self.assertEqual(selected.data(), "A")
+
+    def test_changed_rows_get_one_data_changed_per_range(self):
+        old = [("a", "A"), ("b", "B"), ("c", "C"), ("d", "D")]
+        new = [("a", "A2"), ("b", "B2"), ("c", "C"), ("d", "D2")]
+
+        model = self.reconcile(old, new, key=_by_id)
+
+        self.assertEqual(model.signals, [("changed", 0, 1, 1), ("changed", 3, 3, 1)])
+
+    def test_changed_can_ignore_differences(self):
+        old = [("a", "A"), ("b", "B")]
+        new = [("a", "A2"), ("b", "B2")]
+
+        model = self.reconcile(old, new, key=_by_id, changed=lambda old_row, new_row: old_row[0] == "b")
+
+        self.assertEqual(model.signals, [("changed", 1, 1, 1)])
+
+    def test_items_without_a_key_are_their_own_keys(self):
+        model = self.reconcile([("a",), ("b",)], [("b",), ("c",)])
+
+        self.assertEqual(model.signals, [("removed", 0, 0), ("inserted", 1, 1)])
+
+    def test_repeated_keys_reset(self):
+        model = self.reconcile([("a", "A")], [("a", "A"), ("a", "A2")], key=_by_id)
+
+        self.assertEqual(model.signals, [("reset",)])
+
+    def test_too_many_runs_reset(self):
+        old = [(str(i), "") for i in range(10)]
+        new = [row for i, row in enumerate(old) if i % 2]
+
+        model = self.reconcile(old, new, key=_by_id, max_runs=4)
+
+        self.assertEqual(model.signals, [("reset",)])
+
+if __name__ == "__main__":
+    unittest.main()
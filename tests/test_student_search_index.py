@@ -0,0 +1,91 @@
+import unittest
+
+from utils.student_search_index import StudentSearchIndex, student_subjects_text
+
+STUDENTS = [
+    {"id": "S001", "first_name": "Ada", "last_name": "Lovelace", "year_group": "Y7", "subjects": ["Maths", "French"]},
+    {"id": "S002", "first_name": "Alan", "last_name": "Turing", "year_group": "Y8", "subjects": "Maths, Computing"},
+    {"id": "S003", "first_name": "Grace", "last_name": "Hopper", "year_group": "Y7", "subjects": "['Computing']"},
+    {"id": "S004", "name": "Mary Somerville", "year_group": "Y9", "subjects": []},
+]
+
+class StudentSearchIndexTest(unittest.TestCase):
+    """Searching, filtering and sorting the student roster"""
+
+    def setUp(self):
+        self.index = StudentSearchIndex(STUDENTS)
+
+    def test_empty_query_matches_everyone(self):
+        self.assertIsNone(self.index.match(""))
+        self.assertIsNone(self.index.match("  , "))
+
+    def test_word_prefixes_match(self):
+        self.assertEqual(self.index.match("ad"), {0})
+        self.assertEqual(self.index.match("TUR"), {1})
+        self.assertEqual(self.index.match("mary"), {3})
+
+    def test_longer_queries_match_inside_names(self):
+        self.assertEqual(self.index.match("love"), {0})
+        self.assertEqual(self.index.match("lace"), {0})
+        self.assertEqual(self.index.match("opp"), {2})
+        # Too short to match inside a word
+        self.assertEqual(self.index.match("da"), set())
+
+    def test_every_query_word_must_match(self):
+        self.assertEqual(self.index.match("maths a"), {0, 1})
+        self.assertEqual(self.index.match("turing ada"), set())
+
+    def test_ids_and_subjects_match(self):
+        self.assertEqual(self.index.match("s003"), {2})
+        self.assertEqual(self.index.match("computing"), {1, 2})
+        self.assertEqual(self.index.match("fren"), {0})
+
+    def test_facet_counts(self):
+        self.assertEqual(self.index.facet_counts(None), {"Y7": 2, "Y8": 1, "Y9": 1})
+        self.assertEqual(self.index.facet_counts(self.index.match("computing")), {"Y7": 1, "Y8": 1, "Y9": 0})
+
+    def test_filter_year(self):
+        self.assertEqual(self.index.filter_year(None, "Y7"), {0, 2})
+        self.assertEqual(self.index.filter_year({0, 1}, "Y7"), {0})
+        self.assertEqual(self.index.filter_year({0, 1}, ""), {0, 1})
+
+    def test_removed_students_stop_matching_until_restored(self):
+        self.index.remove(1)
+
+        self.assertEqual(self.index.match(""), {0, 2, 3})
+        self.assertEqual(self.index.match("maths"), {0})
+
+        self.index.restore(1)
+
+        self.assertIsNone(self.index.match(""))
+        self.assertEqual(self.index.match("maths"), {0, 1})
+
+    def test_students_added_again_are_not_indexed_twice(self):
+        added = self.index.add_students([STUDENTS[0], {"id": "S005", "first_name": "Emmy", "year_group": "Y8"}])
+
+        self.assertEqual(list(added), [4])
+        self.assertEqual(len(self.index), 5)
+        self.assertEqual(self.index.match("ada"), {0})
+        self.assertEqual(self.index.match("emmy"), {4})
+
+    def test_sorting_by_name_includes_old_name_only_records(self):
+        self.assertEqual(self.index.sorted_positions(None, 1), [0, 1, 2, 3])
+        self.assertEqual(self.index.sorted_positions(None, 1, descending=True), [3, 2, 1, 0])
+        self.assertEqual(self.index.sorted_positions({0, 3}, 1, descending=True), [3, 0])
+
+    def test_sorting_by_year_group_breaks_ties_by_position(self):
+        self.assertEqual(self.index.sorted_positions(None, 2), [0, 2, 1, 3])
+        self.assertEqual(self.index.sorted_positions({0, 1, 2}, 2), [0, 2, 1])
+
+    def test_display_text(self):
+        self.assertEqual(self.index.display[0], ("S001", "Ada Lovelace", "Y7", "Maths, French"))
+        self.assertEqual(self.index.display[3][1], "Mary Somerville")
+
+    def test_subjects_text_is_the_same_however_they_are_stored(self):
+        expected = "Maths, French"
+        for subjects in (["Maths", "French"], "['Maths', 'French']", "Maths, French", "Maths,French"):
+            self.assertEqual(student_subjects_text({"subjects": subjects}), expected)
+        self.assertEqual(student_subjects_text({}), "")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+Create staff accounts in bulk from a CSV file
+
+The CSV needs an email column and may have name, role (teacher or
+administrator, default teacher) and password columns. Rows without a
+password get a random temporary one, listed in the result report. Sign in
+as an administrator so profiles can be written in batches:
+
+    python -m tools.provision_staff staff.csv --admin-email head@school.org
+    python -m tools.provision_staff staff.csv --report results.csv --workers 8 --rate 10
+"""
+import os
+import sys
+import time
+import getpass
+import argparse
+from dotenv import load_dotenv
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Create staff accounts and profiles from a CSV file")
+    parser.add_argument("csv_path", help="Staff CSV (email, name, role, password)")
+    parser.add_argument("--report", help="Where to write the result report (default: <csv>_results.csv)")
+    parser.add_argument("--admin-email", help="Administrator to sign in as for batched profile writes")
+    parser.add_argument("--workers", type=int, default=8, help="Accounts created at the same time")
+    parser.add_argument("--rate", type=float, default=10, help="Maximum sign-ups started per second")
+    args = parser.parse_args(argv)
+
+    from backend.auth_manager import AuthManager
+    from backend.provisioning import StaffProvisioner, read_staff_csv, write_report, summarize_results
+
+    try:
+        rows = read_staff_csv(args.csv_path)
+    except (OSError, ValueError) as e:
+        print(f"Could not read {args.csv_path}: {str(e)}")
+        return 1
+
+    admin_id_token = None
+    if args.admin_email:
+        password = os.getenv("SCHOOL_ADMIN_PASSWORD") or getpass.getpass(f"Password for {args.admin_email}: ")
+        success, admin_id_token, _, error_message = AuthManager().sign_in(args.admin_email, password)
+        if not success:
+            print(f"Administrator sign-in failed: {error_message}")
+            return 1
+
+    def progress(done, total, result):
+        print(f"[{done}/{total}] row {result['row']} {result['email']}: {result['status']} {result['error']}".rstrip())
+
+    start = time.perf_counter()
+    results = StaffProvisioner(admin_id_token, workers=args.workers, rate=args.rate).provision(rows, progress)
+    elapsed = time.perf_counter() - start
+
+    report_path = args.report or f"{os.path.splitext(args.csv_path)[0]}_results.csv"
+    write_report(results, report_path)
+
+    summary = ", ".join(f"{count} {status}" for status, count in sorted(summarize_results(results).items()))
+    print(f"Done in {elapsed:.1f}s: {summary}")
+    print(f"Report written to {report_path} (it contains temporary passwords; share it carefully)")
+    return 0 if all(result["status"] == "created" for result in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""
+Copy each user's role and name from Firestore into their Firebase Auth custom claims
+
+The app reads these claims from the signed ID token at login, which saves a
+Firestore round trip. Users without claims still work (the app falls back to
+their Firestore profile), so this can be re-run whenever roles change.
+
+Needs a service account key with Firebase Auth admin and Firestore access:
+
+    GOOGLE_APPLICATION_CREDENTIALS=service-account.json python -m tools.stamp_role_claims
+    python -m tools.stamp_role_claims --uid <user uid>
+"""
+import os
+import sys
+import json
+import time
+import base64
+import argparse
+import requests
+from dotenv import load_dotenv
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding
+
+TOKEN_URL = "https://oauth2.googleapis.com/token"
+SCOPES = "https://www.googleapis.com/auth/identitytoolkit https://www.googleapis.com/auth/datastore"
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def get_access_token(service_account):
+    """Exchange a signed service account assertion for an OAuth access token"""
+    now = int(time.time())
+    header = {"alg": "RS256", "typ": "JWT", "kid": service_account["private_key_id"]}
+    claims = {
+        "iss": service_account["client_email"],
+        "scope": SCOPES,
+        "aud": TOKEN_URL,
+        "iat": now,
+        "exp": now + 3600
+    }
+    signing_input = f"{_b64encode(json.dumps(header).encode())}.{_b64encode(json.dumps(claims).encode())}"
+
+    private_key = serialization.load_pem_private_key(service_account["private_key"].encode("utf-8"), password=None)
+    signature = private_key.sign(signing_input.encode("ascii"), padding.PKCS1v15(), hashes.SHA256())
+
+    response = requests.post(TOKEN_URL, data={
+        "grant_type": "urn:ietf:params:oauth:grant-type:jwt-bearer",
+        "assertion": f"{signing_input}.{_b64encode(signature)}"
+    }, timeout=30)
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+def list_user_profiles(project_id, access_token, uid=None):
+    """Read user profiles (uid, role, name) from the users collection"""
+    base_url = f"https://firestore.googleapis.com/v1/projects/{project_id}/databases/(default)/documents/users"
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    if uid:
+        response = requests.get(f"{base_url}/{uid}", headers=headers, timeout=30)
+        response.raise_for_status()
+        documents = [response.json()]
+    else:
+        documents = []
+        page_token = None
+        while True:
+            params = {"pageSize": 300}
+            if page_token:
+                params["pageToken"] = page_token
+            response = requests.get(base_url, headers=headers, params=params, timeout=30)
+            response.raise_for_status()
+            data = response.json()
+            documents.extend(data.get("documents", []))
+            page_token = data.get("nextPageToken")
+            if not page_token:
+                break
+
+    profiles = []
+    for doc in documents:
+        fields = doc.get("fields", {})
+        profiles.append({
+            "uid": doc["name"].split("/")[-1],
+            "role": fields.get("role", {}).get("stringValue", ""),
+            "name": fields.get("name", {}).get("stringValue", "")
+        })
+    return profiles
+
+def stamp_claims(project_id, access_token, profile):
+    """
+    Set the role and name custom claims on one Firebase Auth account
+    Returns: (success, error_message)
+    """
+    response = requests.post(
+        f"https://identitytoolkit.googleapis.com/v1/projects/{project_id}/accounts:update",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json={
+            "localId": profile["uid"],
+            "customAttributes": json.dumps({"role": profile["role"], "name": profile["name"]})
+        },
+        timeout=30
+    )
+    if response.status_code == 200:
+        return True, ""
+    return False, response.json().get("error", {}).get("message", f"HTTP {response.status_code}")
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Stamp role/name custom claims from Firestore user profiles")
+    parser.add_argument("--uid", help="Only update this user")
+    parser.add_argument("--credentials", default=os.getenv("GOOGLE_APPLICATION_CREDENTIALS"),
+                        help="Path to a service account JSON key")
+    args = parser.parse_args(argv)
+
+    if not args.credentials:
+        print("A service account key is required (--credentials or GOOGLE_APPLICATION_CREDENTIALS)")
+        return 1
+
+    with open(args.credentials, "r") as key_file:
+        service_account = json.load(key_file)
+    project_id = os.getenv("FIREBASE_PROJECT_ID") or service_account.get("project_id")
+
+    access_token = get_access_token(service_account)
+    profiles = list_user_profiles(project_id, access_token, args.uid)
+
+    updated = 0
+    skipped = 0
+    failures = 0
+    for profile in profiles:
+        if not profile["role"]:
+            skipped += 1
+            print(f"Skipping {profile['uid']}: no role in Firestore")
+            continue
+        success, error_message = stamp_claims(project_id, access_token, profile)
+        if success:
+            updated += 1
+            print(f"Stamped {profile['uid']}: role={profile['role']}")
+        elif error_message.startswith("USER_NOT_FOUND"):
+            # A profile left behind by a deleted account
+            skipped += 1
+            print(f"Skipping {profile['uid']}: no Firebase Auth account")
+        else:
+            failures += 1
+            print(f"Failed {profile['uid']}: {error_message}")
+
+    print(f"Done: {updated} updated, {skipped} skipped, {failures} failed")
+    print("Users pick up new claims the next time their ID token is refreshed.")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+import os
+import json
+import time
+from urllib.parse import quote
+from backend.session_store import APP_DATA_DIR
+
+class AttendanceDraftStore:
+    """
+    Unsynced attendance, kept on disk until it reaches Firestore
+
+    Each register (an attendance document ID) has at most one draft per user,
+    holding the records of the students changed since the register was last
+    synced. Drafts are written atomically with owner-only permissions, so a
+    crash or a dropped connection never loses marked attendance, and they
+    are only removed once every change in them has been saved.
+    """
+
+    def __init__(self, data_dir=APP_DATA_DIR):
+        self.drafts_dir = os.path.join(data_dir, "drafts")
+
+    def save(self, user_uid, doc_id, records):
+        """Replace a register's draft with these records ({student_id: record}); no records removes it"""
+        if not records:
+            self.discard(user_uid, doc_id)
+            return
+        path = self._path(user_uid, doc_id)
+        temp_path = f"{path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as draft_file:
+                # The mode only applies to a new file; tighten one left by an interrupted save too
+                os.chmod(temp_path, 0o600)
+                json.dump({"saved_at": time.time(), "records": records}, draft_file, separators=(",", ":"))
+            # Swapped in whole, so a crash mid-write leaves the previous draft intact
+            os.replace(temp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Failed to save attendance draft: {str(e)}")
+
+    def load(self, user_uid, doc_id):
+        """
+        A register's unsynced records
+        Returns: {student_id: record}, empty if there is no draft
+        """
+        try:
+            with open(self._path(user_uid, doc_id), "r") as draft_file:
+                records = json.load(draft_file).get("records", {})
+        except (OSError, ValueError, AttributeError):
+            return {}
+        return records if isinstance(records, dict) else {}
+
+    def discard(self, user_uid, doc_id):
+        try:
+            os.remove(self._path(user_uid, doc_id))
+        except OSError:
+            pass
+
+    def _path(self, user_uid, doc_id):
+        # Document IDs include the subject, which may hold characters that aren't safe in file names
+        return os.path.join(self.drafts_dir, quote(user_uid or "anonymous", safe=""), f"{quote(doc_id, safe='')}.json")
+
+_store = None
+
+def get_draft_store():
+    """Return the attendance draft store shared by every register"""
+    global _store
+    if _store is None:
+        _store = AttendanceDraftStore()
+    return _store
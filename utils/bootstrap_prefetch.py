@@ -0,0 +1,60 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.firebase_client import FirebaseClient, PREFETCH_VERSIONS_KEY
+
+def get_bootstrap_reads(role, user_uid):
+    """
+    Reference data each dashboard needs as soon as it opens
+    Returns: list of (FirebaseClient method name, args)
+    """
+    if role == "administrator":
+        return [
+            # Only the first page: the students table loads the rest as it is scrolled
+            ("get_collection_page", ("students",)),
+            ("get_collection", ("terms",)),
+            ("get_collection", ("teacher_assignments",)),
+            ("query_collection", ("users", "role", "==", "teacher"))
+        ]
+    if role == "teacher":
+        return [
+            ("get_collection", ("terms",)),
+            ("query_collection_with_filters", ("teacher_assignments", [("teacher_id", "==", user_uid)]))
+        ]
+    return []
+
+def prefetch_bootstrap(role, user_uid, id_token=None, progress=None):
+    """
+    Run a dashboard's bootstrap reads concurrently
+    progress: optional callback(done, total), called on the calling thread
+    Returns: dict of read key -> result, for FirebaseClient(prefetched=...).
+    Reads that fail are left out; the view makes them itself and reports the error.
+    """
+    reads = get_bootstrap_reads(role, user_uid)
+    if not reads:
+        return {}
+
+    client = FirebaseClient(id_token=id_token)
+    started = time.time()
+    prefetched = {}
+
+    def read(method_name, args):
+        method = getattr(client, method_name)
+        return method.snapshot_key(*args), method(*args)
+
+    with ThreadPoolExecutor(max_workers=len(reads)) as pool:
+        futures = [pool.submit(read, method_name, args) for method_name, args in reads]
+        for done, future in enumerate(as_completed(futures), start=1):
+            try:
+                key, result = future.result()
+                prefetched[key] = result
+            except Exception as e:
+                print(f"Bootstrap read failed: {str(e)}")
+            if progress:
+                progress(done, len(reads))
+
+    prefetched[PREFETCH_VERSIONS_KEY] = {
+        "fetched_at": started,
+        "snapshots": dict(client._snapshots),
+        "shard_counts": dict(client._shard_counts)
+    }
+    return prefetched
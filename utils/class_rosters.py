@@ -0,0 +1,69 @@
+import ast
+
+def parse_year_groups(year_groups):
+    """An assignment's year_groups as a list (older documents store the list as its text)"""
+    if isinstance(year_groups, str):
+        try:
+            parsed = ast.literal_eval(year_groups)
+        except (ValueError, SyntaxError):
+            return [year_groups]
+        return parsed if isinstance(parsed, list) else [str(parsed)]
+    if not isinstance(year_groups, list):
+        return [str(year_groups)]
+    return year_groups
+
+def parse_subjects(subjects):
+    """A student's subjects as a list of names (stored as a list, the list's text or comma-separated)"""
+    if isinstance(subjects, list):
+        return [str(s).strip() for s in subjects]
+    if not isinstance(subjects, str):
+        return []
+    if subjects.startswith('[') and subjects.endswith(']'):
+        try:
+            parsed = ast.literal_eval(subjects)
+        except (ValueError, SyntaxError):
+            parsed = None
+        if isinstance(parsed, list):
+            return [str(s).strip() for s in parsed]
+    return [s.strip() for s in subjects.split(",")]
+
+def students_taking(students, subject):
+    """The students whose subjects include subject (ignoring case)"""
+    subject = subject.lower()
+    return [
+        student for student in students
+        if any(s.lower() == subject for s in parse_subjects(student.get("subjects", [])))
+    ]
+
+def assigned_year_groups(teacher_assignments, subject, standard_year_groups):
+    """The standard year groups a teacher is assigned for a subject (ignoring case), in standard order"""
+    assigned = set()
+    for assignment in teacher_assignments:
+        if assignment.get("subject", "").lower() == subject.lower():
+            for year_group in parse_year_groups(assignment.get("year_groups", [])):
+                assigned.add(str(year_group).strip().upper())
+    return [year_group for year_group in standard_year_groups if year_group in assigned]
+
+def assigned_classes(teacher_assignments, standard_year_groups):
+    """Every (subject, year_group) in a teacher's assignments, in assignment order"""
+    classes = []
+    for assignment in teacher_assignments:
+        subject = assignment.get("subject")
+        for year_group in parse_year_groups(assignment.get("year_groups", [])):
+            year_group = str(year_group).strip().upper()
+            if subject and year_group in standard_year_groups and (subject, year_group) not in classes:
+                classes.append((subject, year_group))
+    return classes
+
+def class_students_read(year_group):
+    """The FirebaseClient read read_class_students() makes, as (method name, args), for prefetching"""
+    return "query_collection_with_filters", ("students", [("year_group", "==", year_group)])
+
+def read_class_students(firebase, subject, year_group):
+    """
+    Read a year group (a standard one, e.g. "Y7") and keep the students taking a subject
+    Returns: (students in the year group, students taking the subject)
+    """
+    method_name, args = class_students_read(year_group)
+    students = getattr(firebase, method_name)(*args)
+    return students, students_taking(students, subject)
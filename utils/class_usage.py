@@ -0,0 +1,87 @@
+import os
+import json
+import time
+from urllib.parse import quote
+from backend.session_store import APP_DATA_DIR
+
+class ClassUsageLog:
+    """
+    When each teacher opens each of their classes, by hour of the week
+
+    Timetables repeat every week, so a class opened at 9 on Mondays is likely
+    to be opened at 9 next Monday. rank() puts the classes a teacher usually
+    opens around now (this hour or the next, on this weekday) first, then
+    those they open at this time on other days, then the most used. Kept per
+    user in a small file under the app data directory.
+    """
+
+    def __init__(self, data_dir=APP_DATA_DIR):
+        self.usage_dir = os.path.join(data_dir, "usage")
+        self.user_uid = None
+        self.counts = {}  # "subject|year_group" -> {"weekday:hour": times opened}
+
+    def record(self, user_uid, subject, year_group, when=None):
+        """Note that a teacher opened a class"""
+        self._open(user_uid)
+        local = time.localtime(when)
+        slot = f"{local.tm_wday}:{local.tm_hour}"
+        slots = self.counts.setdefault(f"{subject}|{year_group}", {})
+        slots[slot] = slots.get(slot, 0) + 1
+        try:
+            os.makedirs(self.usage_dir, exist_ok=True)
+            fd = os.open(self._path(), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as usage_file:
+                # The mode only applies to a new file; tighten an existing one too
+                os.chmod(self._path(), 0o600)
+                json.dump(self.counts, usage_file, separators=(",", ":"))
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Failed to save class usage: {str(e)}")
+
+    def rank(self, user_uid, classes, when=None):
+        """
+        Order (subject, year_group) classes by how likely the teacher is to open them now
+        Classes never opened keep their order, after the others.
+        """
+        self._open(user_uid)
+        local = time.localtime(when)
+        hours = (local.tm_hour, (local.tm_hour + 1) % 24)
+
+        def likelihood(school_class):
+            slots = self.counts.get(f"{school_class[0]}|{school_class[1]}", {})
+            this_weekday = 0
+            any_weekday = 0
+            for slot, count in slots.items():
+                weekday, hour = (int(part) for part in slot.split(":"))
+                if hour in hours:
+                    any_weekday += count
+                    if weekday == local.tm_wday:
+                        this_weekday += count
+            return this_weekday, any_weekday, sum(slots.values())
+
+        return sorted(classes, key=likelihood, reverse=True)
+
+    def _open(self, user_uid):
+        """Load a user's counts, unless they are already loaded"""
+        if user_uid == self.user_uid:
+            return
+        self.user_uid = user_uid
+        self.counts = {}
+        try:
+            with open(self._path(), "r") as usage_file:
+                counts = json.load(usage_file)
+            if isinstance(counts, dict):
+                self.counts = counts
+        except (OSError, ValueError):
+            pass
+
+    def _path(self):
+        return os.path.join(self.usage_dir, f"{quote(self.user_uid or 'anonymous', safe='')}.json")
+
+_log = None
+
+def get_class_usage():
+    """Return the class usage log shared by every view"""
+    global _log
+    if _log is None:
+        _log = ClassUsageLog()
+    return _log
@@ -0,0 +1,70 @@
+import os
+
+# Map fields that hold one entry per student and may be split across shard documents
+SHARDED_MAP_FIELDS = {
+    "results": "student_results",
+    "attendance": "records"
+}
+
+# Name of the subcollection holding the shards of a document
+SHARD_COLLECTION = "shards"
+
+# Marker field on the parent document: {"field": <map field>, "count": <number of shards>}
+SHARD_MARKER = "_shards"
+
+# Firestore rejects documents over 1 MiB; stay well clear of it by default
+DEFAULT_SHARD_THRESHOLD = 256 * 1024
+DEFAULT_SIZE_WARNING = 800 * 1024
+
+def get_shard_threshold():
+    """Size in bytes above which a per-student map is split into shards"""
+    return int(os.getenv("FIREBASE_SHARD_THRESHOLD_BYTES", DEFAULT_SHARD_THRESHOLD))
+
+def get_size_warning():
+    """Document size in bytes above which the size guard reports a warning"""
+    return int(os.getenv("FIREBASE_DOC_SIZE_WARNING_BYTES", DEFAULT_SIZE_WARNING))
+
+def estimate_value_size(value):
+    """
+    Estimate the stored size of a value using Firestore's storage size rules
+    (strings are UTF-8 bytes + 1, numbers 8 bytes, booleans and nulls 1 byte)
+    """
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float)):
+        return 8
+    if isinstance(value, str):
+        return len(value.encode("utf-8")) + 1
+    if isinstance(value, dict):
+        return sum(len(str(k).encode("utf-8")) + 1 + estimate_value_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_value_size(v) for v in value)
+    return len(str(value).encode("utf-8")) + 1
+
+def estimate_document_size(collection_name, doc_id, fields):
+    """Estimate the stored size of a whole document, including its name"""
+    name_size = len(f"{collection_name}/{doc_id}".encode("utf-8")) + 16
+    return name_size + estimate_value_size(fields) + 32
+
+def split_map(entries, threshold):
+    """
+    Split a map into chunks whose estimated size stays under the threshold
+    Returns: list of dicts (a single chunk if the map is small enough)
+    """
+    chunks = []
+    current = {}
+    current_size = 0
+
+    for key, value in entries.items():
+        entry_size = len(str(key).encode("utf-8")) + 1 + estimate_value_size(value)
+        if current and current_size + entry_size > threshold:
+            chunks.append(current)
+            current = {}
+            current_size = 0
+        current[key] = value
+        current_size += entry_size
+
+    if current or not chunks:
+        chunks.append(current)
+
+    return chunks
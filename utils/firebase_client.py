@@ -1,15 +1,142 @@
 import os
+import re
+import copy
+import time
 import requests
 import json
+import functools
 from urllib.parse import quote
+from services.firebase_transport import get_transport
+from services.firebase_service import get_firestore_base_url
+from backend.credential_provider import get_credential_provider, TokenRetryTransport
+from utils.snapshot_cache import get_snapshot_cache
+from utils.document_shards import (
+    SHARDED_MAP_FIELDS, SHARD_COLLECTION, SHARD_MARKER,
+    get_shard_threshold, get_size_warning, estimate_document_size, split_map
+)
+
+# Marker for fields that are absent from one side of a merge
+_MISSING = object()
+
+class WriteConflictError(Exception):
+    """Raised when a document keeps changing underneath a conditional write"""
+    
+    def __init__(self, message, created=None):
+        super().__init__(message)
+        # Documents someone else created while a write expected them not to exist: doc_id -> latest fields
+        self.created = created or {}
+
+# Entry in a prefetched dict carrying the prefetching client's document versions
+PREFETCH_VERSIONS_KEY = "state:versions"
+
+# Prefetched results older than this (seconds) are ignored
+PREFETCH_MAX_AGE = 120
+
+# Documents per request when a collection is read a page at a time
+DEFAULT_PAGE_SIZE = 200
+
+# Field path segments that can be written without backquotes
+_SIMPLE_FIELD_NAME = re.compile(r"^[A-Za-z_][A-Za-z_0-9]*$")
+
+def _field_path(segments):
+    """Firestore field path for a field nested under map keys, e.g. ("records", "a-1") -> records.`a-1`"""
+    parts = []
+    for segment in segments:
+        if not _SIMPLE_FIELD_NAME.match(segment):
+            segment = "`" + segment.replace("\\", "\\\\").replace("`", "\\`") + "`"
+        parts.append(segment)
+    return ".".join(parts)
+
+def _offline_snapshot(key_for):
+    """
+    Decorator for read methods: answer once from prefetched results, record
+    results in the snapshot cache and answer from it while a saved session
+    is being resumed
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args):
+            key = key_for(*args)
+            if key in self.prefetched:
+                # Views may share prefetched results, so each gets its own copy
+                return copy.deepcopy(self.prefetched.pop(key))
+            hit, value = self.offline_cache.lookup(key)
+            if hit:
+                return value
+            result = method(self, *args)
+            self.offline_cache.put(key, result)
+            return result
+        # Lets a prefetch compute the same key for a read (see utils/bootstrap_prefetch.py)
+        wrapper.snapshot_key = key_for
+        return wrapper
+    return decorator
+
+def _prefetchable(key_for):
+    """
+    Decorator for reads that may be made ahead of time (see frontend/roster_prefetch.py)
+    but aren't kept in the offline snapshot: answer once from prefetched results
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args):
+            key = key_for(*args)
+            if key in self.prefetched:
+                return copy.deepcopy(self.prefetched.pop(key))
+            return method(self, *args)
+        wrapper.snapshot_key = key_for
+        return wrapper
+    return decorator
 
 class FirebaseClient:
-    def __init__(self, id_token=None):
+    # How many times a conflicting write is merged and retried before giving up
+    MAX_CONFLICT_RETRIES = 3
+    
+    def __init__(self, id_token=None, credentials=None, prefetched=None):
         self.project_id = os.getenv("FIREBASE_PROJECT_ID")
-        self.base_url = f"https://firestore.googleapis.com/v1/projects/{self.project_id}/databases/(default)/documents"
+        self.base_url = get_firestore_base_url(self.project_id)
         self.api_key = os.getenv("FIREBASE_API_KEY")
-        self.id_token = id_token
+        self.credentials = credentials or get_credential_provider()
+        self._id_token = id_token
+        # A request whose token expired during a sleep is sent again once the token is refreshed
+        self.transport = TokenRetryTransport(get_transport(), self.credentials)
+        self.offline_cache = get_snapshot_cache()
+        
+        # Last version of each document seen by this client, used as the
+        # precondition and merge base for writes: (collection, doc_id) -> (updateTime, fields)
+        # An updateTime of None means the document was known not to exist.
+        self._snapshots = {}
+        
+        # Number of shard documents each sharded document was last stored with
+        self._shard_counts = {}
+        
+        # Results fetched ahead of time (read key -> value); each is used once, then reads go to Firestore.
+        # The versions seen by the prefetching client come along so writes keep their merge base.
+        self.prefetched = dict(prefetched or {})
+        versions = self.prefetched.pop(PREFETCH_VERSIONS_KEY, None)
+        if versions and time.time() - versions["fetched_at"] > PREFETCH_MAX_AGE:
+            # Too old to trust (e.g. a tab first opened long after login)
+            self.prefetched = {}
+        elif versions:
+            self._snapshots.update(versions["snapshots"])
+            self._shard_counts.update(versions["shard_counts"])
+    
+    @property
+    def id_token(self):
+        """Current ID token - tokens from the signed-in session are kept fresh by the provider"""
+        return self.credentials.resolve_token(self._id_token)
+    
+    @id_token.setter
+    def id_token(self, value):
+        self._id_token = value
     
+    def release(self):
+        """Forget the session's token and every document version seen (at logout)"""
+        self._id_token = None
+        self._snapshots.clear()
+        self._shard_counts.clear()
+        self.prefetched.clear()
+    
+    @_offline_snapshot(lambda collection_name: f"collection:{collection_name}")
     def get_collection(self, collection_name):
         """Fetch all documents from a collection"""
         url = f"{self.base_url}/{collection_name}?key={self.api_key}"
@@ -17,7 +144,7 @@ class FirebaseClient:
         if self.id_token:
             headers["Authorization"] = f"Bearer {self.id_token}"
         
-        response = requests.get(url, headers=headers)
+        response = self.transport.get(url, headers=headers)
         response.raise_for_status()
         data = response.json()
         
@@ -25,27 +152,120 @@ class FirebaseClient:
         if 'documents' in data:
             for doc in data['documents']:
                 doc_id = doc['name'].split('/')[-1]
-                fields = self._parse_fields(doc.get('fields', {}))
+                fields = self._read_document(collection_name, doc_id, doc)
                 fields['id'] = doc_id
                 documents.append(fields)
         
         return documents
     
+    @_offline_snapshot(lambda collection_name, page_size=DEFAULT_PAGE_SIZE, start_after=None:
+                       f"page:{collection_name}/{page_size}/{start_after or ''}")
+    def get_collection_page(self, collection_name, page_size=DEFAULT_PAGE_SIZE, start_after=None):
+        """
+        Fetch one page of a collection, in document ID order
+        
+        Args:
+            collection_name: Collection to read
+            page_size: Maximum number of documents to return
+            start_after: Cursor returned with the previous page (None for the first page)
+            
+        Returns: (documents, cursor for the next page or None after the last page)
+        """
+        url = f"{self.base_url}:runQuery?key={self.api_key}"
+        headers = {"Content-Type": "application/json"}
+        if self.id_token:
+            headers["Authorization"] = f"Bearer {self.id_token}"
+        
+        query = {
+            "from": [{"collectionId": collection_name}],
+            "orderBy": [{"field": {"fieldPath": "__name__"}, "direction": "ASCENDING"}],
+            "limit": page_size
+        }
+        if start_after:
+            query["startAt"] = {"values": [{"referenceValue": start_after}], "before": False}
+        
+        response = self.transport.post(url, json={"structuredQuery": query}, headers=headers)
+        response.raise_for_status()
+        
+        page = [item["document"] for item in response.json() if "document" in item]
+        documents = []
+        for doc in page:
+            doc_id = doc["name"].split("/")[-1]
+            fields = self._read_document(collection_name, doc_id, doc)
+            fields["id"] = doc_id
+            documents.append(fields)
+        
+        # A short page is the last one
+        next_cursor = page[-1]["name"] if len(page) == page_size else None
+        return documents, next_cursor
+    
+    @_offline_snapshot(lambda collection_name, doc_id: f"document:{collection_name}/{doc_id}")
+    @_prefetchable(lambda collection_name, doc_id: f"document:{collection_name}/{doc_id}")
     def get_document(self, collection_name, doc_id):
-        """Fetch a single document by ID"""
+        """
+        Fetch a single document by ID
+        A document prefetched as missing comes back as None instead of raising.
+        """
         url = f"{self.base_url}/{collection_name}/{doc_id}?key={self.api_key}"
         headers = {}
         if self.id_token:
             headers["Authorization"] = f"Bearer {self.id_token}"
         
-        response = requests.get(url, headers=headers)
+        response = self.transport.get(url, headers=headers)
+        if response.status_code == 404:
+            # Remember that the document is new so the first save can't clobber a concurrent create
+            self._snapshots[(collection_name, doc_id)] = (None, {})
         response.raise_for_status()
         doc = response.json()
         
-        fields = self._parse_fields(doc.get('fields', {}))
+        fields = self._read_document(collection_name, doc_id, doc)
         fields['id'] = doc_id
         return fields
     
+    def batch_get_documents(self, collection_name, doc_ids):
+        """
+        Fetch several documents by ID in one request
+        Returns: dict of doc_id -> fields (with 'id'), or None for documents that don't exist
+        """
+        if not doc_ids:
+            return {}
+        url = f"{self.base_url}:batchGet?key={self.api_key}"
+        headers = {"Content-Type": "application/json"}
+        if self.id_token:
+            headers["Authorization"] = f"Bearer {self.id_token}"
+        
+        root = self._document_root()
+        payload = {"documents": [f"{root}/{collection_name}/{doc_id}" for doc_id in doc_ids]}
+        response = self.transport.post(url, json=payload, headers=headers)
+        response.raise_for_status()
+        
+        documents = {doc_id: None for doc_id in doc_ids}
+        for item in response.json():
+            if "found" in item:
+                doc = item["found"]
+                doc_id = doc["name"].split("/")[-1]
+                fields = self._read_document(collection_name, doc_id, doc)
+                fields["id"] = doc_id
+                documents[doc_id] = fields
+            elif "missing" in item:
+                # Remember that the document is new so the first save can't clobber a concurrent create
+                self._snapshots[(collection_name, item["missing"].split("/")[-1])] = (None, {})
+        return documents
+    
+    def delete_document(self, collection_name, doc_id):
+        """Delete a document by ID"""
+        url = f"{self.base_url}/{collection_name}/{doc_id}?key={self.api_key}"
+        headers = {}
+        if self.id_token:
+            headers["Authorization"] = f"Bearer {self.id_token}"
+        
+        response = self.transport.delete(url, headers=headers)
+        response.raise_for_status()
+        self._forget_prefetched(collection_name, doc_id)
+        self._snapshots.pop((collection_name, doc_id), None)
+        self._shard_counts.pop((collection_name, doc_id), None)
+    
+    @_offline_snapshot(lambda collection_name, field, operator, value: f"query:{collection_name}:{json.dumps([[field, operator, value]])}")
     def query_collection(self, collection_name, field, operator, value):
         """
         Query a collection in Firebase with a filter
@@ -73,7 +293,7 @@ class FirebaseClient:
             if self.id_token:
                 headers["Authorization"] = f"Bearer {self.id_token}"
             
-            response = requests.post(url, json=payload, headers=headers)
+            response = self.transport.post(url, json=payload, headers=headers)
             response.raise_for_status()
             
             # Parse the response - Firestore returns an array of document objects
@@ -84,7 +304,7 @@ class FirebaseClient:
                 if "document" in item:
                     doc = item["document"]
                     doc_id = doc["name"].split("/")[-1]
-                    fields = self._parse_fields(doc.get("fields", {}))
+                    fields = self._read_document(collection_name, doc_id, doc)
                     fields["id"] = doc_id
                     documents.append(fields)
                     
@@ -95,17 +315,435 @@ class FirebaseClient:
             raise e
     
     def create_document(self, collection_name, doc_id, data):
-        """Create or update a document with a specific ID"""
-        url = f"{self.base_url}/{collection_name}/{doc_id}?key={self.api_key}"
+        """
+        Create or update a document with a specific ID
+        
+        If this client has read the document before, the write is sent with a
+        currentDocument precondition on the version that was read. When someone
+        else has saved the document in the meantime, only that document is
+        fetched again and the two versions are merged field by field before
+        retrying, so concurrent edits to different students are both kept.
+        
+        Per-student maps (see SHARDED_MAP_FIELDS) that grow past the shard
+        threshold are split across documents in a "shards" subcollection and
+        written in the same atomic commit as the parent document.
+        """
+        key = (collection_name, doc_id)
         headers = {"Content-Type": "application/json"}
         if self.id_token:
             headers["Authorization"] = f"Bearer {self.id_token}"
         
-        firebase_data = {"fields": self._to_firebase_fields(data)}
-        response = requests.patch(url, json=firebase_data, headers=headers)
+        for attempt in range(self.MAX_CONFLICT_RETRIES + 1):
+            snapshot = self._snapshots.get(key)
+            parent_data, shards = self._plan_shards(collection_name, data)
+            
+            if shards or self._shard_counts.get(key):
+                response = self._commit_sharded(collection_name, doc_id, parent_data, shards, snapshot, headers)
+            else:
+                url = f"{self.base_url}/{collection_name}/{doc_id}?key={self.api_key}"
+                url += self._precondition_params(snapshot)
+                firebase_data = {"fields": self._to_firebase_fields(data)}
+                response = self.transport.patch(url, json=firebase_data, headers=headers)
+            
+            if snapshot is not None and self._is_write_conflict(response):
+                print(f"Write conflict on {collection_name}/{doc_id}, merging with the latest version")
+                remote_time, remote_fields = self._fetch_latest(collection_name, doc_id)
+                data = self._merge_fields(snapshot[1], data, remote_fields)
+                self._snapshots[key] = (remote_time, remote_fields)
+                continue
+            
+            response.raise_for_status()
+            result = response.json()
+            
+            if "writeResults" in result:
+                # Commit responses only carry update times; the parent is the first write
+                update_time = result["writeResults"][0].get("updateTime")
+                result = {"name": f"{self._document_root()}/{collection_name}/{doc_id}", "updateTime": update_time}
+            else:
+                update_time = result.get("updateTime")
+            
+            self._forget_prefetched(collection_name, doc_id)
+            self._shard_counts[key] = len(shards)
+            self._record_size(collection_name, doc_id, parent_data)
+            self._remember_snapshot(
+                collection_name, doc_id, update_time,
+                self._parse_fields(self._to_firebase_fields(data))
+            )
+            return result
+        
+        raise WriteConflictError(
+            f"{collection_name}/{doc_id} was changed by someone else too many times while saving"
+        )
+    
+    def update_document_fields(self, collection_name, doc_id, data, field_paths):
+        """
+        Write only some fields of a document
+        
+        data is the whole document as it should now be; field_paths lists the
+        fields that changed, each as a tuple of map keys (e.g. ("records",
+        student_id)). Only those are sent, in a PATCH with an update mask, so
+        other fields - including other students' entries - are left exactly as
+        they are on the server and concurrent edits can't clobber each other.
+        A path missing from data is deleted.
+        
+        Like create_document(), the write carries a precondition on the
+        version last read. If the document has changed since, it is read again
+        (picking up any sharding) and the changed fields are sent again over
+        the new version. If it was expected not to exist but someone else has
+        created it, WriteConflictError is raised with the new document, as only
+        the caller knows which of data's fields are really its own.
+        
+        Documents whose per-student map is (or now needs to be) sharded are
+        written whole with create_document().
+        """
+        key = (collection_name, doc_id)
+        headers = {"Content-Type": "application/json"}
+        if self.id_token:
+            headers["Authorization"] = f"Bearer {self.id_token}"
+        changed = self._masked_fields(data, field_paths)
+        mask = "".join(f"&updateMask.fieldPaths={quote(_field_path(path))}" for path in field_paths)
+        
+        for attempt in range(self.MAX_CONFLICT_RETRIES + 1):
+            _, shards = self._plan_shards(collection_name, data)
+            if shards or self._shard_counts.get(key):
+                return self.create_document(collection_name, doc_id, data)
+            
+            snapshot = self._snapshots.get(key)
+            url = f"{self.base_url}/{collection_name}/{doc_id}?key={self.api_key}{mask}"
+            url += self._precondition_params(snapshot)
+            response = self.transport.patch(url, json={"fields": self._to_firebase_fields(changed)}, headers=headers)
+            
+            if snapshot is not None and self._is_write_conflict(response):
+                print(f"Write conflict on {collection_name}/{doc_id}, writing the changed fields over the latest version")
+                remote_time, remote_fields = self._fetch_latest(collection_name, doc_id)
+                self._snapshots[key] = (remote_time, remote_fields)
+                if snapshot[0] is None and remote_time is not None:
+                    raise WriteConflictError(
+                        f"{collection_name}/{doc_id} was created by someone else while saving",
+                        created={doc_id: remote_fields}
+                    )
+                # Brought up to date in case it has been sharded since and has to be written whole
+                data = self._merge_fields(snapshot[1], data, remote_fields)
+                continue
+            
+            response.raise_for_status()
+            result = response.json()
+            self._forget_prefetched(collection_name, doc_id)
+            
+            # The response is the whole updated document, so it becomes the merge base for later full writes
+            fields = self._parse_fields(result.get("fields", {}))
+            self._record_size(collection_name, doc_id, fields)
+            self._remember_snapshot(collection_name, doc_id, result.get("updateTime"), fields)
+            return result
+        
+        raise WriteConflictError(
+            f"{collection_name}/{doc_id} was changed by someone else too many times while saving"
+        )
+    
+    def commit_document_changes(self, collection_name, changes):
+        """
+        Write changed fields of several documents in one atomic commit
+        
+        changes: list of (doc_id, data, field_paths) - as for
+        update_document_fields(), data is each whole document and
+        field_paths the fields of it that changed. Only those are written,
+        so nobody else's edits to other fields are overwritten. Each write
+        carries a precondition on the version last read; if any document has
+        changed since, they are all read again and the commit is retried,
+        unless one expected not to exist has been created by someone else
+        (WriteConflictError, with the documents created). Documents whose
+        per-student map is (or now needs to be) sharded can't be written
+        field by field; they are written whole with create_document() once
+        the commit has gone through.
+        """
+        root = self._document_root()
+        headers = {"Content-Type": "application/json"}
+        if self.id_token:
+            headers["Authorization"] = f"Bearer {self.id_token}"
+        url = f"{self.base_url}:commit?key={self.api_key}"
+        
+        for attempt in range(self.MAX_CONFLICT_RETRIES + 1):
+            writes = []
+            masked = []
+            whole = []
+            for doc_id, data, field_paths in changes:
+                key = (collection_name, doc_id)
+                _, shards = self._plan_shards(collection_name, data)
+                if shards or self._shard_counts.get(key):
+                    whole.append((doc_id, data))
+                    continue
+                write = {
+                    "update": {
+                        "name": f"{root}/{collection_name}/{doc_id}",
+                        "fields": self._to_firebase_fields(self._masked_fields(data, field_paths))
+                    },
+                    "updateMask": {"fieldPaths": [_field_path(path) for path in field_paths]}
+                }
+                snapshot = self._snapshots.get(key)
+                if snapshot is not None:
+                    write["currentDocument"] = {"updateTime": snapshot[0]} if snapshot[0] else {"exists": False}
+                writes.append(write)
+                masked.append((doc_id, data, field_paths))
+            
+            if not writes:
+                break
+            
+            response = self.transport.post(url, json={"writes": writes}, headers=headers)
+            if self._is_write_conflict(response):
+                print(f"Write conflict committing {len(writes)} {collection_name} document(s), reading them again")
+                bases = {doc_id: self._snapshots.get((collection_name, doc_id)) for doc_id, _, _ in masked}
+                latest = self.batch_get_documents(collection_name, list(bases))
+                created = {
+                    doc_id: latest[doc_id] for doc_id, base in bases.items()
+                    if base is not None and base[0] is None and latest.get(doc_id) is not None
+                }
+                if created:
+                    raise WriteConflictError(
+                        f"{len(created)} {collection_name} document(s) were created by someone else while saving",
+                        created=created
+                    )
+                # Brought up to date in case some have been sharded since and have to be written whole
+                merged_changes = []
+                for doc_id, data, field_paths in changes:
+                    base = bases.get(doc_id)
+                    if base is not None and latest.get(doc_id) is not None:
+                        data = self._merge_fields(base[1], data, self._without_id(latest[doc_id]))
+                    merged_changes.append((doc_id, data, field_paths))
+                changes = merged_changes
+                continue
+            
+            response.raise_for_status()
+            write_results = response.json().get("writeResults", [])
+            for (doc_id, data, field_paths), write_result in zip(masked, write_results):
+                self._forget_prefetched(collection_name, doc_id)
+                self._remember_masked_write(collection_name, doc_id, write_result.get("updateTime"), data, field_paths)
+            break
+        else:
+            raise WriteConflictError(
+                f"{collection_name} documents were changed by someone else too many times while saving"
+            )
+        
+        for doc_id, data in whole:
+            self.create_document(collection_name, doc_id, data)
+    
+    def _document_root(self):
+        """Resource name prefix used for documents in commit requests"""
+        return f"projects/{self.project_id}/databases/(default)/documents"
+    
+    def _precondition_params(self, snapshot):
+        """Query string precondition for a PATCH based on the last version seen"""
+        if snapshot is None:
+            return ""
+        update_time, _ = snapshot
+        if update_time:
+            return f"&currentDocument.updateTime={quote(update_time)}"
+        return "&currentDocument.exists=false"
+    
+    def _plan_shards(self, collection_name, data):
+        """
+        Decide whether a document's per-student map needs sharding
+        Returns: (parent_data, shards) - shards is an empty list when the map fits
+        """
+        field = SHARDED_MAP_FIELDS.get(collection_name)
+        entries = data.get(field) if field else None
+        if not isinstance(entries, dict):
+            return data, []
+        
+        threshold = get_shard_threshold()
+        chunks = split_map(entries, threshold)
+        if len(chunks) <= 1:
+            return data, []
+        
+        parent_data = dict(data)
+        parent_data[field] = {}
+        parent_data[SHARD_MARKER] = {"field": field, "count": len(chunks)}
+        return parent_data, chunks
+    
+    def _commit_sharded(self, collection_name, doc_id, parent_data, shards, snapshot, headers):
+        """Write a parent document and its shards (removing stale ones) in one commit"""
+        parent_name = f"{self._document_root()}/{collection_name}/{doc_id}"
+        
+        parent_write = {"update": {"name": parent_name, "fields": self._to_firebase_fields(parent_data)}}
+        if snapshot is not None:
+            update_time, _ = snapshot
+            parent_write["currentDocument"] = {"updateTime": update_time} if update_time else {"exists": False}
+        
+        writes = [parent_write]
+        for index, chunk in enumerate(shards):
+            writes.append({
+                "update": {
+                    "name": f"{parent_name}/{SHARD_COLLECTION}/{index}",
+                    "fields": {"entries": {"mapValue": {"fields": self._to_firebase_fields(chunk)}}}
+                }
+            })
+        
+        previous_count = self._shard_counts.get((collection_name, doc_id), 0)
+        for index in range(len(shards), previous_count):
+            writes.append({"delete": f"{parent_name}/{SHARD_COLLECTION}/{index}"})
+        
+        url = f"{self.base_url}:commit?key={self.api_key}"
+        return self.transport.post(url, json={"writes": writes}, headers=headers)
+    
+    def _read_document(self, collection_name, doc_id, doc):
+        """Parse a raw document, reassemble any shards and record its version"""
+        fields = self._parse_fields(doc.get("fields", {}))
+        self._record_size(collection_name, doc_id, fields)
+        
+        marker = fields.pop(SHARD_MARKER, None)
+        if isinstance(marker, dict) and marker.get("field"):
+            count = int(marker.get("count", 0))
+            fields[marker["field"]] = self._load_shards(collection_name, doc_id, count)
+            self._shard_counts[(collection_name, doc_id)] = count
+        else:
+            self._shard_counts.pop((collection_name, doc_id), None)
+        
+        self._remember_snapshot(collection_name, doc_id, doc.get("updateTime"), fields)
+        return fields
+    
+    def _load_shards(self, collection_name, doc_id, count):
+        """
+        Fetch a document's shards and merge their entries back into one map
+        Only the first count shards (from the parent's marker) are read: shards
+        past it are left over from a larger version of the map and hold entries
+        that have since been removed.
+        """
+        if count <= 0:
+            return {}
+        url = f"{self.base_url}:batchGet?key={self.api_key}"
+        headers = {"Content-Type": "application/json"}
+        if self.id_token:
+            headers["Authorization"] = f"Bearer {self.id_token}"
+        
+        parent_name = f"{self._document_root()}/{collection_name}/{doc_id}"
+        payload = {"documents": [f"{parent_name}/{SHARD_COLLECTION}/{index}" for index in range(count)]}
+        response = self.transport.post(url, json=payload, headers=headers)
+        response.raise_for_status()
+        
+        shard_docs = [item["found"] for item in response.json() if "found" in item]
+        shard_docs.sort(key=lambda d: int(d["name"].split("/")[-1]))
+        
+        entries = {}
+        for shard in shard_docs:
+            shard_fields = self._parse_fields(shard.get("fields", {}))
+            entries.update(shard_fields.get("entries", {}))
+        return entries
+    
+    def _record_size(self, collection_name, doc_id, fields):
+        """Size guard: warn when a document nears the Firestore limit"""
+        size = estimate_document_size(collection_name, doc_id, fields)
+        if size >= get_size_warning():
+            print(f"Warning: {collection_name}/{doc_id} is about {size // 1024} KiB, close to the Firestore document limit")
+    
+    def _masked_fields(self, data, field_paths):
+        """The part of a document named by field paths (tuples of map keys), for a masked write"""
+        masked = {}
+        for path in field_paths:
+            value = data
+            for segment in path:
+                value = value.get(segment, _MISSING) if isinstance(value, dict) else _MISSING
+            if value is _MISSING:
+                continue  # Left out of the body, so the mask deletes it
+            target = masked
+            for segment in path[:-1]:
+                target = target.setdefault(segment, {})
+            target[path[-1]] = value
+        return masked
+    
+    def _remember_masked_write(self, collection_name, doc_id, update_time, data, field_paths):
+        """Record the version written by a masked write: the last version seen with the written fields applied"""
+        key = (collection_name, doc_id)
+        snapshot = self._snapshots.get(key)
+        if snapshot is None or not update_time:
+            self._snapshots.pop(key, None)  # The rest of the document is unknown
+            return
+        fields = copy.deepcopy(snapshot[1])
+        written = self._parse_fields(self._to_firebase_fields(self._masked_fields(data, field_paths)))
+        for path in field_paths:
+            value = written
+            for segment in path:
+                value = value.get(segment, _MISSING) if isinstance(value, dict) else _MISSING
+            target = fields
+            for segment in path[:-1]:
+                if not isinstance(target.get(segment), dict):
+                    target[segment] = {}
+                target = target[segment]
+            if value is _MISSING:
+                target.pop(path[-1], None)
+            else:
+                target[path[-1]] = value
+        self._snapshots[key] = (update_time, fields)
+    
+    def _without_id(self, document):
+        """Fields of a document as returned by a read, without the "id" added to it"""
+        return {key: value for key, value in document.items() if key != "id"}
+    
+    def _forget_prefetched(self, collection_name, doc_id):
+        """Drop a prefetched copy of a document that has just been written, so it isn't shown stale"""
+        self.prefetched.pop(FirebaseClient.get_document.snapshot_key(collection_name, doc_id), None)
+    
+    def _remember_snapshot(self, collection_name, doc_id, update_time, fields):
+        """Record the version of a document that was just read or written"""
+        if update_time:
+            self._snapshots[(collection_name, doc_id)] = (update_time, copy.deepcopy(fields))
+    
+    def _is_write_conflict(self, response):
+        """Check whether a write was rejected because its precondition no longer holds"""
+        if response.status_code == 409:
+            return True
+        if response.status_code == 400:
+            try:
+                status = response.json().get("error", {}).get("status", "")
+            except ValueError:
+                return False
+            return status == "FAILED_PRECONDITION"
+        return False
+    
+    def _fetch_latest(self, collection_name, doc_id):
+        """
+        Fetch the current version of a single document after a conflict
+        Returns: (update_time, fields) - update_time is None if it was deleted
+        """
+        url = f"{self.base_url}/{collection_name}/{doc_id}?key={self.api_key}"
+        headers = {}
+        if self.id_token:
+            headers["Authorization"] = f"Bearer {self.id_token}"
+        
+        response = self.transport.get(url, headers=headers)
+        if response.status_code == 404:
+            return None, {}
         response.raise_for_status()
-        return response.json()
+        doc = response.json()
+        fields = self._read_document(collection_name, doc_id, doc)
+        return doc.get("updateTime"), fields
+    
+    def _merge_fields(self, base, local, remote):
+        """
+        Three-way merge of document fields
+        
+        Fields changed locally since the base version win; everything else is
+        taken from the remote version. Maps (student_results, records) are
+        merged key by key so edits to different students don't overwrite each other.
+        """
+        merged = dict(remote)
+        
+        for key, value in local.items():
+            base_value = base.get(key, _MISSING)
+            remote_value = remote.get(key, _MISSING)
+            
+            if isinstance(value, dict) and isinstance(remote_value, dict):
+                nested_base = base_value if isinstance(base_value, dict) else {}
+                merged[key] = self._merge_fields(nested_base, value, remote_value)
+            elif value != base_value or remote_value is _MISSING:
+                merged[key] = value
+        
+        # Fields removed locally are only dropped if nobody else has changed them
+        for key, base_value in base.items():
+            if key not in local and remote.get(key, _MISSING) == base_value:
+                merged.pop(key, None)
+        
+        return merged
     
+    @_offline_snapshot(lambda collection, filters: f"query:{collection}:{json.dumps([list(f) for f in filters])}")
     def query_collection_with_filters(self, collection, filters):
         """
         Query a collection with multiple filters
@@ -157,7 +795,7 @@ class FirebaseClient:
             if self.id_token:
                 headers["Authorization"] = f"Bearer {self.id_token}"
                 
-            response = requests.post(url, json=payload, headers=headers)
+            response = self.transport.post(url, json=payload, headers=headers)
             response.raise_for_status()
             
             # Parse the response
@@ -169,11 +807,11 @@ class FirebaseClient:
                 if "document" in item:
                     doc = item["document"]
                     doc_id = doc["name"].split("/")[-1]
-                    fields = doc.get("fields", {})
                     
                     # Convert Firestore field types to Python types
+                    parsed_fields = self._read_document(collection, doc_id, doc)
                     doc_data = {"id": doc_id}
-                    doc_data.update(self._parse_fields(fields))
+                    doc_data.update(parsed_fields)
                     result.append(doc_data)
             
             return result
@@ -0,0 +1,153 @@
+import os
+import copy
+import time
+import json
+import threading
+from backend.session_store import APP_DATA_DIR
+
+# How long (seconds) the last user's reads are kept in memory after logout for a quick re-login
+WARM_SESSION_TTL = 15 * 60
+
+class SnapshotCache:
+    """
+    Local copy of the reads made during the last session
+
+    While a saved session is being resumed, FirebaseClient answers reads from
+    this cache so the dashboard can render straight away. Once the refresh
+    token has been exchanged, serving stops and every read goes to Firestore
+    again (and refreshes the cache for next time). Only users who chose to
+    stay signed in have it saved to disk.
+
+    After a logout the reads stay in memory, for one user and for at most
+    WARM_SESSION_TTL, so that user logging straight back in sees their
+    dashboard at once. Anyone else logging in discards them.
+    """
+
+    def __init__(self, data_dir=APP_DATA_DIR):
+        self.cache_dir = os.path.join(data_dir, "cache")
+        self.user_uid = None
+        self.entries = {}
+        self.recording = False
+        self.serving = False
+        self.persist = False
+        self.warm = None  # (user_uid, entries, logged out at) kept after logout
+        self._lock = threading.Lock()
+
+    def open(self, user_uid, serve=False, persist=True):
+        """
+        Start recording reads for a user, optionally serving the saved ones
+        persist: keep a copy on disk for the next launch (stay signed in); otherwise
+        any earlier copy is deleted and reads are only kept in memory
+        Returns: True if reads are being served from the cache
+        """
+        with self._lock:
+            warm_entries = self._take_warm(user_uid)
+            self.user_uid = user_uid
+            self.persist = persist
+            self.entries = {}
+            if warm_entries is not None:
+                self.entries = warm_entries
+            elif persist:
+                try:
+                    with open(self._path(), "r") as cache_file:
+                        self.entries = json.load(cache_file)
+                except (OSError, ValueError):
+                    pass
+            else:
+                self._remove_saved_copy()
+            self.recording = True
+            self.serving = serve and bool(self.entries)
+        return self.serving
+
+    def has_warm(self, user_uid):
+        """True if this user logged out recently enough for their reads to still be in memory"""
+        with self._lock:
+            return bool(self.warm and self.warm[0] == user_uid
+                        and time.time() - self.warm[2] <= WARM_SESSION_TTL)
+
+    def expire_warm(self):
+        """Drop the logged-out user's reads once they are too old to be worth keeping"""
+        with self._lock:
+            if self.warm and time.time() - self.warm[2] >= WARM_SESSION_TTL:
+                self.warm = None
+
+    def stop_serving(self):
+        """Send reads to Firestore again once the session is live"""
+        self.serving = False
+
+    def lookup(self, key):
+        """
+        Look up a cached read while serving
+        Returns: (hit, value)
+        """
+        if not self.serving:
+            return False, None
+        with self._lock:
+            if key in self.entries:
+                return True, copy.deepcopy(self.entries[key])
+        return False, None
+
+    def put(self, key, value):
+        """Remember the result of a read"""
+        if not self.recording:
+            return
+        with self._lock:
+            self.entries[key] = copy.deepcopy(value)
+
+    def save(self):
+        """Write the cache to disk"""
+        with self._lock:
+            if not self.recording or not self.persist or not self.user_uid:
+                return
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                fd = os.open(self._path(), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                with os.fdopen(fd, "w") as cache_file:
+                    # The mode only applies to a new file; tighten one left by an older version too
+                    os.chmod(self._path(), 0o600)
+                    json.dump(self.entries, cache_file, separators=(",", ":"))
+            except (OSError, TypeError, ValueError) as e:
+                print(f"Failed to save offline snapshot: {str(e)}")
+
+    def close(self, delete=False, keep_warm=False):
+        """
+        Stop recording; delete=True also removes the saved copy (on logout)
+        keep_warm: hold this user's reads in memory for a quick re-login
+        """
+        with self._lock:
+            if delete and self.user_uid:
+                self._remove_saved_copy()
+            if keep_warm and self.user_uid and self.entries:
+                self.warm = (self.user_uid, self.entries, time.time())
+            else:
+                self.warm = None
+            self.user_uid = None
+            self.entries = {}
+            self.recording = False
+            self.serving = False
+            self.persist = False
+
+    def _take_warm(self, user_uid):
+        """The warm reads if they belong to this user; they are dropped either way"""
+        warm, self.warm = self.warm, None
+        if warm and warm[0] == user_uid and time.time() - warm[2] <= WARM_SESSION_TTL:
+            return warm[1]
+        return None
+
+    def _remove_saved_copy(self):
+        try:
+            os.remove(self._path())
+        except OSError:
+            pass
+
+    def _path(self):
+        return os.path.join(self.cache_dir, f"{self.user_uid}.json")
+
+_cache = None
+
+def get_snapshot_cache():
+    """Return the snapshot cache shared by every FirebaseClient"""
+    global _cache
+    if _cache is None:
+        _cache = SnapshotCache()
+    return _cache
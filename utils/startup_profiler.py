@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+import builtins
+import threading
+from collections import defaultdict
+
+# Set to 1 to also break import time down by package (slightly slows the imports it measures)
+PROFILE_IMPORTS_ENV_VAR = "SCHOOL_PROFILE_IMPORTS"
+
+class StartupProfiler:
+    """
+    Measures how long the app takes to become usable
+
+    mark() records a milestone measured from when the profiler was created
+    (the first thing app.py does): "imports" once the login window's modules
+    are loaded and "window_ready" once that window has been painted. begin()
+    and end() time spans such as login -> dashboard shown -> dashboard
+    interactive. Every measurement is printed and also recorded as a timed
+    operation, so it shows up in the transport's summary and in cassettes.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.marks = {}                          # milestone -> seconds since start
+        self.spans = {}                          # span name -> perf_counter when it began
+        self.span_results = defaultdict(dict)    # span name -> {label: seconds}
+        self.import_times = defaultdict(float)   # top-level package -> seconds
+        self._importing = threading.local()     # per thread: stack of nested import times
+        self._original_import = None
+
+    def mark(self, name):
+        """Record a milestone, once, measured from process start-up"""
+        if name in self.marks:
+            return
+        elapsed = time.perf_counter() - self.started
+        self.marks[name] = elapsed
+        print(f"Startup: {name} after {elapsed * 1000:.0f} ms")
+        self._record(f"startup_{name}", elapsed)
+        if name == "window_ready":
+            self.stop_tracking_imports()
+
+    def begin(self, span):
+        """Start (or restart) timing a span"""
+        self.spans[span] = time.perf_counter()
+        self.span_results[span] = {}
+
+    def end(self, span, label):
+        """Record how long after begin(span) label happened; only the first end() per label counts"""
+        began = self.spans.get(span)
+        if began is None or label in self.span_results[span]:
+            return
+        elapsed = time.perf_counter() - began
+        self.span_results[span][label] = elapsed
+        print(f"Startup: {label} {elapsed * 1000:.0f} ms after {span}")
+        self._record(label, elapsed)
+
+    def track_imports(self):
+        """Time every module imported from now until the window is ready, by top-level package"""
+        if self._original_import is not None:
+            return
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def stop_tracking_imports(self):
+        """Restore the normal importer and print the slowest packages"""
+        if self._original_import is None:
+            return
+        builtins.__import__ = self._original_import
+        self._original_import = None
+
+        slowest = sorted(self.import_times.items(), key=lambda item: -item[1])[:15]
+        print("Startup: slowest imports")
+        for package, seconds in slowest:
+            print(f"  {package}: {seconds * 1000:.1f} ms")
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        importer = self._original_import
+        if level or name in sys.modules:
+            return importer(name, globals, locals, fromlist, level)
+
+        # Each package is charged only its own time; nested imports are charged to theirs
+        stack = self._importing.__dict__.setdefault("stack", [])
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return importer(name, globals, locals, fromlist, level)
+        finally:
+            total = time.perf_counter() - start
+            nested = stack.pop()
+            self.import_times[name.split(".")[0]] += total - nested
+            if stack:
+                stack[-1] += total
+
+    def _record(self, name, elapsed):
+        # Imported here so app.py can import this module before anything else
+        from services.firebase_transport import get_transport
+        get_transport().record_operation(name, elapsed)
+
+_profiler = None
+
+def get_startup_profiler():
+    """Return the process-wide profiler, creating it (and the import timer, if enabled) on first use"""
+    global _profiler
+    if _profiler is None:
+        _profiler = StartupProfiler()
+        if os.getenv(PROFILE_IMPORTS_ENV_VAR) == "1":
+            _profiler.track_imports()
+    return _profiler
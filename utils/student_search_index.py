@@ -0,0 +1,214 @@
+import re
+from bisect import bisect_left, insort
+from utils.class_rosters import parse_subjects
+
+# Queries shorter than this match word prefixes only; longer ones also match inside names
+TRIGRAM_LENGTH = 3
+
+_WORD_SPLIT = re.compile(r"[^\w]+")
+
+def student_display_name(student):
+    """First and last name, falling back to the old single name field"""
+    first_name = student.get('first_name', '')
+    last_name = student.get('last_name', '')
+    if first_name or last_name:
+        return f"{first_name} {last_name}".strip()
+    return student.get('name', '')
+
+def student_subjects_text(student):
+    """Subjects as shown: "Maths, French" whether stored as a list, the list's text or comma-separated"""
+    return ", ".join(subject for subject in parse_subjects(student.get('subjects', [])) if subject)
+
+class StudentSearchIndex:
+    """
+    In-memory search index over a roster of students
+
+    Each student is identified by its position in the roster. The index keeps
+    the display text of every column, postings from each word (name parts,
+    ID and subject words) to the students that have it, a sorted list of those
+    words for prefix matching, trigrams of name words for matching inside a
+    name, the positions in each year group (the facets) and every student's
+    sort key for each column, with the roster kept sorted by each column.
+    Students can be added a page at a time as they are loaded. Removed
+    students keep their position but no longer match anything.
+    """
+
+    def __init__(self, students=None):
+        self.students = []
+        self.positions = {}       # student id -> position
+        self.removed = set()      # positions of removed students
+        self.display = []         # position -> (id, name, year group, subjects) as shown
+        self.postings = {}        # lower-case word -> positions of students with that word
+        self.terms = []           # every word in self.postings, sorted
+        self.name_trigrams = {}   # trigram -> name words containing it
+        self.by_year = {}         # year group -> positions in it
+        self.sort_keys = [[] for _ in SORT_KEYS]  # column -> sort key per position
+        self.orders = [[] for _ in SORT_KEYS]     # column -> every position, sorted by that column
+        self._subject_words = {}  # most students share a handful of subject lists; split each once
+        self.add_students(students or [])
+
+    def __len__(self):
+        return len(self.students)
+
+    def add_students(self, students):
+        """
+        Index more students, after those already indexed
+        Returns: range of the positions they were given
+        """
+        first = len(self.students)
+        postings = self.postings
+        new_terms = []
+        new_name_words = set()
+
+        for student in students:
+            student_id = student.get('id', '')
+            if student_id in self.positions:
+                # Already indexed (e.g. added here, then read back in a later page)
+                continue
+            position = len(self.students)
+            if student_id:
+                self.positions[student_id] = position
+            name = student_display_name(student)
+            year_group = student.get('year_group', '')
+            subjects = student_subjects_text(student)
+            display = (student_id, name, year_group, subjects)
+            self.students.append(student)
+            self.display.append(display)
+            self.by_year.setdefault(year_group, []).append(position)
+
+            # The position breaks ties, so every filter shows tied students in the same order
+            for column, key in enumerate(SORT_KEYS):
+                self.sort_keys[column].append((key(student, display), position))
+
+            words = self._subject_words.get(subjects)
+            if words is None:
+                words = self._subject_words[subjects] = set(_WORD_SPLIT.split(subjects.lower())) - {''}
+            name_words = set(_WORD_SPLIT.split(name.lower()))
+            words = words | name_words
+            if student_id:
+                words.add(student_id.lower())
+            words.discard('')
+            for word in words:
+                posting = postings.get(word)
+                if posting is None:
+                    postings[word] = [position]
+                    new_terms.append(word)
+                    if word in name_words:
+                        new_name_words.add(word)
+                else:
+                    posting.append(position)
+
+        # A first (or large) batch is cheaper to sort than to merge in
+        if len(new_terms) > len(self.terms):
+            self.terms = sorted(postings)
+        else:
+            for word in new_terms:
+                insort(self.terms, word)
+
+        for word in new_name_words:
+            for i in range(len(word) - TRIGRAM_LENGTH + 1):
+                self.name_trigrams.setdefault(word[i:i + TRIGRAM_LENGTH], set()).add(word)
+
+        added = range(first, len(self.students))
+        for column, order in enumerate(self.orders):
+            keys = self.sort_keys[column]
+            if len(added) > len(order):
+                order.extend(added)
+                order.sort(key=keys.__getitem__)
+            else:
+                for position in added:
+                    insort(order, position, key=keys.__getitem__)
+        return added
+
+    def remove(self, position):
+        """Stop a student matching any search (their position is kept)"""
+        self.removed.add(position)
+
+    def restore(self, position):
+        """Undo remove()"""
+        self.removed.discard(position)
+
+    def match(self, query):
+        """
+        Positions matching every word of the query, in any order
+        Returns: set of positions, or None if the query is empty and nobody
+        has been removed (everything matches)
+        """
+        tokens = [token for token in _WORD_SPLIT.split(query.lower()) if token]
+        if not tokens:
+            if self.removed:
+                return set(range(len(self.students))) - self.removed
+            return None
+
+        matches = None
+        # Longest (most selective) words first, so the running set shrinks quickly
+        for token in sorted(set(tokens), key=len, reverse=True):
+            token_matches = self._match_token(token)
+            matches = token_matches if matches is None else matches & token_matches
+            if not matches:
+                return set()
+        return matches - self.removed
+
+    def _match_token(self, token):
+        # Words (name parts, IDs, subjects) starting with the token
+        start = bisect_left(self.terms, token)
+        end = bisect_left(self.terms, token + "\uffff", start)
+        words = self.terms[start:end]
+
+        # Name words containing the token anywhere, narrowed down by trigrams then checked
+        if len(token) >= TRIGRAM_LENGTH:
+            candidates = []
+            for i in range(len(token) - TRIGRAM_LENGTH + 1):
+                trigram_words = self.name_trigrams.get(token[i:i + TRIGRAM_LENGTH])
+                if trigram_words is None:
+                    candidates = None
+                    break
+                candidates.append(trigram_words)
+            if candidates:
+                candidates.sort(key=len)
+                words.extend(word for word in candidates[0].intersection(*candidates[1:])
+                             if token in word and not word.startswith(token))
+
+        postings = self.postings
+        return set().union(*[postings[word] for word in words])
+
+    def facet_counts(self, matches):
+        """Number of matching students in each year group"""
+        if matches is None:
+            return {year_group: len(positions) for year_group, positions in self.by_year.items()}
+        return {
+            year_group: len(matches.intersection(positions))
+            for year_group, positions in self.by_year.items()
+        }
+
+    def filter_year(self, matches, year_group):
+        """Restrict matches (None = everyone) to one year group; no year group keeps them all"""
+        if not year_group:
+            return matches
+        in_year = self.by_year.get(year_group, [])
+        if matches is None:
+            return set(in_year)
+        return matches.intersection(in_year)
+
+    def sorted_positions(self, positions, column, descending=False):
+        """Positions (None = everyone) in the order of a column, using the precomputed keys"""
+        if positions is None:
+            order = self.orders[column]
+            return order[::-1] if descending else list(order)
+        return sorted(positions, key=self.sort_keys[column].__getitem__, reverse=descending)
+
+def _name_sort_key(student):
+    """(first name, last name), lower case; records with only the old name field are split on its first space"""
+    first_name = student.get('first_name', '')
+    last_name = student.get('last_name', '')
+    if not (first_name or last_name):
+        first_name, _, last_name = student.get('name', '').strip().partition(' ')
+    return first_name.lower(), last_name.strip().lower()
+
+# Sort key of each column (ID, Name, Year Group, Subjects) from a student and its display text
+SORT_KEYS = [
+    lambda student, display: display[0],
+    lambda student, display: _name_sort_key(student),
+    lambda student, display: display[2],
+    lambda student, display: display[3],
+]